@@ -0,0 +1,104 @@
+# Load benchmark comparing the sync (threadpool) and async database modes of
+# the services, vehicles and reports routers: requests/sec and p50/p99
+# latency for a mix of read and write requests at a fixed concurrency.
+#
+# By default both modes run against the same SQLite file (pysqlite vs
+# aiosqlite). Point --url/--async-url at MySQL for numbers that matter:
+#   python -m benchmarks.async_load \
+#       --url mysql+pymysql://root:@localhost/carwash_bench \
+#       --async-url mysql+aiomysql://root:@localhost/carwash_bench
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.harness import make_session_factory, make_async_session_factory, make_app, seed
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+async def run_load(app, requests: int, concurrency: int, vehicles: int, services: int):
+    rng = random.Random(7)
+    latencies = []
+    errors = 0
+
+    def next_request():
+        choice = rng.random()
+        if choice < 0.4:
+            return "GET", "/api/services/", {"params": {"limit": 50}}
+        if choice < 0.6:
+            return "GET", f"/api/vehicles/PLT{rng.randrange(vehicles):06d}", {}
+        if choice < 0.8:
+            return "GET", "/api/reports/dashboard-stats", {}
+        if choice < 0.9:
+            return "GET", "/api/reports/average-service-time", {}
+        return "PATCH", f"/api/services/{rng.randint(1, services)}/status", {
+            "json": {"status": rng.choice(["pending", "in_progress"])}
+        }
+
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(next_request())
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                method, url, kwargs = queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.request(method, url, **kwargs)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code >= 400:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "requests_per_second": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "errors": errors
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="Sync database URL (default: temporary SQLite file)")
+    parser.add_argument("--async-url", help="Async database URL for the same database")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--vehicles", type=int, default=5000)
+    parser.add_argument("--services", type=int, default=50000)
+    args = parser.parse_args()
+
+    if not args.url:
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        args.url = f"sqlite:///{path}"
+        args.async_url = f"sqlite+aiosqlite:///{path}"
+
+    SessionLocal = make_session_factory(args.url)
+    db = SessionLocal()
+    try:
+        seed(db, vehicles=args.vehicles, employees=20, services=args.services)
+    finally:
+        db.close()
+
+    for mode, AsyncSessionLocal in [("sync", None), ("async", make_async_session_factory(args.async_url))]:
+        app = make_app(SessionLocal, AsyncSessionLocal)
+        result = asyncio.run(run_load(app, args.requests, args.concurrency, args.vehicles, args.services))
+        print(f"{mode:<6} {result['requests_per_second']:8.1f} req/s  p50={result['p50_ms']:.1f}ms  "
+              f"p99={result['p99_ms']:.1f}ms  errors={result['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# Compares registering vehicles one request at a time with the bulk CSV
+# endpoint: statements issued and wall time per 1000 vehicles.
+#
+# Usage (from the backend directory):
+#   python -m benchmarks.bulk_import
+import time
+
+from benchmarks.harness import make_session_factory, make_client, count_queries
+
+
+def main(rows: int = 5000):
+    SessionLocal = make_session_factory()
+    client = make_client(SessionLocal)
+
+    with count_queries(SessionLocal) as counter:
+        start = time.perf_counter()
+        for i in range(rows):
+            client.post("/api/vehicles/", json={
+                "plate_number": f"ONE{i:06d}", "vehicle_type": "car",
+                "client_name": f"Client {i}", "client_phone": f"555-{i:06d}"
+            }).raise_for_status()
+        single = (counter.count, time.perf_counter() - start)
+
+    csv_data = "plate_number,vehicle_type,client_name,client_phone\n" + "".join(
+        f"BULK{i:06d},car,Client {i},555-{i:06d}\n" for i in range(rows)
+    )
+    with count_queries(SessionLocal) as counter:
+        start = time.perf_counter()
+        response = client.post("/api/vehicles/bulk/csv", files={"file": ("vehicles.csv", csv_data.encode(), "text/csv")})
+        bulk = (counter.count, time.perf_counter() - start)
+    response.raise_for_status()
+    assert response.json()["created"] == rows
+
+    for name, (statements, elapsed) in [("single", single), ("bulk csv", bulk)]:
+        print(f"{name:<9} statements/1000 rows={statements * 1000 / rows:8.1f}  "
+              f"time/1000 rows={elapsed * 1000 / rows * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
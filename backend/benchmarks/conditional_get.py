@@ -0,0 +1,142 @@
+# Conditional GETs for the read-heavy screens. For each endpoint: the
+# statements and bytes of a full response, of a revalidation with the ETag
+# it returned (304, no statements) and of a plain repeat served from the
+# body cache; then that a write to one of its tables makes the old ETag
+# stale, and that streamed (NDJSON) listings are never kept. Finally a set
+# of idle screens refreshing every endpoint, with a
+# write every few rounds: without the body cache, with it, and with the
+# screens also sending If-None-Match.
+#   python -m benchmarks.conditional_get --screens 20 --rounds 10
+import argparse
+import sys
+from datetime import date, timedelta
+
+from benchmarks.harness import make_session_factory, make_client, count_queries, seed
+from http_cache import response_cache
+import models
+
+TODAY = date.today().isoformat()
+# (path, params, a write that changes what it returns)
+ENDPOINTS = [
+    ("/api/services/", {"limit": 100}, ("patch", "/api/services/3/status", {"status": "cancelled"})),
+    ("/api/services/pending", {}, ("post", "/api/services/", {"vehicle_id": 1, "employee_id": 1, "service_type_id": 1})),
+    ("/api/vehicles/", {}, ("post", "/api/vehicles/", {"plate_number": "ETAG01", "vehicle_type": "car", "client_name": "New", "client_phone": "555"})),
+    ("/api/vehicles/PLT000001", {}, ("post", "/api/vehicles/", {"plate_number": "ETAG02", "vehicle_type": "car", "client_name": "New", "client_phone": "555"})),
+    ("/api/employees/", {}, ("post", "/api/employees/", {"name": "New", "position": "washer", "shift": "morning"})),
+    ("/api/inventory/", {}, ("post", "/api/inventory/", {"name": "Wax", "current_stock": 10, "minimum_stock": 2, "unit": "liters"})),
+    ("/api/inventory/low-stock", {}, ("post", "/api/inventory/use", {"service_id": 1, "supply_id": 1, "quantity": 1})),
+    ("/api/reports/dashboard-stats", {}, ("post", "/api/services/", {"vehicle_id": 2, "employee_id": 2, "service_type_id": 1})),
+    ("/api/reports/daily-income", {"date": TODAY}, ("patch", "/api/services/4/status", {"status": "completed"})),
+    ("/api/reports/income", {"from": (date.today() - timedelta(days=30)).isoformat(), "to": TODAY}, ("patch", "/api/services/5/status", {"status": "completed"})),
+    ("/api/reports/average-service-time", {}, ("patch", "/api/services/6/status", {"status": "completed"})),
+]
+
+
+def request(client, path, params=None, etag=None):
+    headers = {"If-None-Match": etag} if etag else {}
+    return client.get(path, params=params, headers=headers)
+
+
+def endpoint_checks(SessionLocal, client) -> int:
+    failures = 0
+    for path, params, (method, write_path, body) in ENDPOINTS:
+        with count_queries(SessionLocal) as full:
+            first = request(client, path, params)
+        etag = first.headers.get("etag")
+        with count_queries(SessionLocal) as revalidated:
+            not_modified = request(client, path, params, etag)
+        with count_queries(SessionLocal) as repeated:
+            cached = request(client, path, params)
+        client.request(method, write_path, json=body).raise_for_status()
+        after_write = request(client, path, params, etag)
+
+        problems = []
+        if first.status_code != 200 or not etag:
+            problems.append(f"first response {first.status_code} without an ETag")
+        if not_modified.status_code != 304 or revalidated.count:
+            problems.append(f"revalidation: {not_modified.status_code} with {revalidated.count} statements")
+        if cached.status_code != 200 or cached.content != first.content or repeated.count:
+            problems.append(f"repeat: {cached.status_code} with {repeated.count} statements")
+        if after_write.status_code != 200 or after_write.headers.get("etag") == etag:
+            problems.append(f"after a write: {after_write.status_code}, ETag {'unchanged' if after_write.headers.get('etag') == etag else 'changed'}")
+        print(f"{'FAIL' if problems else 'OK  '} {path:<36} full={full.count} stmts/{len(first.content)}B  "
+              f"304={revalidated.count} stmts/{len(not_modified.content)}B  cached={repeated.count} stmts")
+        for problem in problems:
+            print(f"       {problem}")
+        failures += bool(problems)
+    return failures
+
+
+def stream_checks(SessionLocal, client) -> int:
+    # ?stream=true returns its own StreamingResponse: no validators, so it
+    # must not be kept or answered from the body cache either
+    failures = 0
+    for path in ("/api/services/", "/api/vehicles/"):
+        responses = []
+        for _ in range(2):
+            with count_queries(SessionLocal) as counter:
+                responses.append((client.get(path, params={"stream": "true"}), counter.count))
+        problems = [
+            f"{response.status_code} with ETag {response.headers.get('etag')} and {statements} statements"
+            for response, statements in responses
+            if response.status_code != 200 or response.headers.get("etag") or not statements
+        ]
+        print(f"{'FAIL' if problems else 'OK  '} {path + '?stream=true':<36} not kept")
+        for problem in problems:
+            print(f"       {problem}")
+        failures += bool(problems)
+    return failures
+
+
+def idle_screens(SessionLocal, client, screens: int, rounds: int, write_every: int):
+    maxsize = response_cache.maxsize
+    modes = (("no body cache", 0, False), ("body cache", maxsize, False), ("+ If-None-Match", maxsize, True))
+    for index, (label, cache_size, conditional) in enumerate(modes):
+        response_cache.maxsize = cache_size
+        etags = {}
+        statements = transferred = not_modified = 0
+        for round_number in range(rounds):
+            for screen in range(screens):
+                for path, params, _ in ENDPOINTS:
+                    etag = etags.get((screen, path)) if conditional else None
+                    with count_queries(SessionLocal) as counter:
+                        response = request(client, path, params, etag)
+                    statements += counter.count
+                    transferred += len(response.content)
+                    not_modified += response.status_code == 304
+                    if response.status_code == 200:
+                        etags[(screen, path)] = response.headers.get("etag")
+            # Somebody changes a service every few refreshes
+            if round_number % write_every == write_every - 1:
+                client.patch(f"/api/services/{10 + index * rounds + round_number}/status", json={"status": "in_progress"}).raise_for_status()
+        requests = rounds * screens * len(ENDPOINTS)
+        print(f"{screens} screens x {rounds} refreshes, {label:<16}: {statements / requests:5.2f} statements and "
+              f"{transferred / requests:8.0f} bytes per request, {not_modified / requests:4.0%} answered 304")
+    response_cache.maxsize = maxsize
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--screens", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--write-every", type=int, default=5, help="Refresh rounds between writes")
+    args = parser.parse_args()
+
+    SessionLocal = make_session_factory()
+    db = SessionLocal()
+    seed(db, vehicles=200, employees=10, services=2000)
+    # The writes below move these services along
+    db.query(models.Service).filter(models.Service.id < 10 + 3 * args.rounds).update({"status": "pending", "end_time": None})
+    db.commit()
+    db.close()
+    client = make_client(SessionLocal)
+    client.post("/api/inventory/", json={"name": "Soap", "current_stock": 1, "minimum_stock": 5, "unit": "liters"}).raise_for_status()
+
+    failures = endpoint_checks(SessionLocal, client) + stream_checks(SessionLocal, client)
+    idle_screens(SessionLocal, client, args.screens, args.rounds, args.write_every)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# Verifies that the employee roster and workload endpoints issue a constant
+# number of queries regardless of how many employees and services exist, and
+# that the in-process workload counter agrees with the database.
+#
+# Usage (from the backend directory):
+#   python -m benchmarks.employee_queries
+from benchmarks.harness import make_session_factory, make_client, count_queries, seed
+from workload import workload_counter, get_workloads
+
+
+def measure(employees: int, rows: int):
+    SessionLocal = make_session_factory()
+    db = SessionLocal()
+    try:
+        seed(db, vehicles=100, employees=employees, services=rows)
+    finally:
+        db.close()
+
+    client = make_client(SessionLocal)
+    results = {}
+    for name, request in [
+        ("get_all_employees", lambda: client.get("/api/employees/")),
+        ("get_employee_workload", lambda: client.get("/api/employees/1/workload")),
+        ("update_employee_status", lambda: client.patch("/api/employees/1/status", json={"active": True})),
+    ]:
+        with count_queries(SessionLocal) as counter:
+            request().raise_for_status()
+        results[name] = counter.count
+    return SessionLocal, client, results
+
+
+def check_counter():
+    SessionLocal, client, _ = measure(employees=5, rows=200)
+    workload_counter.enabled = True
+    workload_counter.reset()
+    try:
+        client.get("/api/employees/").raise_for_status()
+        client.post("/api/services/", json={"vehicle_id": 1, "employee_id": 2, "service_type_id": 1}).raise_for_status()
+        client.patch("/api/services/1/status", json={"status": "completed"}).raise_for_status()
+
+        with count_queries(SessionLocal) as counter:
+            roster = client.get("/api/employees/").json()
+        db = SessionLocal()
+        try:
+            expected = get_workloads(db)
+        finally:
+            db.close()
+        for employee in roster:
+            counts = expected.get(employee["id"], {})
+            assert employee["current_workload"] == counts.get("pending", 0) + counts.get("in_progress", 0)
+        print(f"workload counter: roster served with {counter.count} queries, counts match the database")
+    finally:
+        workload_counter.enabled = False
+        workload_counter.reset()
+
+
+def main():
+    baseline = None
+    for employees, rows in [(3, 10), (30, 1000), (300, 10000)]:
+        _, _, counts = measure(employees, rows)
+        print(f"employees={employees:<4} services={rows:<6} {counts}")
+        if baseline is None:
+            baseline = counts
+        assert counts == baseline, f"Query count grew with row count: {baseline} -> {counts}"
+
+    check_counter()
+    print("OK: query count is independent of the number of rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# Checks that every hot endpoint reads the services table through the index
+# declared for it. The schema is built by the migrations (not create_all), so
+# this also proves they produce what models.py declares. Each endpoint is
+# called, the statements it sends are captured and EXPLAINed, and the check
+# fails on a full scan of services or when the expected index is not used.
+#   python -m benchmarks.explain_indexes
+#   python -m benchmarks.explain_indexes --url mysql+pymysql://root:@localhost/carwash_bench
+import argparse
+import os
+import re
+import sys
+import tempfile
+from datetime import date
+
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.generate import generate, has_data
+from benchmarks.harness import make_client
+from database import Base
+from migrate import upgrade
+
+SERVICES_TABLE = re.compile(r"\bservices\b")
+
+# (name, path, index the services lookup must use)
+ENDPOINTS = [
+    ("services_list", "/api/services/?limit=50", "idx_service_start"),
+    ("services_by_employee", "/api/services/?limit=50&employee_id=3&status=completed", "idx_service_employee_status"),
+    ("services_pending", "/api/services/pending", "idx_service_status_end"),
+    ("services_queue", "/api/services/queue", "idx_service_status_end"),
+    ("employee_workload", "/api/employees/3/workload", "idx_service_employee_status"),
+    ("dashboard_stats", "/api/reports/dashboard-stats", "idx_service_status_end"),
+    ("daily_income", f"/api/reports/daily-income?date={date.today().isoformat()}", "idx_service_status_end"),
+    ("vehicle_history", "/api/reports/vehicle-history/PLT0000042?limit=20", "idx_service_vehicle_start"),
+    ("vehicle_summary", "/api/reports/vehicle-history/PLT0000042/summary", "idx_service_vehicle_start"),
+]
+
+
+class StatementCapture:
+    # Statements (with their parameters) that touch the services table
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith("SELECT") and SERVICES_TABLE.search(statement):
+            self.statements.append((statement, parameters))
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._before_cursor_execute)
+
+
+def explain(connection, statement: str, parameters):
+    # (table, index or None, full scan) for every table access in the plan
+    if connection.dialect.name == "sqlite":
+        accesses = []
+        for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters):
+            match = re.match(r"(SCAN|SEARCH) (\w+)(?: AS \w+)?(?: USING (?:COVERING )?INDEX (\w+))?", row.detail)
+            if match:
+                kind, table, index = match.groups()
+                accesses.append((table, index, kind == "SCAN" and index is None))
+        return accesses
+    # MySQL: type ALL is a full table scan
+    result = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+    return [(row["table"], row["key"], row["type"] == "ALL") for row in result.mappings()]
+
+
+def check_endpoint(SessionLocal, path: str, expected_index: str) -> list:
+    engine = SessionLocal.kw["bind"]
+    # A new app per endpoint so no in-process cache hides the query
+    client = make_client(SessionLocal)
+    with StatementCapture(engine) as capture:
+        response = client.get(path)
+    response.raise_for_status()
+    if not capture.statements:
+        return ["no statement read the services table"]
+
+    problems, indexes = [], set()
+    with engine.connect() as connection:
+        for statement, parameters in capture.statements:
+            for table, index, full_scan in explain(connection, statement, parameters):
+                if table != "services" and not table.startswith("services_"):
+                    continue
+                indexes.add(index)
+                if full_scan:
+                    problems.append(f"full scan of services in: {' '.join(statement.split())[:160]}")
+    if expected_index not in indexes:
+        problems.append(f"expected {expected_index}, plan used {sorted(str(index) for index in indexes)}")
+    return problems
+
+
+def check_schema(engine) -> list:
+    # Differences between the migrated database and models.py
+    with engine.connect() as connection:
+        return [str(difference) for difference in compare_metadata(MigrationContext.configure(connection), Base.metadata)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="Database to check (default: a new SQLite file); migrated to head first")
+    parser.add_argument("--services", type=int, default=50000, help="Services to generate when the database is empty")
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'explain.db')}"
+    engine = create_engine(url, connect_args={"check_same_thread": False} if url.startswith("sqlite") else {})
+    upgrade(engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    if not has_data(SessionLocal):
+        generate(SessionLocal, vehicles=max(args.services // 20, 100), employees=20, services=args.services, supplies=20, used_supplies=args.services)
+    # Fresh statistics on MySQL, whose index dives see how few services are
+    # open. SQLite is left unanalyzed: without STAT4 its statistics assume
+    # every status is equally common and would send it to full scans that
+    # MySQL does not make.
+    if engine.dialect.name == "mysql":
+        with engine.begin() as connection:
+            connection.exec_driver_sql("ANALYZE TABLE services")
+
+    failures = 0
+    drift = check_schema(engine)
+    for difference in drift:
+        print(f"FAIL schema: migrations and models differ: {difference}")
+    failures += len(drift)
+
+    for name, path, expected_index in ENDPOINTS:
+        problems = check_endpoint(SessionLocal, path, expected_index)
+        print(f"{'FAIL' if problems else 'OK  '} {name:<22} {expected_index}")
+        for problem in problems:
+            print(f"       {problem}")
+        failures += bool(problems)
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
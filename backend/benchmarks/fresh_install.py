@@ -0,0 +1,67 @@
+# Checks that a new database is usable as soon as the migrations have run:
+# an empty database is migrated to head and a vehicle, an employee and one
+# service of every seeded type are created through the API, the services
+# both with an explicit employee and assigned by the scheduler.
+#   python -m benchmarks.fresh_install
+#   python -m benchmarks.fresh_install --url mysql+pymysql://root:@localhost/carwash_fresh
+import argparse
+import os
+import sys
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.harness import make_client
+from migrate import upgrade
+import models
+
+
+def check(SessionLocal) -> list:
+    client = make_client(SessionLocal)
+    db = SessionLocal()
+    try:
+        service_type_ids = [service_type_id for service_type_id, in db.query(models.ServiceType.id).order_by(models.ServiceType.id)]
+    finally:
+        db.close()
+    if not service_type_ids:
+        return ["the migrations left service_types empty"]
+
+    vehicle = client.post("/api/vehicles/", json={"plate_number": "NEW 001", "vehicle_type": "car", "client_name": "Fresh", "client_phone": "555"})
+    employee = client.post("/api/employees/", json={"name": "Fresh", "position": "washer", "shift": "morning"})
+    if vehicle.status_code != 201 or employee.status_code != 201:
+        return [f"setup failed: vehicle {vehicle.status_code} {vehicle.text}, employee {employee.status_code} {employee.text}"]
+
+    problems = []
+    for service_type_id in service_type_ids:
+        for employee_id in (employee.json()["id"], None):
+            response = client.post("/api/services/", json={
+                "vehicle_id": vehicle.json()["id"],
+                "employee_id": employee_id,
+                "service_type_id": service_type_id
+            })
+            if response.status_code != 201:
+                problems.append(f"service type {service_type_id}, employee {employee_id}: {response.status_code} {response.text}")
+            elif not response.json()["eta"]:
+                problems.append(f"service type {service_type_id}, employee {employee_id}: no ETA")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="Empty database to migrate and check (default: a new SQLite file)")
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'fresh.db')}"
+    engine = create_engine(url, connect_args={"check_same_thread": False} if url.startswith("sqlite") else {})
+    upgrade(engine)
+    problems = check(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    for problem in problems:
+        print(f"FAIL {problem}")
+    if problems:
+        sys.exit(1)
+    print("OK: a freshly migrated database can create services")
+
+
+if __name__ == "__main__":
+    main()
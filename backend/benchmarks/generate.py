@@ -0,0 +1,179 @@
+# Fast bulk generator for realistic data volumes. Rows are produced in
+# chunks and written with executemany through Core inserts, so millions of
+# rows load in minutes on SQLite or a local MySQL container. The rollup
+# tables are rebuilt at the end so the reports read consistent data.
+#   python -m benchmarks.generate --url sqlite:///bench.db --scale full
+import argparse
+import time
+from datetime import datetime, timedelta
+from random import Random
+
+from sqlalchemy import event, func
+
+from benchmarks.harness import make_session_factory
+from revenue import rebuild_daily_revenue
+from service_stats import rebuild_service_type_stats
+import models
+
+SCALES = {
+    "small": {"vehicles": 2000, "employees": 20, "services": 40000, "supplies": 40, "used_supplies": 100000},
+    "medium": {"vehicles": 20000, "employees": 40, "services": 400000, "supplies": 60, "used_supplies": 1000000},
+    "full": {"vehicles": 100000, "employees": 60, "services": 2000000, "supplies": 80, "used_supplies": 5000000},
+}
+SERVICE_TYPES = [
+    ("basic_wash", "Exterior wash and basic interior cleaning", 30, 1.0),
+    ("full_service", "Complete interior and exterior cleaning", 60, 2.0),
+    ("premium_detail", "Full detailing service including wax and polish", 120, 5.0),
+    ("express_wash", "Quick exterior wash only", 15, 0.6),
+]
+VEHICLE_PRICES = {"car": 15.0, "suv": 20.0, "truck": 25.0, "motorcycle": 10.0}
+CHUNK_SIZE = 20000
+HISTORY_DAYS = 365
+# Services started this recently may still be open; everything older is done
+OPEN_WINDOW_HOURS = 4
+
+
+def _fast_sqlite_load(dbapi_connection, connection_record):
+    # Trade durability for load speed while generating; removed afterwards so
+    # the benchmark itself runs with the normal settings
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.execute("PRAGMA journal_mode=MEMORY")
+    cursor.close()
+
+
+def _insert_chunks(db, table, rows, total: int, label: str):
+    start = time.perf_counter()
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            db.execute(table.insert(), chunk)
+            db.commit()
+            chunk = []
+    if chunk:
+        db.execute(table.insert(), chunk)
+        db.commit()
+    print(f"  {label:<14} {total:>9} rows in {time.perf_counter() - start:.1f}s")
+
+
+def generate(SessionLocal, vehicles: int, employees: int, services: int, supplies: int, used_supplies: int, random_seed: int = 42):
+    random = Random(random_seed)
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        # The migrations already seed the service types and the prices
+        typed = {name for name, in db.query(models.ServiceType.name)}
+        db.add_all([
+            models.ServiceType(name=name, description=description, base_duration=duration, price_multiplier=multiplier)
+            for name, description, duration, multiplier in SERVICE_TYPES
+            if name not in typed
+        ])
+        priced = {name for name, in db.query(models.VehicleTypePrice.name)}
+        db.add_all([models.VehicleTypePrice(name=name, base_price=price) for name, price in VEHICLE_PRICES.items() if name not in priced])
+        db.add_all([
+            models.Employee(name=f"Employee {i}", position="washer", shift=random.choice(["morning", "afternoon"]), active=i % 10 != 0)
+            for i in range(employees)
+        ])
+        db.add_all([
+            models.Supply(
+                name=f"Supply {i}",
+                current_stock=random.uniform(20, 2000),
+                minimum_stock=random.choice([10, 20, 50]),
+                unit=random.choice(["liters", "units", "kg"])
+            )
+            for i in range(supplies)
+        ])
+        db.commit()
+        type_ids = dict(db.query(models.ServiceType.name, models.ServiceType.id))
+
+        # Kept to price each vehicle's services
+        vehicle_types = [random.choice(list(VEHICLE_PRICES)) for _ in range(vehicles)]
+        _insert_chunks(db, models.Vehicle.__table__, (
+            {
+                "plate_number": f"PLT{i:07d}",
+                "vehicle_type": vehicle_types[i],
+                "client_name": f"Client {i}",
+                "client_phone": f"555-{i:07d}"
+            }
+            for i in range(vehicles)
+        ), vehicles, "vehicles")
+
+        def service_rows():
+            for _ in range(services):
+                type_id = random.randrange(len(SERVICE_TYPES))
+                name, _, duration, multiplier = SERVICE_TYPES[type_id]
+                vehicle_id = random.randint(1, vehicles)
+                start_time = now - timedelta(seconds=random.randint(0, HISTORY_DAYS * 86400))
+                if now - start_time < timedelta(hours=OPEN_WINDOW_HOURS):
+                    service_status = random.choice(["pending", "in_progress", "completed"])
+                else:
+                    service_status = "completed"
+                yield {
+                    "vehicle_id": vehicle_id,
+                    "employee_id": random.randint(1, employees),
+                    "service_type_id": type_ids[name],
+                    "service_type": name,
+                    "status": service_status,
+                    "start_time": start_time,
+                    "end_time": start_time + timedelta(minutes=max(5, random.gauss(duration, duration / 4))) if service_status == "completed" else None,
+                    "total_cost": round(VEHICLE_PRICES[vehicle_types[vehicle_id - 1]] * multiplier, 2)
+                }
+        _insert_chunks(db, models.Service.__table__, service_rows(), services, "services")
+
+        def used_supply_rows():
+            for _ in range(used_supplies):
+                created_at = now - timedelta(seconds=random.randint(0, HISTORY_DAYS * 86400))
+                yield {
+                    "service_id": random.randint(1, services),
+                    "supply_id": random.randint(1, supplies),
+                    "quantity": round(random.uniform(0.1, 2.0), 2),
+                    "created_at": created_at
+                }
+        _insert_chunks(db, models.UsedSupply.__table__, used_supply_rows(), used_supplies, "used_supplies")
+
+        start = time.perf_counter()
+        rebuild_service_type_stats(db)
+        rebuild_daily_revenue(db)
+        print(f"  {'rollups':<14} rebuilt in {time.perf_counter() - start:.1f}s")
+    finally:
+        db.close()
+
+
+def has_data(SessionLocal) -> bool:
+    db = SessionLocal()
+    try:
+        return db.query(func.count(models.Service.id)).scalar() > 0
+    finally:
+        db.close()
+
+
+def prepare(url: str, scale: str, reuse: bool = True):
+    # Session factory for `url`, generating the data unless it is already there
+    SessionLocal = make_session_factory(url)
+    if reuse and has_data(SessionLocal):
+        print(f"reusing data in {url}")
+        return SessionLocal
+    engine = SessionLocal.kw["bind"]
+    fast_load = url.startswith("sqlite") and url != "sqlite://"
+    if fast_load:
+        engine.dispose()
+        event.listen(engine, "connect", _fast_sqlite_load)
+    print(f"generating '{scale}' data set in {url}")
+    start = time.perf_counter()
+    try:
+        generate(SessionLocal, **SCALES[scale])
+    finally:
+        if fast_load:
+            event.remove(engine, "connect", _fast_sqlite_load)
+            engine.dispose()
+    print(f"generated in {time.perf_counter() - start:.1f}s")
+    return SessionLocal
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill a database with generated car wash data")
+    parser.add_argument("--url", required=True, help="Database URL, e.g. sqlite:///bench.db or mysql+pymysql://root:@localhost/carwash_bench")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    args = parser.parse_args()
+    prepare(args.url, args.scale, reuse=False)
@@ -0,0 +1,161 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from random import Random
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base, get_db, get_async_db
+from dashboard import invalidate_dashboard_stats
+from workload import workload_counter
+from plate_cache import plate_cache
+from scheduler import scheduler
+from reference_data import invalidate_reference_data
+from http_cache import ConditionalGetMiddleware, response_cache, table_versions
+from request_metrics import RequestMetricsMiddleware, instrument_engine, request_metrics
+from routers import vehicles, services, employees, inventory, reports
+import models
+
+
+def make_session_factory(url: str = "sqlite://"):
+    # SQLite stand-in for MySQL; the in-memory database is a single connection
+    # shared across threads, file databases get a regular pool
+    if url == "sqlite://":
+        engine = create_engine(url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    elif url.startswith("sqlite"):
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+    else:
+        engine = create_engine(url)
+    if url.startswith("sqlite"):
+        # InnoDB enforces foreign keys and the write paths rely on it;
+        # SQLite only does when asked, per connection
+        event.listen(engine, "connect", lambda connection, record: connection.execute("PRAGMA foreign_keys=ON"))
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def make_async_session_factory(url: str):
+    # Async counterpart of make_session_factory, e.g. "sqlite+aiosqlite:///bench.db"
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    return async_sessionmaker(create_async_engine(url), autoflush=False)
+
+
+def make_app(SessionLocal, AsyncSessionLocal=None) -> FastAPI:
+    # Same routers and instrumentation as main.py, bound to the stand-in database
+    app = FastAPI()
+    app.add_middleware(ConditionalGetMiddleware)
+    app.add_middleware(RequestMetricsMiddleware)
+    instrument_engine(SessionLocal.kw["bind"])
+    if AsyncSessionLocal:
+        instrument_engine(AsyncSessionLocal.kw["bind"].sync_engine)
+    app.include_router(vehicles.router, prefix="/api/vehicles")
+    app.include_router(services.router, prefix="/api/services")
+    app.include_router(employees.router, prefix="/api/employees")
+    app.include_router(inventory.router, prefix="/api/inventory")
+    app.include_router(reports.router, prefix="/api/reports")
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    # Without an async factory the async routers get a sync session, as with DB_ASYNC=false
+    app.dependency_overrides[get_async_db] = override_get_async_db if AsyncSessionLocal else override_get_db
+
+    # In-process caches must not carry over from a previous stand-in database
+    invalidate_dashboard_stats()
+    workload_counter.reset()
+    plate_cache.invalidate()
+    scheduler.reset()
+    invalidate_reference_data()
+    table_versions.reset()
+    response_cache.invalidate()
+    request_metrics.reset()
+    return app
+
+
+def make_client(SessionLocal, AsyncSessionLocal=None) -> TestClient:
+    return TestClient(make_app(SessionLocal, AsyncSessionLocal))
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._before_cursor_execute)
+
+
+@contextmanager
+def count_queries(SessionLocal):
+    with QueryCounter(SessionLocal.kw["bind"]) as counter:
+        yield counter
+
+
+def seed(db, vehicles: int = 10, employees: int = 3, services: int = 100, random_seed: int = 42):
+    random = Random(random_seed)
+    service_types = ["basic_wash", "full_service", "premium_detail", "express_wash"]
+    db.add_all([
+        models.ServiceType(name=name, base_duration=duration, price_multiplier=multiplier)
+        for name, duration, multiplier in zip(service_types, [30, 60, 120, 15], [1.0, 2.0, 5.0, 0.6])
+    ])
+    db.add_all([
+        models.VehicleTypePrice(name=name, base_price=price)
+        for name, price in [("car", 15.0), ("suv", 20.0), ("truck", 25.0), ("motorcycle", 10.0)]
+    ])
+    db.add_all([
+        models.Vehicle(
+            plate_number=f"PLT{i:06d}",
+            vehicle_type=random.choice(list(models.VehicleType)).value,
+            client_name=f"Client {i}",
+            client_phone=f"555-{i:06d}"
+        )
+        for i in range(vehicles)
+    ])
+    db.add_all([
+        models.Employee(name=f"Employee {i}", position="washer", shift="morning", active=True)
+        for i in range(employees)
+    ])
+    db.flush()
+
+    now = datetime.utcnow()
+    rows = []
+    for i in range(services):
+        start_time = now - timedelta(minutes=random.randint(0, 60 * 24 * 30))
+        service_status = random.choice(["pending", "in_progress", "completed"])
+        type_index = random.randrange(len(service_types))
+        rows.append({
+            "vehicle_id": random.randint(1, vehicles),
+            "employee_id": random.randint(1, employees),
+            "service_type_id": type_index + 1,
+            "service_type": service_types[type_index],
+            "status": service_status,
+            "start_time": start_time,
+            "end_time": start_time + timedelta(minutes=random.randint(10, 150)) if service_status == "completed" else None,
+            "total_cost": 20.00
+        })
+    db.execute(models.Service.__table__.insert(), rows)
+    db.commit()
@@ -0,0 +1,87 @@
+# Checks POST /api/inventory/use: the statements per request must not depend
+# on how many supplies a service used, and concurrent requests against the
+# same supplies must deduct every quantity exactly once and never push a
+# stock below zero.
+#   python -m benchmarks.inventory_usage --requests 200 --concurrency 20
+import argparse
+import asyncio
+import os
+import tempfile
+
+import httpx
+
+from benchmarks.harness import make_session_factory, make_app, make_client, count_queries, seed
+import models
+
+
+def add_supplies(SessionLocal, count: int, stock: float):
+    db = SessionLocal()
+    db.add_all([
+        models.Supply(name=f"Supply {i}", current_stock=stock, minimum_stock=stock / 10, unit="liters")
+        for i in range(count)
+    ])
+    db.commit()
+    db.close()
+
+
+def statements_per_request():
+    SessionLocal = make_session_factory()
+    db = SessionLocal()
+    seed(db, vehicles=10, employees=3, services=50)
+    db.close()
+    add_supplies(SessionLocal, 50, 1000)
+    client = make_client(SessionLocal)
+
+    for supplies in (1, 10, 50):
+        items = [{"supply_id": supply_id, "quantity": 1.5} for supply_id in range(1, supplies + 1)]
+        with count_queries(SessionLocal) as counter:
+            response = client.post("/api/inventory/use", json={"service_id": 1, "items": items})
+        assert response.status_code == 201, response.text
+        print(f"supplies={supplies:<3} statements={counter.count}")
+
+    with count_queries(SessionLocal) as counter:
+        low_stock = client.get("/api/inventory/low-stock").json()
+    print(f"low-stock: {len(low_stock)} supplies, {counter.count} statements")
+
+
+async def concurrent_usage(requests: int, concurrency: int):
+    with tempfile.TemporaryDirectory() as directory:
+        SessionLocal = make_session_factory(f"sqlite:///{os.path.join(directory, 'inventory.db')}")
+        db = SessionLocal()
+        seed(db, vehicles=10, employees=3, services=50)
+        db.close()
+        # Not enough stock for every request: some have to be refused
+        add_supplies(SessionLocal, 3, requests * 0.75)
+        app = make_app(SessionLocal)
+
+        semaphore = asyncio.Semaphore(concurrency)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            async def use(i: int):
+                async with semaphore:
+                    return await client.post("/api/inventory/use", json={
+                        "service_id": 1 + i % 50,
+                        "items": [{"supply_id": 1, "quantity": 1}, {"supply_id": 2, "quantity": 0.5}, {"supply_id": 3, "quantity": 0.25}]
+                    })
+
+            responses = await asyncio.gather(*(use(i) for i in range(requests)))
+
+        accepted = sum(response.status_code == 201 for response in responses)
+        refused = sum(response.status_code == 409 for response in responses)
+        db = SessionLocal()
+        stock = {supply.id: supply.current_stock for supply in db.query(models.Supply)}
+        db.close()
+
+    expected = {1: requests * 0.75 - accepted, 2: requests * 0.75 - accepted * 0.5, 3: requests * 0.75 - accepted * 0.25}
+    print(f"{requests} concurrent requests: {accepted} accepted, {refused} refused for insufficient stock")
+    print(f"final stock {stock}, expected {expected}")
+    ok = stock == expected and min(stock.values()) >= 0 and accepted + refused == requests
+    print("OK: every accepted quantity deducted once, no negative stock" if ok else "FAIL")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    statements_per_request()
+    asyncio.run(concurrent_usage(args.requests, args.concurrency))
@@ -0,0 +1,84 @@
+# Default vs FAST_JSON serialization of the big listings. The default path
+# builds an ORM instance per row, validates it against the response model
+# and encodes through jsonable_encoder; the fast path fetches tuples and
+# hands dicts to orjson. For each size: time per response (best of
+# --repeats), statements and body size, and that both paths return the same
+# bytes and cursor. The body cache is off so every request runs the route.
+#   python -m benchmarks.json_serialization --rows 10000 100000
+import argparse
+import json
+import sys
+import time
+
+from benchmarks.harness import make_session_factory, make_client, count_queries, seed
+from http_cache import response_cache
+import fast_json
+
+# (name, path, params)
+ENDPOINTS = [
+    ("get_all_vehicles", "/api/vehicles/", {}),
+    ("get_all_vehicles paged", "/api/vehicles/", {"limit": 1000}),
+    ("get_all_services", "/api/services/", {}),
+    ("get_all_services paged", "/api/services/", {"limit": 1000}),
+    ("get_pending_services", "/api/services/pending", {}),
+]
+
+
+def measure(client, SessionLocal, path: str, params: dict, fast: bool, repeats: int):
+    fast_json.FAST_JSON = fast
+    best = None
+    for _ in range(repeats):
+        with count_queries(SessionLocal) as counter:
+            start = time.perf_counter()
+            response = client.get(path, params=params)
+            elapsed = time.perf_counter() - start
+        response.raise_for_status()
+        best = elapsed if best is None else min(best, elapsed)
+    return best, counter.count, response
+
+
+def run(rows: int, repeats: int) -> int:
+    SessionLocal = make_session_factory()
+    db = SessionLocal()
+    seed(db, vehicles=rows, employees=10, services=rows)
+    db.close()
+    client = make_client(SessionLocal)
+
+    failures = 0
+    for name, path, params in ENDPOINTS:
+        default_time, default_count, default = measure(client, SessionLocal, path, params, False, repeats)
+        fast_time, fast_count, fast = measure(client, SessionLocal, path, params, True, repeats)
+        problems = []
+        if fast.content != default.content:
+            problems.append("bodies differ" if json.loads(fast.content) != json.loads(default.content) else "same JSON, different bytes")
+        if fast.headers.get("x-next-cursor") != default.headers.get("x-next-cursor"):
+            problems.append("cursors differ")
+        if not fast.headers.get("etag"):
+            problems.append("fast path dropped the ETag")
+        print(f"{'FAIL' if problems else 'OK  '} rows={rows:<7} {name:<24} {len(default.content) / 1024:8.0f}KB  "
+              f"default={default_time * 1000:7.1f}ms/{default_count} stmts  "
+              f"fast={fast_time * 1000:7.1f}ms/{fast_count} stmts  x{default_time / fast_time:.1f}")
+        for problem in problems:
+            print(f"       {problem}")
+        failures += bool(problems)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000], help="Vehicles and services seeded")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    enabled, maxsize = fast_json.FAST_JSON, response_cache.maxsize
+    response_cache.maxsize = 0
+    try:
+        failures = sum(run(rows, args.repeats) for rows in args.rows)
+    finally:
+        fast_json.FAST_JSON, response_cache.maxsize = enabled, maxsize
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
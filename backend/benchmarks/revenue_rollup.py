@@ -0,0 +1,58 @@
+# Backfills the daily_revenue rollup, completes and reopens services through
+# the API, and checks the range income report against per-day totals
+# computed from the services table.
+#
+# Usage (from the backend directory):
+#   python -m benchmarks.revenue_rollup
+import time
+from datetime import date, timedelta
+
+from benchmarks.harness import make_session_factory, make_client, count_queries, seed
+from revenue import rebuild_daily_revenue
+import models
+
+
+def main():
+    SessionLocal = make_session_factory()
+    db = SessionLocal()
+    try:
+        seed(db, vehicles=1000, employees=20, services=50000)
+        start = time.perf_counter()
+        rows = rebuild_daily_revenue(db)
+        print(f"backfill: {rows} rollup rows in {(time.perf_counter() - start) * 1000:.1f}ms")
+        open_ids = [row.id for row in db.query(models.Service.id).filter(models.Service.status != "completed").limit(50)]
+    finally:
+        db.close()
+
+    client = make_client(SessionLocal)
+    for service_id in open_ids:
+        client.patch(f"/api/services/{service_id}/status", json={"status": "completed"}).raise_for_status()
+    for service_id in open_ids[:10]:
+        client.patch(f"/api/services/{service_id}/status", json={"status": "pending"}).raise_for_status()
+
+    date_to = date.today()
+    date_from = date_to - timedelta(days=45)
+    for group_by in ["day", "week", "month"]:
+        for by in [None, "service_type", "employee"]:
+            params = {"from": date_from.isoformat(), "to": date_to.isoformat(), "group_by": group_by}
+            if by:
+                params["by"] = by
+            with count_queries(SessionLocal) as counter:
+                start = time.perf_counter()
+                response = client.get("/api/reports/income", params=params)
+                elapsed = time.perf_counter() - start
+            response.raise_for_status()
+            print(f"group_by={group_by:<5} by={str(by):<12} rows={len(response.json()):<4} "
+                  f"queries={counter.count} time={elapsed * 1000:.1f}ms")
+
+    daily = client.get("/api/reports/income", params={"from": date_from.isoformat(), "to": date_to.isoformat()}).json()
+    for item in daily:
+        expected = client.get("/api/reports/daily-income", params={"date": item["period"]}).json()
+        assert item["services_count"] == expected["services_count"], (item, expected)
+        assert abs(item["total_income"] - expected["total_income"]) < 1e-6, (item, expected)
+
+    print("OK: rollup matches the services table")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# Replays a busy day against the scheduler on a simulated clock: cars arrive
+# at random through the day, each is assigned when it arrives, employees work
+# their queue in order and real durations scatter around the learned average.
+# Compares earliest-availability assignment with sending each car to the
+# employee with the fewest open services, reports the ETA error and the cost
+# of an assignment as the number of employees grows.
+#   python -m benchmarks.scheduling --employees 8 --arrivals 90
+import argparse
+import heapq
+import statistics
+import time
+from random import Random
+
+from scheduler import Scheduler, to_timestamp
+
+SERVICE_TYPES = {"basic_wash": 30, "full_service": 60, "premium_detail": 120, "express_wash": 15}
+DAY_START = 1_700_000_000.0
+DAY_HOURS = 10
+
+
+class Clock:
+    def __init__(self):
+        self.now = DAY_START
+
+    def __call__(self):
+        return self.now
+
+
+def simulate(policy: str, employees: int, arrivals: int, random_seed: int = 7) -> dict:
+    random = Random(random_seed)
+    clock = Clock()
+    scheduler = Scheduler(refresh_seconds=float("inf"), clock=clock)
+    scheduler.load_state([(employee_id, True) for employee_id in range(1, employees + 1)], [], SERVICE_TYPES)
+
+    arrival_times = sorted(DAY_START + random.uniform(0, DAY_HOURS * 3600) for _ in range(arrivals))
+    events = [(arrival, 0, "arrive", service_id) for service_id, arrival in enumerate(arrival_times, start=1)]
+    heapq.heapify(events)
+
+    queues = {employee_id: [] for employee_id in range(1, employees + 1)}
+    busy = set()
+    open_counts = {employee_id: 0 for employee_id in queues}
+    service_types, arrived, predicted, waits, eta_errors = {}, {}, {}, [], []
+    assign_time = 0.0
+
+    def start_next(employee_id: int):
+        if employee_id in busy or not queues[employee_id]:
+            return
+        service_id = queues[employee_id].pop(0)
+        busy.add(employee_id)
+        waits.append(clock.now - arrived[service_id])
+        scheduler.status_changed(service_id, employee_id, service_types[service_id], "in_progress")
+        minutes = max(5.0, random.gauss(SERVICE_TYPES[service_types[service_id]], SERVICE_TYPES[service_types[service_id]] * 0.25))
+        heapq.heappush(events, (clock.now + minutes * 60, 1, "finish", (service_id, employee_id)))
+
+    while events:
+        clock.now, _, kind, data = heapq.heappop(events)
+        if kind == "arrive":
+            service_id = data
+            service_type = random.choice(list(SERVICE_TYPES))
+            service_types[service_id], arrived[service_id] = service_type, clock.now
+            start = time.perf_counter()
+            if policy == "earliest":
+                job = scheduler.reserve(service_type)
+                scheduler.confirm(job, service_id)
+                employee_id = job.employee_id
+            else:
+                employee_id = min(open_counts, key=lambda employee: (open_counts[employee], employee))
+                scheduler.service_created(service_id, employee_id, service_type)
+            assign_time += time.perf_counter() - start
+            open_counts[employee_id] += 1
+            predicted[service_id] = to_timestamp(scheduler.eta(None, service_id)["eta"])
+            queues[employee_id].append(service_id)
+            start_next(employee_id)
+        else:
+            service_id, employee_id = data
+            eta_errors.append(abs(clock.now - predicted[service_id]) / 60)
+            scheduler.status_changed(service_id, employee_id, service_types[service_id], "completed")
+            open_counts[employee_id] -= 1
+            busy.discard(employee_id)
+            start_next(employee_id)
+
+    return {
+        "policy": policy,
+        "mean_wait_min": statistics.mean(waits) / 60,
+        "p95_wait_min": sorted(waits)[int(len(waits) * 0.95)] / 60,
+        "max_wait_min": max(waits) / 60,
+        "day_ends_after_h": (clock.now - DAY_START) / 3600,
+        "mean_eta_error_min": statistics.mean(eta_errors),
+        "assign_us": assign_time / arrivals * 1e6
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--employees", type=int, default=8)
+    # About 15% more work than the employees can do in the day
+    parser.add_argument("--arrivals", type=int, default=90)
+    args = parser.parse_args()
+
+    print(f"busy day: {args.arrivals} cars over {DAY_HOURS}h, {args.employees} employees")
+    for policy in ("fewest_open", "earliest"):
+        result = simulate(policy, args.employees, args.arrivals)
+        print("  ".join(f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}" for key, value in result.items()))
+
+    # Cost of one assignment as the shop grows, same load per employee
+    for employees in (10, 100, 1000, 10000):
+        result = simulate("earliest", employees, employees * args.arrivals // args.employees)
+        print(f"employees={employees:<6} {result['assign_us']:.1f}us per assignment")
@@ -0,0 +1,109 @@
+# HTTP load against real server processes: the development server (run.py,
+# one uvicorn process with auto-reload) and the production one (serve.py,
+# gunicorn with N uvicorn workers), reporting requests/sec and p50/p99 for
+# the same request mix. Both use the database in .env; --paths can pick
+# endpoints that do not need it to isolate the server overhead.
+#   python -m benchmarks.server_load --workers 4 --requests 5000
+#   python -m benchmarks.server_load --paths /metrics
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATHS = ["/api/employees/", "/api/services/?limit=50", "/api/reports/dashboard-stats", "/api/inventory/low-stock"]
+RUN_PY_PORT = 8000
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def start_server(mode: str, workers: int, port: int):
+    if mode == "run.py":
+        return subprocess.Popen([sys.executable, "run.py"], cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    env = {**os.environ, "HOST": "127.0.0.1", "PORT": str(port), "WEB_CONCURRENCY": str(workers)}
+    return subprocess.Popen([sys.executable, "serve.py"], cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_until_ready(base_url: str, timeout: float = 60):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(f"{base_url}/metrics", timeout=1).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"server at {base_url} did not start")
+
+
+async def run_load(base_url: str, paths: list, requests: int, concurrency: int) -> dict:
+    latencies, errors = [], 0
+    pending = [paths[i % len(paths)] for i in range(requests)]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker():
+            nonlocal errors
+            while pending:
+                path = pending.pop()
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.TransportError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "requests_per_second": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "errors": errors
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--port", type=int, default=8001, help="Port for serve.py (run.py always uses 8000)")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--paths", nargs="+", default=DEFAULT_PATHS)
+    args = parser.parse_args()
+
+    results = {}
+    for mode, port in (("run.py", RUN_PY_PORT), ("serve.py", args.port)):
+        server = start_server(mode, args.workers, port)
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            wait_until_ready(base_url)
+            # Warm-up pass: connection pools, caches and worker imports
+            asyncio.run(run_load(base_url, args.paths, min(args.requests, 200), args.concurrency))
+            results[mode] = asyncio.run(run_load(base_url, args.paths, args.requests, args.concurrency))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+        result = results[mode]
+        label = mode if mode == "run.py" else f"serve.py ({args.workers} workers)"
+        print(f"{label:<24} {result['requests_per_second']:8.1f} req/s  p50={result['p50_ms']:7.2f}ms  "
+              f"p99={result['p99_ms']:7.2f}ms  errors={result['errors']}")
+
+    speedup = results["serve.py"]["requests_per_second"] / results["run.py"]["requests_per_second"]
+    print(f"serve.py throughput: {speedup:.2f}x run.py")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# Fan-out check for the /api/events push channel: opens many in-process
+# subscribers, drives service writes through the routers and reports how long
+# it takes for every subscriber to see every change, the statements each write
+# costs with and without listeners, and whether reconnecting clients resume
+# from the buffer or fall back to a snapshot.
+#   python -m benchmarks.service_events --subscribers 500 --writes 200
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from benchmarks.harness import make_session_factory, make_app, count_queries, seed
+from events import EventHub
+from routers import services
+import events
+import models
+
+
+async def read_events(hub: EventHub, subscriber, seq: int, expected: int) -> list:
+    received = []
+    async for frame in hub._generate(subscriber, [], seq):
+        if frame.startswith("id:"):
+            received.append(frame)
+            if len(received) == expected:
+                break
+    return received
+
+
+async def run(subscribers: int, writes: int):
+    SessionLocal = make_session_factory()
+    db = SessionLocal()
+    seed(db, vehicles=50, employees=5, services=500)
+    # Every write below has to change something: setting a status the
+    # service already has publishes nothing
+    db.query(models.Service).update({"status": "pending", "end_time": None})
+    db.commit()
+    db.close()
+
+    hub = events.service_events = services.service_events = EventHub(buffer_size=writes, queue_size=writes * 2 + 10)
+    app = make_app(SessionLocal)
+
+    db = SessionLocal()
+    with count_queries(SessionLocal) as counter:
+        snapshot = services.service_board_snapshot(db)
+    db.close()
+    print(f"snapshot: {len(snapshot['services'])} services, {counter.count} statements")
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def write(i: int):
+            if i % 2 == 0:
+                return await client.post("/api/services/", json={"vehicle_id": 1 + i % 50, "employee_id": 1 + i % 5, "service_type_id": 1})
+            return await client.patch(f"/api/services/{i}/status", json={"status": "in_progress"})
+
+        # Statements per write without listeners
+        with count_queries(SessionLocal) as counter:
+            for i in range(10):
+                await write(i)
+        print(f"no subscribers: {counter.count / 10:.1f} statements per write")
+
+        subscribed = [hub.subscribe() for _ in range(subscribers)]
+        first_seq = subscribed[0][2]
+        readers = [
+            asyncio.create_task(read_events(hub, subscriber, seq, writes))
+            for subscriber, _, seq in subscribed
+        ]
+
+        start = time.perf_counter()
+        with count_queries(SessionLocal) as counter:
+            for i in range(10, 10 + writes):
+                await write(i)
+        write_time = time.perf_counter() - start
+        received = await asyncio.gather(*readers)
+        delivery_time = time.perf_counter() - start
+
+    complete = sum(len(frames) == writes for frames in received)
+    print(f"{subscribers} subscribers: {counter.count / writes:.1f} statements per write, "
+          f"writes took {write_time:.2f}s, all delivered after {delivery_time:.2f}s")
+    print(f"subscribers with every event: {complete}/{subscribers}")
+
+    # Resume: from the middle of the buffer, from before it, from another epoch
+    middle = first_seq + writes // 2
+    _, replay, _ = hub.subscribe(f"{hub.epoch}-{middle}")
+    print(f"resume from {middle}: {len(replay)} buffered events replayed")
+    _, replay, _ = hub.subscribe(f"{hub.epoch}-0")
+    print(f"resume from before the buffer: {'snapshot' if replay is None else len(replay)}")
+    _, replay, _ = hub.subscribe(f"restarted-{middle}")
+    print(f"resume from another epoch: {'snapshot' if replay is None else len(replay)}")
+
+    sample = json.loads(received[0][-1].split("data: ", 1)[1])
+    print(f"last event payload: {sample}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--writes", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.subscribers, args.writes))
@@ -0,0 +1,55 @@
+# Verifies that the service listing endpoints issue a constant number of
+# queries regardless of how many services exist.
+#
+# Usage (from the backend directory):
+#   python -m benchmarks.service_queries
+import time
+
+from benchmarks.harness import make_session_factory, make_client, count_queries, seed
+import models
+
+
+def measure(rows: int):
+    SessionLocal = make_session_factory()
+    db = SessionLocal()
+    try:
+        seed(db, vehicles=max(rows // 10, 1), employees=10, services=rows)
+        pending_id = db.query(models.Service.id).filter(models.Service.status == "pending").first()[0]
+    finally:
+        db.close()
+
+    client = make_client(SessionLocal)
+    results = {}
+    for name, request in [
+        ("get_all_services", lambda: client.get("/api/services/")),
+        ("get_pending_services", lambda: client.get("/api/services/pending")),
+        ("update_service_status", lambda: client.patch(
+            f"/api/services/{pending_id}/status", json={"status": "in_progress"}
+        )),
+    ]:
+        with count_queries(SessionLocal) as counter:
+            start = time.perf_counter()
+            response = request()
+            elapsed = time.perf_counter() - start
+        response.raise_for_status()
+        results[name] = (counter.count, elapsed)
+    return results
+
+
+def main():
+    baseline = None
+    for rows in [10, 1000, 10000]:
+        results = measure(rows)
+        for name, (queries, elapsed) in results.items():
+            print(f"{name:<24} rows={rows:<6} queries={queries:<3} time={elapsed * 1000:.1f}ms")
+
+        counts = {name: queries for name, (queries, _) in results.items()}
+        if baseline is None:
+            baseline = counts
+        assert counts == baseline, f"Query count grew with row count: {baseline} -> {counts}"
+
+    print("OK: query count is independent of the number of rows")
+
+
+if __name__ == "__main__":
+    main()
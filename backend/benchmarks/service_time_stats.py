@@ -0,0 +1,55 @@
+# Compares the average-service-time report served from the running stats
+# table with the live GROUP BY aggregate, and checks both agree after
+# services are completed and reopened through the API.
+#
+# Usage (from the backend directory):
+#   python -m benchmarks.service_time_stats
+import time
+
+from benchmarks.harness import make_session_factory, make_client, count_queries, seed
+from service_stats import rebuild_service_type_stats
+import models
+
+
+def main():
+    SessionLocal = make_session_factory()
+    db = SessionLocal()
+    try:
+        seed(db, vehicles=1000, employees=20, services=50000)
+        rebuild_service_type_stats(db)
+        open_ids = [row.id for row in db.query(models.Service.id).filter(models.Service.status != "completed").limit(50)]
+    finally:
+        db.close()
+
+    client = make_client(SessionLocal)
+
+    for service_id in open_ids:
+        client.patch(f"/api/services/{service_id}/status", json={"status": "completed"}).raise_for_status()
+    for service_id in open_ids[:10]:
+        client.patch(f"/api/services/{service_id}/status", json={"status": "in_progress"}).raise_for_status()
+
+    for live in [False, True]:
+        with count_queries(SessionLocal) as counter:
+            start = time.perf_counter()
+            response = client.get("/api/reports/average-service-time", params={"live": live})
+            elapsed = time.perf_counter() - start
+        response.raise_for_status()
+        print(f"live={str(live):<5} queries={counter.count} time={elapsed * 1000:.1f}ms")
+        if live:
+            live_report = response.json()
+        else:
+            stats_report = response.json()
+
+    for from_stats, from_history in zip(stats_report, live_report):
+        assert from_stats["completed_services"] == from_history["completed_services"], (from_stats, from_history)
+        assert abs(from_stats["average_time"] - from_history["average_time"]) < 1e-6, (from_stats, from_history)
+        assert abs(from_stats["stddev_time"] - from_history["stddev_time"]) < 1e-3, (from_stats, from_history)
+        # Reopened services can be the extremes of their type
+        for field in ("min_time", "max_time"):
+            assert abs(from_stats[field] - from_history[field]) < 1e-3, (field, from_stats, from_history)
+
+    print("OK: running stats match the service history")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# Startup time of the API: how long `import main` takes in a fresh process,
+# and how long uvicorn with N workers takes until every worker has finished
+# its startup and the port answers. The database defaults to a non-routable
+# address, so any connection attempt on the startup path would hang there;
+# with the schema handled by migrate.py and the pool warmed up in the
+# background, startup should not depend on it.
+#   python -m benchmarks.startup --workers 4
+#   python -m benchmarks.startup --db-host 127.0.0.1 --db-port 3306
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from typing import Optional
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_COMPLETE = "Application startup complete"
+
+
+def measure_import(env: dict, runs: int) -> Optional[float]:
+    timings = []
+    for _ in range(runs):
+        try:
+            output = subprocess.check_output(
+                [sys.executable, "-c", "import time; start = time.perf_counter(); import main; print(time.perf_counter() - start)"],
+                cwd=BACKEND_DIR, env=env, text=True, stderr=subprocess.DEVNULL
+            )
+        except subprocess.CalledProcessError:
+            # e.g. a revision that still touched the database at import
+            return None
+        timings.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+
+def measure_server(env: dict, workers: int, port: int, timeout: float) -> dict:
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers)],
+        cwd=BACKEND_DIR, env=env, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True
+    )
+    result = {"first_response_s": None, "all_workers_ready_s": None}
+    started = []
+
+    def read_log():
+        for line in server.stderr:
+            if STARTUP_COMPLETE in line:
+                started.append(time.perf_counter() - start)
+
+    reader = threading.Thread(target=read_log, daemon=True)
+    reader.start()
+    try:
+        while time.perf_counter() - start < timeout:
+            if result["first_response_s"] is None:
+                try:
+                    if httpx.get(f"http://127.0.0.1:{port}/metrics", timeout=0.5).status_code == 200:
+                        result["first_response_s"] = time.perf_counter() - start
+                except httpx.TransportError:
+                    pass
+            if len(started) >= workers:
+                result["all_workers_ready_s"] = started[workers - 1]
+            if result["first_response_s"] is not None and result["all_workers_ready_s"] is not None:
+                break
+            time.sleep(0.01)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db-host", default="10.255.255.1", help="Defaults to an address that never answers")
+    parser.add_argument("--db-port", default="3306")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes for the import timing")
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    env = {**os.environ, "DB_HOST": args.db_host, "DB_PORT": args.db_port}
+    print(f"database at {args.db_host}:{args.db_port}")
+    import_time = measure_import(env, args.runs)
+    print(f"import main: {f'{import_time * 1000:.0f}ms (median of {args.runs})' if import_time is not None else 'failed'}")
+    result = measure_server(env, args.workers, args.port, args.timeout)
+    for key, label in (("first_response_s", "first response"), ("all_workers_ready_s", f"all {args.workers} workers ready")):
+        value = result[key]
+        print(f"{label}: {f'{value:.2f}s' if value is not None else f'not within {args.timeout:.0f}s'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# Concurrency check for PATCH /api/services/{id}/status. Round one taps
+# "completed" on every service several times at once, some of the taps
+# retries sharing an Idempotency-Key: each service must be completed
+# exactly once and every tap must see the same end time. Round two fires
+# thousands of random transitions at the same services; afterwards the
+# duration stats and the revenue rollup, which only the request that wins
+# a transition updates, must match what the services table says.
+#   python -m benchmarks.status_transitions --services 300 --requests 5000
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+from sqlalchemy import func
+
+from benchmarks.harness import make_session_factory, make_app, seed
+from service_stats import aggregate_service_times
+import models
+
+STATUSES = ["pending", "in_progress", "completed", "cancelled"]
+
+
+async def fire(app, requests: list, concurrency: int) -> list:
+    # requests: (service_id, status, idempotency key or None)
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60) as client:
+        async def send(service_id: int, status: str, key):
+            async with semaphore:
+                headers = {"Idempotency-Key": key} if key else {}
+                response = await client.patch(f"/api/services/{service_id}/status", json={"status": status}, headers=headers)
+                return service_id, status, key, response.status_code, response.json()
+
+        return await asyncio.gather(*(send(*request) for request in requests))
+
+
+def double_taps(app, SessionLocal, services: int, taps: int, concurrency: int) -> list:
+    requests = []
+    for service_id in range(1, services + 1):
+        key = str(uuid.uuid4())
+        requests += [(service_id, "completed", key)] * 2
+        requests += [(service_id, "completed", None)] * (taps - 2)
+    random.shuffle(requests)
+
+    start = time.perf_counter()
+    results = asyncio.run(fire(app, requests, concurrency))
+    elapsed = time.perf_counter() - start
+
+    problems = []
+    end_times = defaultdict(set)
+    for service_id, _, _, status_code, body in results:
+        if status_code != 200:
+            problems.append(f"service {service_id}: status {status_code} {body}")
+        else:
+            end_times[service_id].add(body["end_time"])
+    db = SessionLocal()
+    try:
+        stored = {row.id: row.end_time.isoformat() for row in db.query(models.Service.id, models.Service.end_time)}
+        completed = dict(db.query(models.ServiceTypeStats.service_type, models.ServiceTypeStats.completed_count))
+        revenue_count = db.query(func.sum(models.DailyRevenue.services_count)).scalar()
+    finally:
+        db.close()
+    for service_id, seen in end_times.items():
+        if seen != {stored[service_id]}:
+            problems.append(f"service {service_id}: taps saw end times {sorted(seen)}, stored {stored[service_id]}")
+    if sum(completed.values()) != services or revenue_count != services:
+        problems.append(f"{services} services completed, stats count {sum(completed.values())}, revenue count {revenue_count}")
+
+    print(f"double taps: {len(requests)} requests in {elapsed:.2f}s ({len(requests) / elapsed:.0f} req/s)")
+    return problems
+
+
+def random_transitions(app, services: int, requests: int, concurrency: int) -> list:
+    keys = {}
+    batch = []
+    for _ in range(requests):
+        service_id, status = random.randint(1, services), random.choice(STATUSES)
+        # Some requests are retried with the key of an earlier one
+        if keys and random.random() < 0.1:
+            service_id, status, key = random.choice(list(keys.values()))
+        else:
+            key = str(uuid.uuid4()) if random.random() < 0.5 else None
+            if key:
+                keys[key] = (service_id, status, key)
+        batch.append((service_id, status, key))
+
+    start = time.perf_counter()
+    results = asyncio.run(fire(app, batch, concurrency))
+    elapsed = time.perf_counter() - start
+
+    problems = []
+    codes = defaultdict(int)
+    by_key = defaultdict(list)
+    for service_id, status, key, status_code, body in results:
+        codes[status_code] += 1
+        if status_code not in (200, 409):
+            problems.append(f"service {service_id} -> {status}: status {status_code} {body}")
+        if key:
+            by_key[key].append((status_code, body))
+    for key, answers in by_key.items():
+        successes = [body for status_code, body in answers if status_code == 200]
+        if any(body != successes[0] for body in successes):
+            problems.append(f"key {key} answered differently: {successes}")
+
+    print(f"random transitions: {requests} requests in {elapsed:.2f}s ({requests / elapsed:.0f} req/s), "
+          f"responses {dict(sorted(codes.items()))}")
+    return problems
+
+
+def check_rollups(SessionLocal) -> list:
+    problems = []
+    db = SessionLocal()
+    try:
+        expected_stats = aggregate_service_times(db)
+        stats = {row.service_type: row for row in db.query(models.ServiceTypeStats)}
+        for service_type in set(expected_stats) | set(stats):
+            expected = expected_stats.get(service_type, {"completed_count": 0, "total_minutes": 0.0})
+            row = stats.get(service_type)
+            count, minutes = (row.completed_count, row.total_minutes) if row else (0, 0.0)
+            if count != expected["completed_count"] or abs(minutes - expected["total_minutes"]) > 1e-6 * max(1.0, minutes):
+                problems.append(f"stats {service_type}: {count} services / {minutes:.3f} min, "
+                                f"services table says {expected['completed_count']} / {expected['total_minutes']:.3f}")
+
+        day = func.date(models.Service.end_time)
+        expected_revenue = {
+            (str(row_day), service_type, employee_id): (count, total)
+            for row_day, service_type, employee_id, count, total in db.query(
+                day, models.Service.service_type, models.Service.employee_id,
+                func.count(models.Service.id), func.sum(models.Service.total_cost)
+            ).filter(models.Service.status == "completed").group_by(day, models.Service.service_type, models.Service.employee_id)
+        }
+        revenue = {
+            (str(row.day), row.service_type, row.employee_id): (row.services_count, row.revenue)
+            for row in db.query(models.DailyRevenue).filter(models.DailyRevenue.services_count != 0)
+        }
+        for key in set(expected_revenue) | set(revenue):
+            count, total = revenue.get(key, (0, 0.0))
+            expected_count, expected_total = expected_revenue.get(key, (0, 0.0))
+            if count != expected_count or abs(total - expected_total) > 1e-6:
+                problems.append(f"revenue {key}: {count} services / {total:.2f}, "
+                                f"services table says {expected_count} / {expected_total:.2f}")
+    finally:
+        db.close()
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--services", type=int, default=300)
+    parser.add_argument("--taps", type=int, default=5, help="Concurrent completions per service in round one")
+    parser.add_argument("--requests", type=int, default=5000, help="Random transitions in round two")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        SessionLocal = make_session_factory(f"sqlite:///{os.path.join(directory, 'transitions.db')}")
+        db = SessionLocal()
+        seed(db, vehicles=50, employees=5, services=args.services)
+        # Every service starts open, so the rollups only hold what the API added
+        db.query(models.Service).update({"status": "pending", "end_time": None})
+        db.commit()
+        db.close()
+        app = make_app(SessionLocal)
+
+        problems = double_taps(app, SessionLocal, args.services, args.taps, args.concurrency)
+        problems += random_transitions(app, args.services, args.requests, args.concurrency)
+        problems += check_rollups(SessionLocal)
+
+    for problem in problems[:20]:
+        print(f"FAIL {problem}")
+    if problems:
+        sys.exit(1)
+    print("OK: every transition applied exactly once, retries replayed, rollups match the services table")
+
+
+if __name__ == "__main__":
+    main()
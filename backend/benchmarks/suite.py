@@ -0,0 +1,201 @@
+# End-to-end benchmark of every router against a generated data set. Each
+# scenario sends the same number of requests through an in-process ASGI
+# client at a fixed concurrency and records throughput, p50/p99 latency and
+# the SQL statements and database time per request (from the request
+# metrics middleware). Results go to a JSON file; pass --baseline with an
+# earlier file to flag regressions.
+#   python -m benchmarks.suite --scale small --output results.json
+#   python -m benchmarks.suite --url sqlite:///bench.db --scale full --baseline results.json
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from random import Random
+
+import httpx
+
+from benchmarks.generate import SCALES, prepare
+from benchmarks.harness import make_app, make_async_session_factory
+from request_metrics import request_metrics
+
+# (name, method, path, request kwargs), built from a seeded random generator
+# so every run sends the same requests
+def scenarios(scale: dict):
+    today = date.today()
+
+    def plate(rng):
+        return f"PLT{rng.randrange(scale['vehicles']):07d}"
+
+    return [
+        ("services_list", lambda rng: ("GET", "/api/services/", {"params": {"limit": 50}})),
+        ("services_filtered", lambda rng: ("GET", "/api/services/", {"params": {"limit": 50, "employee_id": rng.randint(1, scale["employees"]), "status": "completed"}})),
+        ("services_pending", lambda rng: ("GET", "/api/services/pending", {})),
+        ("services_queue", lambda rng: ("GET", "/api/services/queue", {})),
+        ("service_prices", lambda rng: ("GET", "/api/services/prices", {})),
+        ("service_create", lambda rng: ("POST", "/api/services/", {"json": {"vehicle_id": rng.randint(1, scale["vehicles"]), "service_type_id": rng.randint(1, 4)}})),
+        ("service_status", lambda rng: ("PATCH", f"/api/services/{rng.randint(1, scale['services'])}/status", {"json": {"status": rng.choice(["in_progress", "completed"])}})),
+        ("vehicles_list", lambda rng: ("GET", "/api/vehicles/", {"params": {"limit": 50}})),
+        ("vehicle_by_plate", lambda rng: ("GET", f"/api/vehicles/{plate(rng)}", {})),
+        ("vehicle_create", lambda rng: ("POST", "/api/vehicles/", {"json": {"plate_number": f"NEW{rng.getrandbits(40):012d}", "vehicle_type": "car", "client_name": "Bench", "client_phone": "555"}})),
+        ("employees_list", lambda rng: ("GET", "/api/employees/", {})),
+        ("employee_workload", lambda rng: ("GET", f"/api/employees/{rng.randint(1, scale['employees'])}/workload", {})),
+        ("inventory_list", lambda rng: ("GET", "/api/inventory/", {})),
+        ("inventory_low_stock", lambda rng: ("GET", "/api/inventory/low-stock", {})),
+        ("inventory_forecast", lambda rng: ("GET", "/api/inventory/forecast", {})),
+        ("inventory_use", lambda rng: ("POST", "/api/inventory/use", {"json": {"service_id": rng.randint(1, scale["services"]), "items": [{"supply_id": rng.randint(1, scale["supplies"]), "quantity": 0.01}]}})),
+        ("dashboard_stats", lambda rng: ("GET", "/api/reports/dashboard-stats", {})),
+        ("daily_income", lambda rng: ("GET", "/api/reports/daily-income", {"params": {"date": (today - timedelta(days=rng.randint(0, 364))).isoformat()}})),
+        ("income_by_month", lambda rng: ("GET", "/api/reports/income", {"params": {"from": (today - timedelta(days=365)).isoformat(), "to": today.isoformat(), "group_by": "month", "by": "service_type"}})),
+        ("average_service_time", lambda rng: ("GET", "/api/reports/average-service-time", {})),
+        ("vehicle_history", lambda rng: ("GET", f"/api/reports/vehicle-history/{plate(rng)}", {"params": {"limit": 20}})),
+    ]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+async def run_scenario(client, build_request, requests: int, concurrency: int, random_seed: int) -> dict:
+    rng = Random(random_seed)
+    pending = [build_request(rng) for _ in range(requests)]
+    latencies, errors = [], 0
+    request_metrics.reset()
+
+    async def worker():
+        nonlocal errors
+        while pending:
+            method, url, kwargs = pending.pop()
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            # 409 is an expected answer for some writes (e.g. stock ran out)
+            if response.status_code >= 400 and response.status_code not in (404, 409):
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    statements = db_time = count = 0
+    for metrics in request_metrics.routes.values():
+        statements += metrics.statements.snapshot()["sum"]
+        db_time += metrics.db_time.snapshot()["sum"]
+        count += metrics.statements.snapshot()["count"]
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "requests_per_second": round(requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "statements_per_request": round(statements / count, 2) if count else None,
+        "db_ms_per_request": round(db_time / count * 1000, 2) if count else None
+    }
+
+
+async def run_suite(app, scale: dict, requests: int, concurrency: int, only=None) -> dict:
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        for index, (name, build_request) in enumerate(scenarios(scale)):
+            if only and name not in only:
+                continue
+            results[name] = await run_scenario(client, build_request, requests, concurrency, random_seed=index)
+            result = results[name]
+            print(f"{name:<22} {result['requests_per_second']:8.1f} req/s  p50={result['p50_ms']:8.2f}ms  "
+                  f"p99={result['p99_ms']:8.2f}ms  statements={result['statements_per_request']}  errors={result['errors']}")
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    # Median latency up by more than `threshold` (a fraction), or half a
+    # statement more per request. p99 is left out: with a few hundred
+    # requests it is close to the single slowest one. Cached endpoints vary
+    # a little in statements depending on when their TTLs expire, but a
+    # query added to a route shows up as a whole statement.
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            continue
+        if before["p50_ms"] and result["p50_ms"] > before["p50_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p50_ms {before['p50_ms']} -> {result['p50_ms']}")
+        if before.get("statements_per_request") is not None and result["statements_per_request"] is not None \
+                and result["statements_per_request"] > before["statements_per_request"] + 0.5:
+            regressions.append(f"{name}: statements/request {before['statements_per_request']} -> {result['statements_per_request']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="Sync database URL (default: a fresh copy of a cached SQLite data set). "
+                                      "Write scenarios change the data, so regenerate it between runs to compare them")
+    parser.add_argument("--async-url", help="Async URL for the same database, to benchmark DB_ASYNC mode")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--requests", type=int, default=300, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--only", nargs="*", help="Scenario names to run")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Allowed p50 increase before flagging (0.5 = 50%%)")
+    args = parser.parse_args()
+
+    url = args.url
+    if not url:
+        # Generate each scale once and run every time on a copy, so the
+        # writes of one run do not leak into the next
+        pristine = os.path.join(tempfile.gettempdir(), f"carwash-bench-{args.scale}.db")
+        prepare(f"sqlite:///{pristine}", args.scale).kw["bind"].dispose()
+        working = os.path.join(tempfile.mkdtemp(), "bench.db")
+        shutil.copyfile(pristine, working)
+        url = f"sqlite:///{working}"
+    SessionLocal = prepare(url, args.scale)
+    AsyncSessionLocal = make_async_session_factory(args.async_url) if args.async_url else None
+    app = make_app(SessionLocal, AsyncSessionLocal)
+
+    results = asyncio.run(run_suite(app, SCALES[args.scale], args.requests, args.concurrency, args.only))
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "database": url.split("://")[0],
+            "mode": "async" if AsyncSessionLocal else "sync",
+            "scale": args.scale,
+            "volumes": SCALES[args.scale],
+            "requests_per_scenario": args.requests,
+            "concurrency": args.concurrency,
+            "python": platform.python_version()
+        },
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("no regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# Times GET /api/inventory/forecast as the used_supplies table grows, checks
+# it stays at two statements, that a cached forecast costs none until usage
+# is recorded, and that the vectorized rates match a plain per-supply
+# computation.
+#   python -m benchmarks.supply_forecast --supplies 200 --rows 1000000
+import argparse
+import time
+from datetime import date, datetime, timedelta
+from random import Random
+
+from benchmarks.harness import make_session_factory, make_client, count_queries, seed
+from forecast import FORECAST_WINDOW_DAYS, FORECAST_AVERAGE_DAYS
+import models
+
+
+def add_usage(SessionLocal, supplies: int, rows: int, random_seed: int = 3):
+    random = Random(random_seed)
+    db = SessionLocal()
+    db.add_all([
+        models.Supply(name=f"Supply {i}", current_stock=random.uniform(50, 5000), minimum_stock=20, unit="liters")
+        for i in range(supplies)
+    ])
+    db.flush()
+    now = datetime.utcnow()
+    for start in range(0, rows, 50000):
+        db.execute(models.UsedSupply.__table__.insert(), [
+            {
+                "service_id": 1,
+                "supply_id": random.randint(1, supplies),
+                "quantity": round(random.uniform(0.1, 2.0), 2),
+                "created_at": now - timedelta(minutes=random.randint(0, 60 * 24 * 90))
+            }
+            for _ in range(min(50000, rows - start))
+        ])
+    db.commit()
+    db.close()
+
+
+def reference_rates(SessionLocal, supply_id: int):
+    # One supply the slow way, for comparison
+    db = SessionLocal()
+    first_day = date.today() - timedelta(days=FORECAST_WINDOW_DAYS)
+    totals = [0.0] * FORECAST_WINDOW_DAYS
+    for usage in db.query(models.UsedSupply).filter(models.UsedSupply.supply_id == supply_id):
+        offset = (usage.created_at.date() - first_day).days
+        if 0 <= offset < FORECAST_WINDOW_DAYS:
+            totals[offset] += usage.quantity
+    db.close()
+    return sum(totals) / FORECAST_WINDOW_DAYS, sum(totals[-FORECAST_AVERAGE_DAYS:]) / FORECAST_AVERAGE_DAYS
+
+
+def run(supplies: int, rows: int):
+    SessionLocal = make_session_factory()
+    db = SessionLocal()
+    seed(db, vehicles=10, employees=3, services=20)
+    db.close()
+    add_usage(SessionLocal, supplies, rows)
+    client = make_client(SessionLocal)
+
+    with count_queries(SessionLocal) as counter:
+        start = time.perf_counter()
+        forecast = client.get("/api/inventory/forecast").json()
+        elapsed = time.perf_counter() - start
+    print(f"usage rows={rows} supplies={supplies}: {elapsed * 1000:.0f}ms, {counter.count} statements")
+
+    with count_queries(SessionLocal) as counter:
+        start = time.perf_counter()
+        client.get("/api/inventory/forecast")
+        elapsed = time.perf_counter() - start
+    print(f"cached: {elapsed * 1000:.1f}ms, {counter.count} statements")
+
+    client.post("/api/inventory/use", json={"service_id": 1, "supply_id": 1, "quantity": 1})
+    with count_queries(SessionLocal) as counter:
+        client.get("/api/inventory/forecast")
+    print(f"after recording usage: {counter.count} statements")
+
+    mismatches = 0
+    for item in forecast[:5]:
+        average, moving_average = reference_rates(SessionLocal, item["supply_id"])
+        if abs(average - item["average_daily_usage"]) > 1e-6 or abs(moving_average - item["moving_average_daily_usage"]) > 1e-6:
+            mismatches += 1
+    print("OK: rates match the per-supply computation" if not mismatches else f"FAIL: {mismatches} supplies differ")
+    soonest = sorted((item for item in forecast if item["days_until_minimum"] is not None), key=lambda item: item["days_until_minimum"])[:3]
+    for item in soonest:
+        print(f"  {item['name']}: {item['moving_average_daily_usage']:.2f}/day, minimum in {item['days_until_minimum']} days ({item['minimum_stock_date']})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--supplies", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+    run(args.supplies, args.rows)
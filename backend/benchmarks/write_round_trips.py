@@ -0,0 +1,71 @@
+# Statements per write request against a budget: references are validated
+# in the same query that loads them (or by the foreign keys), and responses
+# are built from what was inserted instead of re-reading the row. Rejected
+# writes are checked too, since they now rely on constraint errors. Exits
+# non-zero when a write goes over its budget or answers the wrong status.
+#   python -m benchmarks.write_round_trips
+import sys
+
+from benchmarks.harness import make_session_factory, make_client, count_queries, seed
+import models
+
+# (name, method, path, body, expected status, statement budget[, headers])
+WRITES = [
+    ("create_service", "post", "/api/services/", {"vehicle_id": 2, "employee_id": 2, "service_type_id": 3}, 201, 2),
+    # The scheduler's pick is checked under a lock on the employee (one
+    # locking SELECT of the employee and their open services) before the
+    # vehicle read and the INSERT
+    ("create_service_assigned", "post", "/api/services/", {"vehicle_id": 3, "service_type_id": 1}, 201, 3),
+    ("create_service_no_vehicle", "post", "/api/services/", {"vehicle_id": 999, "employee_id": 1, "service_type_id": 1}, 404, 1),
+    ("create_service_no_employee", "post", "/api/services/", {"vehicle_id": 1, "employee_id": 999, "service_type_id": 1}, 404, 1),
+    ("service_in_progress", "patch", "/api/services/1/status", {"status": "in_progress"}, 200, 2),
+    ("service_completed", "patch", "/api/services/1/status", {"status": "completed"}, 200, 4),
+    ("service_completed_again", "patch", "/api/services/1/status", {"status": "completed"}, 200, 1),
+    ("service_cancel_completed", "patch", "/api/services/1/status", {"status": "cancelled"}, 409, 1),
+    ("service_reopen_keyed", "patch", "/api/services/1/status", {"status": "in_progress"}, 200, 6, {"Idempotency-Key": "reopen-1"}),
+    ("service_reopen_retried", "patch", "/api/services/1/status", {"status": "in_progress"}, 200, 1, {"Idempotency-Key": "reopen-1"}),
+    ("create_employee", "post", "/api/employees/", {"name": "New", "position": "washer", "shift": "evening"}, 201, 1),
+    ("employee_status", "patch", "/api/employees/1/status", {"active": True}, 200, 2),
+    ("create_vehicle", "post", "/api/vehicles/", {"plate_number": "new 001", "vehicle_type": "car", "client_name": "New", "client_phone": "555"}, 201, 1),
+    ("create_vehicle_duplicate", "post", "/api/vehicles/", {"plate_number": "NEW001", "vehicle_type": "car", "client_name": "New", "client_phone": "555"}, 400, 1),
+    ("create_supply", "post", "/api/inventory/", {"name": "Wax", "current_stock": 10, "minimum_stock": 2, "unit": "liters"}, 201, 1),
+    ("use_supplies", "post", "/api/inventory/use", {"service_id": 1, "supply_id": 1, "quantity": 1}, 201, 3),
+    ("use_supplies_no_service", "post", "/api/inventory/use", {"service_id": 9999, "supply_id": 1, "quantity": 1}, 404, 2),
+]
+
+
+def main():
+    SessionLocal = make_session_factory()
+    db = SessionLocal()
+    seed(db, vehicles=10, employees=3, services=50)
+    db.add(models.Supply(name="Soap", current_stock=100, minimum_stock=10, unit="liters"))
+    db.commit()
+    db.close()
+    client = make_client(SessionLocal)
+
+    # Loads the scheduler and reference data, and creates today's rollup
+    # rows for service 1, so the measured requests see the steady state
+    client.post("/api/services/", json={"vehicle_id": 1, "service_type_id": 1})
+    client.patch("/api/services/1/status", json={"status": "completed"})
+    client.patch("/api/services/1/status", json={"status": "pending"})
+
+    failures = 0
+    for name, method, path, body, expected_status, budget, *headers in WRITES:
+        with count_queries(SessionLocal) as counter:
+            response = client.request(method, path, json=body, headers=headers[0] if headers else None)
+        problems = []
+        if response.status_code != expected_status:
+            problems.append(f"status {response.status_code}, expected {expected_status}: {response.text[:200]}")
+        if counter.count > budget:
+            problems.append(f"{counter.count} statements, budget {budget}")
+        print(f"{'FAIL' if problems else 'OK  '} {name:<28} statements={counter.count} budget={budget}")
+        for problem in problems:
+            print(f"       {problem}")
+        failures += bool(problems)
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
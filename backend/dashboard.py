@@ -0,0 +1,49 @@
+import os
+from datetime import date, datetime
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+import models
+from cache import TTLCache
+
+dashboard_cache = TTLCache(ttl=float(os.getenv("DASHBOARD_CACHE_TTL", "10")))
+
+
+def _load_dashboard_stats(db: Session) -> dict:
+    # Calculate daily revenue (completed services for today)
+    today = date.today()
+    today_start = datetime.combine(today, datetime.min.time())
+    today_end = datetime.combine(today, datetime.max.time())
+
+    # All four metrics in a single round trip
+    pending_services, daily_revenue, active_employees, total_vehicles = db.query(
+        select(func.count(models.Service.id)).where(
+            models.Service.status.in_(["pending", "in_progress"])
+        ).scalar_subquery(),
+        select(func.sum(models.Service.total_cost)).where(
+            and_(
+                models.Service.status == "completed",
+                models.Service.end_time >= today_start,
+                models.Service.end_time <= today_end
+            )
+        ).scalar_subquery(),
+        select(func.count(models.Employee.id)).where(models.Employee.active == True).scalar_subquery(),
+        select(func.count(models.Vehicle.id)).scalar_subquery()
+    ).one()
+
+    return {
+        "pendingServices": pending_services,
+        "dailyRevenue": float(daily_revenue or 0),
+        "activeEmployees": active_employees,
+        "totalVehicles": total_vehicles
+    }
+
+
+def get_dashboard_stats(db: Session) -> dict:
+    return dashboard_cache.get_or_set(date.today(), lambda: _load_dashboard_stats(db))
+
+
+def invalidate_dashboard_stats():
+    # Called by the routers after writes that change any of the metrics
+    dashboard_cache.invalidate()
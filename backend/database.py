@@ -1,8 +1,15 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from typing import Dict, Union
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import logging
 import os
 from dotenv import load_dotenv
+from sqlalchemy.pool import Pool
+from pool_metrics import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool
 
 # Cargar variables de entorno desde el archivo .env
 load_dotenv()
@@ -16,17 +23,133 @@ DB_NAME = os.getenv("DB_NAME")
 
 # Crear la cadena de conexión para MySQL
 SQLALCHEMY_DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+SQLALCHEMY_ASYNC_DATABASE_URL = f"mysql+aiomysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# Usar el driver asíncrono (aiomysql) en los routers que lo soportan
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
+
+# Configuración del pool de conexiones
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+# Reciclar conexiones antes de que MySQL las cierre por wait_timeout
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Segundos de espera por una conexión libre antes de fallar
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Conexiones que se abren en segundo plano al arrancar (0 lo desactiva)
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", str(DB_POOL_SIZE)))
+
+logger = logging.getLogger(__name__)
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL
+    SQLALCHEMY_DATABASE_URL,
+    poolclass=InstrumentedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_timeout=DB_POOL_TIMEOUT,
+    # Verificar la conexión antes de usarla para descartar las caducadas
+    pool_pre_ping=True
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    async_engine = create_async_engine(
+        SQLALCHEMY_ASYNC_DATABASE_URL,
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_pre_ping=True
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False)
+
 Base = declarative_base()
 
+
+def engine_pools() -> Dict[str, Pool]:
+    # Pools por motor, con el nombre que las etiqueta en las métricas
+    pools = {"sync": engine.pool}
+    if async_engine is not None:
+        pools["async"] = async_engine.pool
+    return pools
+
+# Sesión entregada por get_async_db según DB_ASYNC
+DbSession = Union[Session, AsyncSession]
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    # Con DB_ASYNC=false se entrega una sesión síncrona que run_db ejecuta en el threadpool
+    if AsyncSessionLocal is None:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
+    else:
+        async with AsyncSessionLocal() as db:
+            yield db
+
+
+async def run_db(db, fn, *args, **kwargs):
+    # Ejecuta código ORM síncrono fn(session, ...) sin bloquear el event loop:
+    # sobre la sesión asíncrona con run_sync, o en el threadpool con la síncrona
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+def warm_up_pool(connections: int = DB_POOL_WARMUP) -> int:
+    # Abre `connections` conexiones a la vez y las devuelve al pool, para que
+    # las primeras peticiones no paguen el handshake con MySQL
+    opened = []
+    try:
+        for _ in range(min(connections, DB_POOL_SIZE)):
+            opened.append(engine.connect())
+    finally:
+        for connection in opened:
+            connection.close()
+    return len(opened)
+
+
+async def warm_up_async_pool(connections: int = DB_POOL_WARMUP) -> int:
+    opened = []
+    try:
+        for _ in range(min(connections, DB_POOL_SIZE)):
+            opened.append(await async_engine.connect())
+    finally:
+        for connection in opened:
+            await connection.close()
+    return len(opened)
+
+
+async def warm_up(retries: int = 5, delay: float = 1.0):
+    # Tarea de fondo del arranque: no retrasa el servicio ni falla si MySQL
+    # aún no está disponible, solo reintenta con espera creciente
+    for attempt in range(1, retries + 1):
+        try:
+            opened = await run_in_threadpool(warm_up_pool)
+            if async_engine is not None:
+                opened += await warm_up_async_pool()
+            logger.info("Connection pool warmed up with %d connections", opened)
+            return True
+        except Exception as err:
+            logger.warning("Connection pool warm-up failed (attempt %d of %d): %s", attempt, retries, err)
+            if attempt < retries:
+                await asyncio.sleep(delay * 2 ** (attempt - 1))
+    return False
+
+
+async def dispose_engines():
+    engine.dispose()
+    if async_engine is not None:
+        await async_engine.dispose()
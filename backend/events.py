@@ -0,0 +1,138 @@
+import asyncio
+import json
+import os
+import threading
+import uuid
+from collections import deque
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+EVENT_BUFFER_SIZE = int(os.getenv("EVENT_BUFFER_SIZE", "1000"))
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "256"))
+KEEPALIVE_SECONDS = 15
+RECONNECT_MILLISECONDS = 2000
+
+
+class Subscriber:
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.overflowed = False
+
+
+class EventHub:
+    # In-process fan-out of service board changes to Server-Sent Events
+    # clients. Every event is encoded once when it is published and the same
+    # frame is queued for each subscriber, so a change costs the same with one
+    # screen listening or hundreds. The last `buffer_size` events are kept so a
+    # client that reconnects can resume from its Last-Event-ID; clients that
+    # fell further behind get a new snapshot. Sequence numbers are local to the
+    # worker process, and the epoch in every event id changes on restart.
+
+    def __init__(self, buffer_size: int = EVENT_BUFFER_SIZE, queue_size: int = EVENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.epoch = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._buffer: deque = deque(maxlen=buffer_size)
+        self._subscribers = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def encode(self, seq: int, event_type: str, data: dict) -> str:
+        payload = json.dumps(jsonable_encoder(data), separators=(",", ":"))
+        return f"id: {self.epoch}-{seq}\nevent: {event_type}\ndata: {payload}\n\n"
+
+    def publish(self, event_type: str, data: dict) -> int:
+        # Called by the routers after commit, either from the threadpool or
+        # from the event loop thread; delivery always happens on the loop
+        with self._lock:
+            self._seq += 1
+            event = (self._seq, self.encode(self._seq, event_type, data))
+            self._buffer.append(event)
+            if self._loop is not None and self._subscribers:
+                self._loop.call_soon_threadsafe(self._fan_out, event)
+            return self._seq
+
+    def _fan_out(self, event: Tuple[int, str]):
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A client that stopped reading is dropped; it reconnects and
+                # resumes from the buffer or from a snapshot
+                subscriber.overflowed = True
+                self.unsubscribe(subscriber)
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Tuple[Subscriber, Optional[List[Tuple[int, str]]], int]:
+        # Must run on the event loop. Returns the new subscriber, the buffered
+        # events after last_event_id (None when the client needs a snapshot)
+        # and the sequence number the client is now up to date with.
+        subscriber = Subscriber(self.queue_size)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._subscribers.add(subscriber)
+            return subscriber, self._replay(last_event_id), self._seq
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def _replay(self, last_event_id: Optional[str]) -> Optional[List[Tuple[int, str]]]:
+        try:
+            epoch, seq = (last_event_id or "").rsplit("-", 1)
+            seq = int(seq)
+        except ValueError:
+            return None
+        if epoch != self.epoch or seq > self._seq:
+            return None
+        oldest = self._buffer[0][0] if self._buffer else self._seq + 1
+        if seq < oldest - 1:
+            return None
+        return [event for event in self._buffer if event[0] > seq]
+
+    async def _generate(self, subscriber: Subscriber, frames: List[str], seq: int):
+        try:
+            yield f"retry: {RECONNECT_MILLISECONDS}\n\n"
+            for frame in frames:
+                yield frame
+            while not (subscriber.overflowed and subscriber.queue.empty()):
+                try:
+                    event_seq, frame = await asyncio.wait_for(subscriber.queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                # Events already covered by the snapshot or the replay
+                if event_seq <= seq:
+                    continue
+                seq = event_seq
+                yield frame
+        finally:
+            self.unsubscribe(subscriber)
+
+    async def stream(self, last_event_id: Optional[str], load_snapshot: Callable[[], Awaitable[dict]]) -> StreamingResponse:
+        # Subscribing before the snapshot is loaded means no change can fall
+        # between the two; changes that land in both are sent again as deltas,
+        # which carry full state and are safe to apply twice
+        subscriber, replay, seq = self.subscribe(last_event_id)
+        try:
+            if replay is None:
+                frames = [self.encode(seq, "snapshot", await load_snapshot())]
+            else:
+                frames = [frame for _, frame in replay]
+        except BaseException:
+            self.unsubscribe(subscriber)
+            raise
+
+        return StreamingResponse(
+            self._generate(subscriber, frames, seq),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+
+service_events = EventHub()
@@ -0,0 +1,59 @@
+import os
+from typing import Dict, Iterable, List
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+
+# Large list endpoints can skip the ORM and the response model: rows are
+# fetched as plain tuples, turned into dicts through a schema built once at
+# import, and encoded straight to bytes by orjson. The JSON is the same as
+# the default path's. Opt-in: set FAST_JSON=true in .env (or the workers'
+# environment) and restart them; benchmarks/json_serialization.py shows the
+# gain on your data and checks both paths return the same bytes.
+FAST_JSON = os.getenv("FAST_JSON", "false").lower() == "true"
+
+
+def fast_json_enabled() -> bool:
+    return FAST_JSON
+
+
+class RowSchema:
+    # Response field -> column, in the order the row query selects them. A
+    # dotted field nests: "vehicle.plate_number" ends up as
+    # {"vehicle": {"plate_number": ...}}.
+
+    def __init__(self, fields: Dict[str, object]):
+        self.columns = tuple(fields.values())
+        self._names = tuple(fields)
+        self._flat = all("." not in name for name in self._names)
+        # (key, column index) or (key, ((subkey, column index), ...))
+        layout: Dict[str, object] = {}
+        for index, name in enumerate(self._names):
+            key, _, subkey = name.partition(".")
+            if subkey:
+                layout.setdefault(key, []).append((subkey, index))
+            else:
+                layout[key] = index
+        self._layout = tuple(
+            (key, value if isinstance(value, int) else tuple(value)) for key, value in layout.items()
+        )
+
+    def dicts(self, rows: Iterable) -> List[dict]:
+        if self._flat:
+            names = self._names
+            return [dict(zip(names, row)) for row in rows]
+        layout = self._layout
+        return [
+            {
+                key: row[value] if isinstance(value, int) else {subkey: row[index] for subkey, index in value}
+                for key, value in layout
+            }
+            for row in rows
+        ]
+
+
+def json_response(content, response: Response) -> ORJSONResponse:
+    # Returning a Response bypasses the route's response_model; the headers
+    # the route and its dependencies (ETag, cursor) set on the injected
+    # response are carried over
+    return ORJSONResponse(content, headers=dict(response.headers))
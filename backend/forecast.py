@@ -0,0 +1,120 @@
+import os
+from datetime import date, datetime, timedelta
+from typing import List
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import models
+from cache import TTLCache
+
+FORECAST_WINDOW_DAYS = 28
+FORECAST_AVERAGE_DAYS = 7
+
+# Dropped whenever usage or stock changes; the TTL only bounds how long
+# changes made by other worker processes go unseen
+forecast_cache = TTLCache(ttl=float(os.getenv("FORECAST_CACHE_TTL", "3600")))
+
+
+def _daily_usage(db: Session, supply_ids: np.ndarray, first_day: date, days: int) -> np.ndarray:
+    # supplies x days matrix of quantities used, from one GROUP BY over the
+    # window; the table is never read row by row
+    day = func.date(models.UsedSupply.created_at)
+    rows = db.query(
+        models.UsedSupply.supply_id,
+        day,
+        func.sum(models.UsedSupply.quantity)
+    ).filter(
+        models.UsedSupply.created_at >= datetime.combine(first_day, datetime.min.time()),
+        models.UsedSupply.created_at < datetime.combine(first_day + timedelta(days=days), datetime.min.time())
+    ).group_by(models.UsedSupply.supply_id, day).all()
+
+    usage = np.zeros((len(supply_ids), days))
+    if not rows:
+        return usage
+
+    row_supplies, row_days, row_quantities = (np.array(column) for column in zip(*rows))
+    positions = np.searchsorted(supply_ids, row_supplies)
+    known = positions < len(supply_ids)
+    known[known] = supply_ids[positions[known]] == row_supplies[known]
+    # DATE() comes back as a date on MySQL and as an ISO string on SQLite
+    offsets = (row_days.astype("datetime64[D]") - np.datetime64(first_day, "D")).astype(int)
+    np.add.at(usage, (positions[known], offsets[known]), row_quantities[known].astype(float))
+    return usage
+
+
+def _days_until(stock: np.ndarray, level: np.ndarray, rate: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(rate > 0, np.maximum(stock - level, 0) / rate, np.inf)
+
+
+def _load_supply_forecast(db: Session, window_days: int, average_days: int) -> List[dict]:
+    supplies = db.query(
+        models.Supply.id,
+        models.Supply.name,
+        models.Supply.current_stock,
+        models.Supply.minimum_stock,
+        models.Supply.unit
+    ).order_by(models.Supply.id).all()
+    if not supplies:
+        return []
+
+    # Whole days only: the window ends yesterday so a half-finished today
+    # does not drag the rates down
+    today = date.today()
+    first_day = today - timedelta(days=window_days)
+    ids, names, stock, minimum, units = zip(*supplies)
+    ids = np.array(ids)
+    stock = np.array(stock, dtype=float)
+    minimum = np.array(minimum, dtype=float)
+
+    usage = _daily_usage(db, ids, first_day, window_days)
+    average = usage.mean(axis=1)
+    moving_average = usage[:, -average_days:].mean(axis=1)
+    # Forecast from the recent moving average; supplies not used lately fall
+    # back to the whole window
+    rate = np.where(moving_average > 0, moving_average, average)
+    days_to_minimum = _days_until(stock, minimum, rate)
+    days_to_empty = _days_until(stock, np.zeros_like(stock), rate)
+
+    def run_out(days: float):
+        if not np.isfinite(days):
+            return None, None
+        return round(float(days), 1), today + timedelta(days=int(days))
+
+    results = []
+    for i, supply_id in enumerate(ids.tolist()):
+        until_minimum, minimum_date = run_out(days_to_minimum[i])
+        until_empty, empty_date = run_out(days_to_empty[i])
+        results.append({
+            "supply_id": supply_id,
+            "name": names[i],
+            "unit": units[i],
+            "current_stock": float(stock[i]),
+            "minimum_stock": float(minimum[i]),
+            "average_daily_usage": float(average[i]),
+            "moving_average_daily_usage": float(moving_average[i]),
+            "days_until_minimum": until_minimum,
+            "minimum_stock_date": minimum_date,
+            "days_until_empty": until_empty,
+            "empty_date": empty_date
+        })
+    return results
+
+
+def get_supply_forecast(
+    db: Session,
+    window_days: int = FORECAST_WINDOW_DAYS,
+    average_days: int = FORECAST_AVERAGE_DAYS
+) -> List[dict]:
+    average_days = min(average_days, window_days)
+    return forecast_cache.get_or_set(
+        (date.today(), window_days, average_days),
+        lambda: _load_supply_forecast(db, window_days, average_days)
+    )
+
+
+def invalidate_supply_forecast():
+    # Called by the inventory router after usage is recorded or stock changes
+    forecast_cache.invalidate()
@@ -0,0 +1,55 @@
+# Production server: gunicorn supervising uvicorn workers, which use uvloop
+# and httptools when they are installed.
+#   gunicorn -c gunicorn.conf.py    (or python serve.py)
+#
+# Workers import the app themselves (no preload), so each one builds its own
+# engine and pool, SSE hub, scheduler and caches, and nothing mutable crosses
+# the fork. The flip side: the SSE hub only publishes the writes its own
+# worker handled, so a board misses changes made through other workers until
+# it reconnects and gets a fresh snapshot, and the scheduler catches up with
+# them on its periodic reload.
+#
+#   kill -HUP <master>    start new workers with new code, then stop the old ones
+#   kill -TTIN/-TTOU      one worker more / less
+#   kill -TERM            graceful shutdown
+import multiprocessing
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+wsgi_app = "main:app"
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+backlog = int(os.getenv("BACKLOG", "2048"))
+
+# Longer than the idle timeout of the load balancer in front, so it never
+# reuses a connection the worker has just closed
+keepalive = int(os.getenv("KEEPALIVE_SECONDS", "75"))
+# A worker that misses its heartbeat this long is restarted
+timeout = int(os.getenv("WORKER_TIMEOUT", "30"))
+# Time given to in-flight requests on HUP/TERM; open SSE streams are cut
+# after it and their clients reconnect with Last-Event-ID
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+# Recycle workers after this many requests (0 = never); the jitter keeps
+# them from all restarting at once
+max_requests = int(os.getenv("MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", str(max_requests // 10)))
+
+# Behind a proxy on the same host; list its address otherwise
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+# One log line per request costs throughput; enable with ACCESS_LOG=true
+accesslog = "-" if os.getenv("ACCESS_LOG", "false").lower() == "true" else None
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    # Only matters with --preload: connections opened in the master must not
+    # be used by the children (SQLAlchemy's recommended pattern)
+    import database
+
+    database.engine.dispose(close=False)
+    if database.async_engine is not None:
+        database.async_engine.sync_engine.dispose(close=False)
@@ -0,0 +1,186 @@
+import itertools
+import os
+import threading
+import time
+import uuid
+from datetime import date, datetime
+from email.utils import formatdate
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, Response
+
+from cache import LRUCache
+
+# A worker only hears about the writes it handles itself, so it trusts a
+# table version for this long before assuming another worker (or a direct
+# edit) changed the table; that bounds how stale a 304 can be
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+# Serialized GET bodies kept per worker; 0 turns the body cache off and
+# leaves only the 304s
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "500"))
+RESPONSE_CACHE_MAX_BODY = int(os.getenv("RESPONSE_CACHE_MAX_BODY", str(1024 * 1024)))
+
+
+class TableVersions:
+    # A counter per table, bumped by the routers after every commit that
+    # changes it. The ETag of a response is the versions of the tables it
+    # was read from, so checking one costs a dict lookup instead of a query.
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counter = itertools.count(1)
+        self._versions: Dict[str, Tuple[int, float]] = {}
+        self._pid = None
+        self._epoch = None
+
+    def _check_process(self):
+        # Versions are per process: the epoch keeps a tag issued by another
+        # worker (whose counters mean something else) from ever matching
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._epoch = uuid.uuid4().hex[:8]
+            self._versions.clear()
+
+    def changed(self, *tables: str):
+        now = time.time()
+        with self._lock:
+            self._check_process()
+            for table in tables:
+                self._versions[table] = (next(self._counter), now)
+
+    def stamp(self, tables: Iterable[str], daily: bool = False) -> Tuple[str, float]:
+        # ETag and Last-Modified time for a response read from `tables`;
+        # `daily` responses also change at midnight
+        now = time.time()
+        with self._lock:
+            self._check_process()
+            parts, modified = [], 0.0
+            for table in tables:
+                version = self._versions.get(table)
+                if version is None or now - version[1] > self.ttl:
+                    version = self._versions[table] = (next(self._counter), now)
+                parts.append(str(version[0]))
+                modified = max(modified, version[1])
+            epoch = self._epoch
+        if daily:
+            today = date.today()
+            parts.append(today.strftime("%Y%m%d"))
+            modified = max(modified, datetime.combine(today, datetime.min.time()).timestamp())
+        return f'W/"{epoch}-{"-".join(parts)}"', modified
+
+    def reset(self):
+        with self._lock:
+            self._versions.clear()
+
+
+table_versions = TableVersions(ttl=RESPONSE_CACHE_TTL)
+# (path, query string) -> (tables, daily, etag, headers, body)
+response_cache = LRUCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+
+
+def tables_changed(*tables: str):
+    # Call after committing a write to any of `tables`
+    table_versions.changed(*tables)
+
+
+def _validator_headers(etag: str, modified: float) -> Dict[str, str]:
+    # no-cache: browsers keep the body but revalidate every time, which is
+    # what turns an idle screen's refresh into a 304
+    return {"ETag": etag, "Last-Modified": formatdate(modified, usegmt=True), "Cache-Control": "no-cache"}
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))
+
+
+def conditional(*tables: str, daily: bool = False):
+    # Route dependency for GET endpoints whose response only depends on
+    # `tables` (and the query string). Listed in the route's `dependencies`
+    # it runs before the database session is opened, so a matching
+    # If-None-Match is answered with a 304 without touching the database.
+    def check(request: Request, response: Response):
+        etag, modified = table_versions.stamp(tables, daily)
+        headers = _validator_headers(etag, modified)
+        if _matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+        # Lets ConditionalGetMiddleware keep the body under this tag
+        request.state.conditional = (tables, daily, etag)
+
+    return Depends(check)
+
+
+def _is_json(start_message) -> bool:
+    content_type = dict(start_message.get("headers", [])).get(b"content-type", b"")
+    return content_type.split(b";")[0].strip().lower() == b"application/json"
+
+
+class ConditionalGetMiddleware:
+    # Keeps the serialized bodies of GET responses from `conditional` routes
+    # and serves them again while the tables they were read from have not
+    # changed, without running the route. Plain ASGI like
+    # RequestMetricsMiddleware: other responses pass through untouched.
+
+    def __init__(self, app, cache: LRUCache = response_cache, max_body: int = RESPONSE_CACHE_MAX_BODY):
+        self.app = app
+        self.cache = cache
+        self.max_body = max_body
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or self.cache.maxsize <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        key = (scope["path"], scope.get("query_string", b""))
+        entry = self.cache.get(key)
+        if entry is not None:
+            tables, daily, etag, headers, body = entry
+            current, modified = table_versions.stamp(tables, daily)
+            if current == etag:
+                await self._send_cached(scope, send, etag, modified, headers, body)
+                return
+
+        start, keep, chunks, size = None, False, [], 0
+
+        async def send_and_keep(message):
+            nonlocal start, keep, size
+            if message["type"] == "http.response.start":
+                # The route's dependency has run by now and tagged the
+                # response. Only JSON bodies are kept: a route that returns
+                # its own StreamingResponse (?stream=true NDJSON) drops the
+                # validators the dependency set, and is not cached either.
+                start = message
+                keep = message["status"] == 200 and "conditional" in scope.get("state", {}) and _is_json(message)
+            elif keep:
+                chunks.append(message.get("body", b""))
+                size += len(chunks[-1])
+                if size > self.max_body:
+                    keep = False
+                    chunks.clear()
+                elif not message.get("more_body", False):
+                    self._store(scope, key, start, b"".join(chunks))
+            await send(message)
+
+        await self.app(scope, receive, send_and_keep)
+
+    def _store(self, scope, key, start, body: bytes):
+        tables, daily, etag = scope["state"]["conditional"]
+        headers = [
+            (name, value) for name, value in start.get("headers", [])
+            if name.lower() not in (b"etag", b"last-modified", b"cache-control", b"content-length", b"server-timing")
+        ]
+        self.cache.set(key, (tables, daily, etag, headers, body))
+
+    async def _send_cached(self, scope, send, etag: str, modified: float, headers: list, body: bytes):
+        validators = [(name.lower().encode(), value.encode()) for name, value in _validator_headers(etag, modified).items()]
+        request_headers = dict(scope.get("headers", []))
+        if _matches(request_headers.get(b"if-none-match", b"").decode(), etag):
+            await send({"type": "http.response.start", "status": 304, "headers": validators})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers = headers + validators + [(b"content-length", str(len(body)).encode())]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
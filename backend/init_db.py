@@ -2,6 +2,8 @@ import mysql.connector
 import os
 from dotenv import load_dotenv
 import time
+from database import engine
+from migrate import upgrade
 
 
 def init_database():
@@ -46,28 +48,19 @@ def init_database():
         # Crear la base de datos si no existe
         print(f"Creando base de datos {DB_NAME} si no existe...")
         cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_NAME}")
-
-        # Cambiar a la base de datos creada
-        cursor.execute(f"USE {DB_NAME}")
-
-        # Leer y ejecutar el archivo de esquema SQL
-        print("Ejecutando script de migración...")
-        with open("../supabase/migrations/20250328194951_odd_meadow.sql", "r") as f:
-            # Separar comandos por punto y coma y ejecutarlos uno por uno
-            script = f.read()
-            for statement in script.split(';'):
-                if statement.strip():
-                    cursor.execute(statement)
-                    conn.commit()
-
-        print(f"Base de datos '{DB_NAME}' inicializada correctamente!")
-
     except mysql.connector.Error as err:
         print(f"Error: {err}")
+        return
     finally:
         cursor.close()
         conn.close()
 
+    # Crear o actualizar el esquema con las migraciones (migrations/)
+    print("Aplicando migraciones...")
+    upgrade(engine)
+
+    print(f"Base de datos '{DB_NAME}' inicializada correctamente!")
+
 
 if __name__ == "__main__":
     init_database()
\ No newline at end of file
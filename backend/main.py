@@ -1,9 +1,90 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine, Base
-from routers import vehicles, services, employees, inventory, reports
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+from database import engine, async_engine, engine_pools, SessionLocal, DbSession, dispose_engines, get_async_db, run_db, warm_up
+from events import service_events
+from http_cache import ConditionalGetMiddleware
+from pool_metrics import pool_statuses
+from reference_data import get_reference_data
+from request_metrics import RequestMetricsMiddleware, instrument_engine, render_prometheus
+from routers import vehicles, services, employees, inventory, reports, internal
+from service_transitions import IDEMPOTENCY_PURGE_SECONDS, purge_expired_idempotency_keys
 
-app = FastAPI(title="Car Wash Management System")
+logger = logging.getLogger(__name__)
+
+
+def _schema_is_current() -> bool:
+    # Imported here: alembic is not needed to start serving
+    from migrate import is_up_to_date
+
+    with engine.connect() as connection:
+        return is_up_to_date(connection)
+
+
+def _preload_reference_data():
+    db = SessionLocal()
+    try:
+        get_reference_data(db)
+    finally:
+        db.close()
+
+
+async def _prepare_database():
+    # Runs in the background so workers start serving without waiting for
+    # MySQL; requests made before it finishes just open their own connections
+    if not await warm_up():
+        return
+    if not await run_in_threadpool(_schema_is_current):
+        logger.warning("The database schema is behind the migrations; run `python migrate.py`")
+        return
+    await run_in_threadpool(_preload_reference_data)
+
+
+def _purge_idempotency_keys_once() -> int:
+    db = SessionLocal()
+    try:
+        return purge_expired_idempotency_keys(db)
+    finally:
+        db.close()
+
+
+async def _purge_idempotency_keys():
+    # Status changes only read their own key, so expired ones are deleted
+    # here rather than on the request path. Every worker runs it; the
+    # deletes are by key and harmless to repeat.
+    while True:
+        await asyncio.sleep(IDEMPOTENCY_PURGE_SECONDS)
+        try:
+            purged = await run_in_threadpool(_purge_idempotency_keys_once)
+        except Exception:
+            logger.exception("Purging expired idempotency keys failed")
+            continue
+        if purged:
+            logger.info("Purged %d expired idempotency keys", purged)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The schema is not created here: apply migrations with `python migrate.py`
+    # (or init_db.py on a new server) before starting the workers
+    preparing = asyncio.create_task(_prepare_database())
+    purging = asyncio.create_task(_purge_idempotency_keys())
+    yield
+    preparing.cancel()
+    purging.cancel()
+    await dispose_engines()
+
+
+app = FastAPI(title="Car Wash Management System", lifespan=lifespan)
+
+# Serves unchanged GET responses from memory (see http_cache.py); inside
+# CORS so cached answers get the same headers
+app.add_middleware(ConditionalGetMiddleware)
 
 # Configure CORS
 app.add_middleware(
@@ -12,14 +93,43 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing"],
 )
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Per-route latency, SQL statement counts and database time (see /metrics)
+app.add_middleware(RequestMetricsMiddleware)
+instrument_engine(engine)
+if async_engine is not None:
+    instrument_engine(async_engine.sync_engine)
 
 # Include routers
 app.include_router(vehicles.router, prefix="/api/vehicles", tags=["vehicles"])
 app.include_router(services.router, prefix="/api/services", tags=["services"])
 app.include_router(employees.router, prefix="/api/employees", tags=["employees"])
 app.include_router(inventory.router, prefix="/api/inventory", tags=["inventory"])
-app.include_router(reports.router, prefix="/api/reports", tags=["reports"])
\ No newline at end of file
+app.include_router(reports.router, prefix="/api/reports", tags=["reports"])
+app.include_router(internal.router, prefix="/api/_internal", tags=["internal"])
+
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["internal"])
+def get_metrics():
+    # Prometheus text format
+    return PlainTextResponse(render_prometheus(pool_statuses(engine_pools())), media_type="text/plain; version=0.0.4")
+
+
+# Service board push channel (Server-Sent Events). Clients get a snapshot
+# first and then deltas; on reconnect EventSource sends Last-Event-ID and the
+# stream resumes from there. The hub is per worker process: a client only
+# hears about the writes handled by the worker it is connected to, so the
+# screens that listen also refetch every SERVICE_EVENTS_REFETCH_MS
+# (src/hooks/useServiceEvents.ts) to pick up the others.
+@app.get("/api/events", tags=["events"])
+async def get_service_events(
+    since: Optional[str] = Query(None, description="Last event id received, as an alternative to Last-Event-ID"),
+    last_event_id: Optional[str] = Header(None),
+    db: DbSession = Depends(get_async_db)
+):
+    return await service_events.stream(
+        since or last_event_id,
+        lambda: run_db(db, services.service_board_snapshot)
+    )
\ No newline at end of file
@@ -0,0 +1,52 @@
+import argparse
+import os
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+# Schema as create_all built it before migrations were introduced
+BASELINE_REVISION = "0001"
+
+
+def alembic_config(connection=None) -> Config:
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    if connection is not None:
+        # Run on this connection and leave the caller's logging alone
+        config.attributes["connection"] = connection
+        config.attributes["configure_logger"] = False
+    return config
+
+
+def current_revision(connection):
+    return MigrationContext.configure(connection).get_current_revision()
+
+
+def is_up_to_date(connection) -> bool:
+    return current_revision(connection) == ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def upgrade(engine, revision: str = "head"):
+    # Brings the schema up to `revision`. A database created by create_all
+    # has tables but no alembic_version yet: it is stamped at the baseline
+    # first, and the later revisions only add what it is missing.
+    with engine.begin() as connection:
+        config = alembic_config(connection)
+        if current_revision(connection) is None and inspect(connection).has_table("services"):
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, revision)
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    parser = argparse.ArgumentParser(description="Apply the schema migrations to the database in .env")
+    parser.add_argument("revision", nargs="?", default="head")
+    args = parser.parse_args()
+    upgrade(engine, args.revision)
+    with engine.connect() as connection:
+        print(f"Schema at revision {current_revision(connection)}")
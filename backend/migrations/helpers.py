@@ -0,0 +1,43 @@
+# Existence checks for the revisions. Databases created by create_all before
+# migrations existed are stamped at the baseline and may already have any
+# part of a later revision, so revisions only add what is missing. Offline
+# (--sql) there is nothing to inspect and everything is emitted.
+from typing import List
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+def has_table(table: str) -> bool:
+    return not context.is_offline_mode() and sa.inspect(op.get_bind()).has_table(table)
+
+
+def has_column(table: str, column: str) -> bool:
+    if context.is_offline_mode():
+        return False
+    return column in {c["name"] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def has_index(table: str, name: str) -> bool:
+    if context.is_offline_mode():
+        return False
+    inspector = sa.inspect(op.get_bind())
+    names = {index["name"] for index in inspector.get_indexes(table)}
+    names.update(constraint["name"] for constraint in inspector.get_unique_constraints(table))
+    return name in names
+
+
+def create_index(name: str, table: str, columns: List[str]):
+    if has_index(table, name):
+        return
+    if op.get_context().dialect.name == "mysql":
+        # InnoDB online DDL: the index is built in place while the table
+        # keeps serving reads and writes
+        op.execute(f"CREATE INDEX {name} ON {table} ({', '.join(columns)}) ALGORITHM=INPLACE LOCK=NONE")
+    else:
+        op.create_index(name, table, columns)
+
+
+def drop_index(name: str, table: str):
+    if has_index(table, name):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,91 @@
+"""baseline: the schema as create_all built it before migrations
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-03-28 19:49:51
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "vehicles",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("plate_number", sa.String(20)),
+        sa.Column("vehicle_type", sa.String(50)),
+        sa.Column("client_name", sa.String(100)),
+        sa.Column("client_phone", sa.String(20)),
+    )
+    op.create_index("ix_vehicles_id", "vehicles", ["id"])
+    op.create_index("ix_vehicles_plate_number", "vehicles", ["plate_number"], unique=True)
+
+    op.create_table(
+        "service_types",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(100), unique=True),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("base_duration", sa.Integer()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_service_types_id", "service_types", ["id"])
+
+    op.create_table(
+        "employees",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(100)),
+        sa.Column("position", sa.String(50)),
+        sa.Column("shift", sa.String(20)),
+        sa.Column("active", sa.Boolean()),
+    )
+    op.create_index("ix_employees_id", "employees", ["id"])
+
+    op.create_table(
+        "services",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("vehicle_id", sa.Integer(), sa.ForeignKey("vehicles.id")),
+        sa.Column("employee_id", sa.Integer(), sa.ForeignKey("employees.id")),
+        sa.Column("service_type_id", sa.Integer(), sa.ForeignKey("service_types.id")),
+        sa.Column("service_type", sa.String(100)),
+        sa.Column("status", sa.String(20)),
+        sa.Column("start_time", sa.DateTime()),
+        sa.Column("end_time", sa.DateTime(), nullable=True),
+        sa.Column("total_cost", sa.Float()),
+        sa.Column("notes", sa.Text(), nullable=True),
+    )
+    op.create_index("ix_services_id", "services", ["id"])
+
+    op.create_table(
+        "supplies",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(100), unique=True),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("current_stock", sa.Float()),
+        sa.Column("minimum_stock", sa.Float()),
+        sa.Column("unit", sa.String(20)),
+    )
+    op.create_index("ix_supplies_id", "supplies", ["id"])
+
+    op.create_table(
+        "used_supplies",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("service_id", sa.Integer(), sa.ForeignKey("services.id")),
+        sa.Column("supply_id", sa.Integer(), sa.ForeignKey("supplies.id")),
+        sa.Column("quantity", sa.Float()),
+    )
+    op.create_index("ix_used_supplies_id", "used_supplies", ["id"])
+
+
+def downgrade() -> None:
+    for table in ("used_supplies", "supplies", "services", "employees", "service_types", "vehicles"):
+        op.drop_table(table)
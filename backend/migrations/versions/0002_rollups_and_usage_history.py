@@ -0,0 +1,58 @@
+"""rollup tables, usage timestamps and the stock/usage indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import create_index, drop_index, has_column, has_table
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Both rollups start empty; 0006 fills them from the services table
+    if not has_table("service_type_stats"):
+        op.create_table(
+            "service_type_stats",
+            sa.Column("service_type", sa.String(100), primary_key=True),
+            sa.Column("completed_count", sa.Integer()),
+            sa.Column("total_minutes", sa.Float()),
+            sa.Column("total_minutes_squared", sa.Float()),
+            sa.Column("min_minutes", sa.Float(), nullable=True),
+            sa.Column("max_minutes", sa.Float(), nullable=True),
+        )
+    if not has_table("daily_revenue"):
+        op.create_table(
+            "daily_revenue",
+            sa.Column("day", sa.Date(), primary_key=True),
+            sa.Column("service_type", sa.String(100), primary_key=True),
+            sa.Column("employee_id", sa.Integer(), primary_key=True, autoincrement=False),
+            sa.Column("services_count", sa.Integer()),
+            sa.Column("revenue", sa.Float()),
+        )
+
+    # Usage recorded before this column existed has no date and is left out
+    # of the forecast window
+    if not has_column("used_supplies", "created_at"):
+        op.add_column("used_supplies", sa.Column("created_at", sa.DateTime()))
+    create_index("idx_used_supply_date", "used_supplies", ["created_at", "supply_id", "quantity"])
+    create_index("idx_supply_stock", "supplies", ["current_stock"])
+
+
+def downgrade() -> None:
+    drop_index("idx_supply_stock", "supplies")
+    drop_index("idx_used_supply_date", "used_supplies")
+    op.drop_column("used_supplies", "created_at")
+    op.drop_table("daily_revenue")
+    op.drop_table("service_type_stats")
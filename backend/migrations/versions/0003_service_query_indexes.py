@@ -0,0 +1,34 @@
+"""indexes for the hot services queries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:30:00
+
+"""
+from typing import Sequence, Union
+
+from migrations.helpers import create_index, drop_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    ("idx_service_start", ["start_time", "id"]),
+    ("idx_service_status_end", ["status", "end_time"]),
+    ("idx_service_employee_status", ["employee_id", "status", "start_time"]),
+    ("idx_service_vehicle_start", ["vehicle_id", "start_time"]),
+)
+
+
+def upgrade() -> None:
+    for name, columns in INDEXES:
+        create_index(name, "services", columns)
+
+
+def downgrade() -> None:
+    for name, _ in reversed(INDEXES):
+        drop_index(name, "services")
@@ -0,0 +1,52 @@
+"""vehicle type prices and service type price multipliers
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 14:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import has_column, has_table
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Base prices from the original SQL schema
+VEHICLE_PRICES = {"car": 15.00, "suv": 20.00, "truck": 25.00, "motorcycle": 10.00}
+SERVICE_MULTIPLIERS = {"basic_wash": 1.0, "full_service": 2.0, "premium_detail": 5.0, "express_wash": 0.6}
+
+
+def upgrade() -> None:
+    # Databases built from the SQL script already have the table and prices
+    if not has_table("vehicle_types"):
+        vehicle_types = op.create_table(
+            "vehicle_types",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(50), unique=True),
+            sa.Column("base_price", sa.Float()),
+        )
+        op.bulk_insert(vehicle_types, [{"name": name, "base_price": price} for name, price in VEHICLE_PRICES.items()])
+
+    if not has_column("service_types", "price_multiplier"):
+        op.add_column("service_types", sa.Column("price_multiplier", sa.Float()))
+    service_types = sa.table("service_types", sa.column("name", sa.String), sa.column("price_multiplier", sa.Float))
+    for name, multiplier in SERVICE_MULTIPLIERS.items():
+        op.execute(
+            service_types.update()
+            .where(service_types.c.name == name, service_types.c.price_multiplier.is_(None))
+            .values(price_multiplier=multiplier)
+        )
+    op.execute(service_types.update().where(service_types.c.price_multiplier.is_(None)).values(price_multiplier=1.0))
+
+
+def downgrade() -> None:
+    op.drop_column("service_types", "price_multiplier")
+    op.drop_table("vehicle_types")
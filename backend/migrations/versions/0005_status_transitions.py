@@ -0,0 +1,50 @@
+"""idempotency keys for status changes and the cancelled status
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 16:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from migrations.helpers import has_table
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if not has_table("idempotency_keys"):
+        op.create_table(
+            "idempotency_keys",
+            sa.Column("key", sa.String(64), primary_key=True),
+            sa.Column("service_id", sa.Integer(), sa.ForeignKey("services.id")),
+            sa.Column("status", sa.String(20)),
+            sa.Column("response", sa.Text()),
+            sa.Column("created_at", sa.DateTime()),
+        )
+
+    # Databases built from the SQL script have services.status as an ENUM
+    # without 'cancelled'. Appending a value at the end of an ENUM is done
+    # in place, without copying the table.
+    if op.get_context().dialect.name == "mysql" and not context.is_offline_mode():
+        columns = {c["name"]: c for c in sa.inspect(op.get_bind()).get_columns("services")}
+        status_type = columns["status"]["type"]
+        if isinstance(status_type, sa.Enum) and "cancelled" not in status_type.enums:
+            values = ", ".join(f"'{value}'" for value in [*status_type.enums, "cancelled"])
+            op.execute(
+                f"ALTER TABLE services MODIFY status ENUM({values}) DEFAULT 'pending', "
+                "ALGORITHM=INPLACE, LOCK=NONE"
+            )
+
+
+def downgrade() -> None:
+    # The ENUM keeps 'cancelled': rows may already use it
+    op.drop_table("idempotency_keys")
@@ -0,0 +1,99 @@
+"""backfill the service time stats and daily revenue rollups
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 18:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+services = sa.table(
+    "services",
+    sa.column("id", sa.Integer),
+    sa.column("employee_id", sa.Integer),
+    sa.column("service_type", sa.String),
+    sa.column("status", sa.String),
+    sa.column("start_time", sa.DateTime),
+    sa.column("end_time", sa.DateTime),
+    sa.column("total_cost", sa.Float),
+)
+
+service_type_stats = sa.table(
+    "service_type_stats",
+    sa.column("service_type", sa.String),
+    sa.column("completed_count", sa.Integer),
+    sa.column("total_minutes", sa.Float),
+    sa.column("total_minutes_squared", sa.Float),
+    sa.column("min_minutes", sa.Float),
+    sa.column("max_minutes", sa.Float),
+)
+
+daily_revenue = sa.table(
+    "daily_revenue",
+    sa.column("day", sa.Date),
+    sa.column("service_type", sa.String),
+    sa.column("employee_id", sa.Integer),
+    sa.column("services_count", sa.Integer),
+    sa.column("revenue", sa.Float),
+)
+
+
+def _minutes(dialect_name: str):
+    # Same expressions as sql_functions.minutes_between, spelled out so the
+    # revision does not change if the application code does
+    if dialect_name == "mysql":
+        return sa.literal_column("(TIMESTAMPDIFF(SECOND, services.start_time, services.end_time) / 60.0)", sa.Float)
+    return sa.literal_column("(julianday(services.end_time) - julianday(services.start_time)) * 1440.0", sa.Float)
+
+
+def upgrade() -> None:
+    # 0002 added both rollups empty, and the routers only keep them current
+    # from then on. They are filled from the services table here, unless
+    # they already hold data (backfilled by hand, or on a new database where
+    # every completion went through the routers).
+    if context.is_offline_mode():
+        return
+    bind = op.get_bind()
+    completed = [services.c.status == "completed", services.c.end_time.isnot(None)]
+
+    if bind.execute(sa.select(service_type_stats.c.service_type).limit(1)).first() is None:
+        minutes = _minutes(bind.dialect.name)
+        op.execute(service_type_stats.insert().from_select(
+            ["service_type", "completed_count", "total_minutes", "total_minutes_squared", "min_minutes", "max_minutes"],
+            sa.select(
+                services.c.service_type,
+                sa.func.count(services.c.id),
+                sa.func.coalesce(sa.func.sum(minutes), 0),
+                sa.func.coalesce(sa.func.sum(minutes * minutes), 0),
+                sa.func.min(minutes),
+                sa.func.max(minutes),
+            ).where(*completed).group_by(services.c.service_type)
+        ))
+
+    if bind.execute(sa.select(daily_revenue.c.day).limit(1)).first() is None:
+        day = sa.func.date(services.c.end_time)
+        op.execute(daily_revenue.insert().from_select(
+            ["day", "service_type", "employee_id", "services_count", "revenue"],
+            sa.select(
+                day,
+                services.c.service_type,
+                services.c.employee_id,
+                sa.func.count(services.c.id),
+                sa.func.sum(services.c.total_cost),
+            ).where(*completed).group_by(day, services.c.service_type, services.c.employee_id)
+        ))
+
+
+def downgrade() -> None:
+    # The rows stay: 0002's downgrade drops the tables
+    pass
@@ -0,0 +1,60 @@
+"""store plate numbers in the normalized form the lookups use
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 18:30:00
+
+"""
+from collections import defaultdict
+import logging
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from plate_cache import normalize_plate
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+vehicles = sa.table("vehicles", sa.column("id", sa.Integer), sa.column("plate_number", sa.String))
+services = sa.table("services", sa.column("vehicle_id", sa.Integer))
+
+logger = logging.getLogger("alembic")
+
+
+def upgrade() -> None:
+    # Lookups and new registrations use normalize_plate (uppercase, no
+    # whitespace); rows stored before that, such as "ABC 123", were never
+    # found again. Rows that normalize to the same plate are the same
+    # vehicle registered twice: they are merged into the one already in
+    # normalized form, or else the oldest, which gets the other rows'
+    # services. The merged rows' client details are dropped.
+    if context.is_offline_mode():
+        return
+    bind = op.get_bind()
+    by_plate = defaultdict(list)
+    for vehicle_id, plate_number in bind.execute(sa.select(vehicles.c.id, vehicles.c.plate_number).order_by(vehicles.c.id)):
+        if plate_number is not None:
+            by_plate[normalize_plate(plate_number)].append((vehicle_id, plate_number))
+
+    for plate, rows in by_plate.items():
+        if len(rows) == 1 and rows[0][1] == plate:
+            continue
+        keep_id, keep_plate = next((row for row in rows if row[1] == plate), rows[0])
+        merged = [vehicle_id for vehicle_id, _ in rows if vehicle_id != keep_id]
+        if merged:
+            logger.info("Merging vehicles %s into %s as %s", merged, keep_id, plate)
+            bind.execute(services.update().where(services.c.vehicle_id.in_(merged)).values(vehicle_id=keep_id))
+            bind.execute(vehicles.delete().where(vehicles.c.id.in_(merged)))
+        if keep_plate != plate:
+            bind.execute(vehicles.update().where(vehicles.c.id == keep_id).values(plate_number=plate))
+
+
+def downgrade() -> None:
+    # The original spellings and the merged rows are not kept
+    pass
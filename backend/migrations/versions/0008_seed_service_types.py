@@ -0,0 +1,59 @@
+"""seed the service types
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 19:00:00
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, description, base duration in minutes, price multiplier), as seeded
+# by the original SQL script and priced by 0004
+SERVICE_TYPES = [
+    ("basic_wash", "Exterior wash and basic interior cleaning", 30, 1.0),
+    ("full_service", "Complete interior and exterior cleaning", 60, 2.0),
+    ("premium_detail", "Full detailing service including wax and polish", 120, 5.0),
+    ("express_wash", "Quick exterior wash only", 15, 0.6),
+]
+
+service_types = sa.table(
+    "service_types",
+    sa.column("name", sa.String),
+    sa.column("description", sa.Text),
+    sa.column("base_duration", sa.Integer),
+    sa.column("price_multiplier", sa.Float),
+    sa.column("created_at", sa.DateTime),
+)
+
+
+def upgrade() -> None:
+    # 0001 creates the table empty, and creating a service needs a type.
+    # Databases built from the SQL script (or edited by hand) keep the
+    # types they have; only the missing names are added.
+    existing = set()
+    if not context.is_offline_mode():
+        existing = {name for name, in op.get_bind().execute(sa.select(service_types.c.name))}
+    now = datetime.utcnow()
+    rows = [
+        {"name": name, "description": description, "base_duration": duration, "price_multiplier": multiplier, "created_at": now}
+        for name, description, duration, multiplier in SERVICE_TYPES
+        if name not in existing
+    ]
+    if rows:
+        op.bulk_insert(service_types, rows)
+
+
+def downgrade() -> None:
+    # Services may reference the types
+    pass
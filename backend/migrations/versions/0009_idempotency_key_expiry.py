@@ -0,0 +1,25 @@
+"""index the idempotency keys by age for the purge
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 19:30:00
+
+"""
+from typing import Sequence, Union
+
+from migrations.helpers import create_index, drop_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    create_index("idx_idempotency_created", "idempotency_keys", ["created_at"])
+
+
+def downgrade() -> None:
+    drop_index("idx_idempotency_created", "idempotency_keys")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Boolean, Text
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Enum, Boolean, Text, Index
 from sqlalchemy.orm import relationship
 from database import Base
 import enum
@@ -16,6 +16,7 @@ class ServiceStatus(str, enum.Enum):
     PENDING = "pending"
     IN_PROGRESS = "in_progress"
     COMPLETED = "completed"
+    CANCELLED = "cancelled"
 
 
 class Vehicle(Base):
@@ -36,9 +37,19 @@ class ServiceType(Base):
     name = Column(String(100), unique=True)
     description = Column(Text, nullable=True)
     base_duration = Column(Integer)
+    # Scales the vehicle type's base price (see pricing.py)
+    price_multiplier = Column(Float, default=1.0)
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class VehicleTypePrice(Base):
+    __tablename__ = "vehicle_types"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50), unique=True)
+    base_price = Column(Float)
+
+
 class Service(Base):
     __tablename__ = "services"
 
@@ -57,6 +68,17 @@ class Service(Base):
     employee = relationship("Employee", back_populates="services")
     used_supplies = relationship("UsedSupply", back_populates="service")
 
+    # One per hot filter (see benchmarks/explain_indexes.py). Listings are
+    # newest first on (start_time, id); the board, dashboard and reports
+    # filter by status and completion time; workload counts and the
+    # per-employee listing by employee and status; vehicle history by vehicle.
+    __table_args__ = (
+        Index("idx_service_start", "start_time", "id"),
+        Index("idx_service_status_end", "status", "end_time"),
+        Index("idx_service_employee_status", "employee_id", "status", "start_time"),
+        Index("idx_service_vehicle_start", "vehicle_id", "start_time"),
+    )
+
 
 class Employee(Base):
     __tablename__ = "employees"
@@ -80,6 +102,8 @@ class Supply(Base):
     unit = Column(String(20))
     usages = relationship("UsedSupply", back_populates="supply")
 
+    __table_args__ = (Index("idx_supply_stock", "current_stock"),)
+
 
 class UsedSupply(Base):
     __tablename__ = "used_supplies"
@@ -88,6 +112,46 @@ class UsedSupply(Base):
     service_id = Column(Integer, ForeignKey("services.id"))
     supply_id = Column(Integer, ForeignKey("supplies.id"))
     quantity = Column(Float)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
     service = relationship("Service", back_populates="used_supplies")
-    supply = relationship("Supply", back_populates="usages")
\ No newline at end of file
+    supply = relationship("Supply", back_populates="usages")
+
+    # Covers the usage history read by the supply forecast
+    __table_args__ = (Index("idx_used_supply_date", "created_at", "supply_id", "quantity"),)
+
+
+class ServiceTypeStats(Base):
+    __tablename__ = "service_type_stats"
+
+    service_type = Column(String(100), primary_key=True)
+    completed_count = Column(Integer, default=0)
+    total_minutes = Column(Float, default=0)
+    total_minutes_squared = Column(Float, default=0)
+    min_minutes = Column(Float, nullable=True)
+    max_minutes = Column(Float, nullable=True)
+
+
+class DailyRevenue(Base):
+    __tablename__ = "daily_revenue"
+
+    day = Column(Date, primary_key=True)
+    service_type = Column(String(100), primary_key=True)
+    employee_id = Column(Integer, primary_key=True)
+    services_count = Column(Integer, default=0)
+    revenue = Column(Float, default=0)
+
+
+class IdempotencyKey(Base):
+    # First response to a status change sent with an Idempotency-Key header,
+    # replayed when the client retries the same request
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(64), primary_key=True)
+    service_id = Column(Integer, ForeignKey("services.id"))
+    status = Column(String(20))
+    response = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Expired keys are purged by age (service_transitions.py)
+    __table_args__ = (Index("idx_idempotency_created", "created_at"),)
@@ -0,0 +1,89 @@
+import base64
+import json
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Iterable, List
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query, Session
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+STREAM_CHUNK_SIZE = 500
+
+
+def encode_cursor(*values) -> str:
+    # Opaque cursor with the sort key of the last row returned
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor: str, *types) -> List:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if len(payload) != len(types):
+            raise ValueError
+        return [
+            datetime.fromisoformat(value) if value_type is datetime else value_type(value)
+            for value, value_type in zip(payload, types)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def stream_ndjson(
+    db: Session,
+    build_query: Callable[[Session], Query],
+    serialize_rows: Callable[[Session, List], Iterable[dict]],
+    chunk_size: int = STREAM_CHUNK_SIZE
+) -> StreamingResponse:
+    # The request session is closed as soon as the endpoint returns, so the
+    # generator opens its own session on the same engine and reads the rows
+    # through a server-side cursor, one chunk at a time. A connection with an
+    # open server-side cursor cannot run other statements, so any per-chunk
+    # lookups done by serialize_rows go through a second session.
+    if isinstance(db, AsyncSession):
+        return StreamingResponse(
+            _generate_async(db.bind, build_query, serialize_rows, chunk_size),
+            media_type="application/x-ndjson"
+        )
+
+    bind = db.get_bind()
+
+    def generate():
+        session = Session(bind=bind)
+        lookup_session = Session(bind=bind)
+        try:
+            query = build_query(session).yield_per(chunk_size)
+            rows = []
+            for row in query:
+                rows.append(row)
+                if len(rows) == chunk_size:
+                    yield _encode_lines(serialize_rows(lookup_session, rows))
+                    rows = []
+            if rows:
+                yield _encode_lines(serialize_rows(lookup_session, rows))
+        finally:
+            lookup_session.close()
+            session.close()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+async def _generate_async(bind, build_query, serialize_rows, chunk_size):
+    # Same as the sync generator, with every fetch run through run_sync so the
+    # async driver is awaited in between chunks
+    async with AsyncSession(bind=bind) as session, AsyncSession(bind=bind) as lookup_session:
+        rows = await session.run_sync(lambda sync_session: iter(build_query(sync_session).yield_per(chunk_size)))
+        while True:
+            chunk = await session.run_sync(lambda sync_session: list(islice(rows, chunk_size)))
+            if not chunk:
+                break
+            items = await lookup_session.run_sync(lambda sync_session: list(serialize_rows(sync_session, chunk)))
+            yield _encode_lines(items)
+
+
+def _encode_lines(items: Iterable[dict]) -> bytes:
+    return "".join(json.dumps(jsonable_encoder(item)) + "\n" for item in items).encode()
@@ -0,0 +1,55 @@
+import os
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+import models
+from cache import LRUCache
+
+# Plate number -> vehicle dict, for the check-in lookups at the gate
+plate_cache = LRUCache(
+    maxsize=int(os.getenv("PLATE_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("PLATE_CACHE_TTL", "300"))
+)
+
+
+def normalize_plate(plate_number: str) -> str:
+    # Same form for cache keys and for what is stored under the unique index;
+    # rows stored before it was applied were converted by migration 0007
+    return "".join(plate_number.split()).upper()
+
+
+def vehicle_to_dict(vehicle: models.Vehicle) -> dict:
+    return {
+        "id": vehicle.id,
+        "plate_number": vehicle.plate_number,
+        "vehicle_type": vehicle.vehicle_type,
+        "client_name": vehicle.client_name,
+        "client_phone": vehicle.client_phone
+    }
+
+
+def cache_vehicle(vehicle: dict):
+    plate_cache.set(normalize_plate(vehicle["plate_number"]), vehicle)
+
+
+def get_cached_vehicle(plate_number: str) -> Optional[dict]:
+    return plate_cache.get(normalize_plate(plate_number))
+
+
+def load_vehicle(db: Session, plate_number: str) -> Optional[dict]:
+    # Cache miss path: read the vehicle and remember it
+    plate_number = normalize_plate(plate_number)
+    row = db.query(models.Vehicle).filter(models.Vehicle.plate_number == plate_number).first()
+    if row is None:
+        return None
+    vehicle = vehicle_to_dict(row)
+    plate_cache.set(plate_number, vehicle)
+    return vehicle
+
+
+def lookup_vehicle(db: Session, plate_number: str) -> Optional[dict]:
+    vehicle = get_cached_vehicle(plate_number)
+    if vehicle is None:
+        vehicle = load_vehicle(db, plate_number)
+    return vehicle
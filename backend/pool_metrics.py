@@ -0,0 +1,62 @@
+import time
+from typing import Dict
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from metrics import Histogram
+
+
+class InstrumentedPool:
+    # Pool mixin that records how long each checkout waited for a connection
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_time = Histogram()
+        self.timeouts = 0
+
+    def recreate(self):
+        # Keep the collected metrics when the engine recreates its pool
+        pool = super().recreate()
+        pool.wait_time = self.wait_time
+        pool.timeouts = self.timeouts
+        return pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.wait_time.observe(time.perf_counter() - start)
+
+
+class InstrumentedQueuePool(InstrumentedPool, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(InstrumentedPool, AsyncAdaptedQueuePool):
+    # Pool of the async engine (DB_ASYNC=true)
+    pass
+
+
+def pool_status(pool) -> dict:
+    status = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": pool._max_overflow,
+        "timeout": pool.timeout()
+    }
+    if isinstance(pool, InstrumentedPool):
+        status["timeouts"] = pool.timeouts
+        status["wait_time_seconds"] = pool.wait_time.snapshot()
+    return status
+
+
+def pool_statuses(pools: Dict[str, Pool]) -> Dict[str, dict]:
+    # Status of every engine's pool, by the name used as its metrics label
+    return {name: pool_status(pool) for name, pool in pools.items()}
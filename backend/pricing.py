@@ -0,0 +1,31 @@
+from reference_data import ReferenceData
+
+# Charged when the vehicle's type has no row in vehicle_types
+DEFAULT_BASE_PRICE = 20.00
+
+
+def base_price(reference: ReferenceData, vehicle_type: str) -> float:
+    return reference.vehicle_prices.get(vehicle_type, DEFAULT_BASE_PRICE)
+
+
+def service_price(reference: ReferenceData, vehicle_type: str, service_type: dict) -> float:
+    # The vehicle type sets the base (a truck takes more work than a car) and
+    # the service type scales it: a premium detail is several basic washes
+    return round(base_price(reference, vehicle_type) * service_type["price_multiplier"], 2)
+
+
+def price_list(reference: ReferenceData) -> dict:
+    # Every service type x vehicle type combination, for the front desk
+    return {
+        "version": reference.version,
+        "prices": [
+            {
+                "service_type_id": service_type["id"],
+                "service_type": service_type["name"],
+                "vehicle_type": vehicle_type,
+                "price": service_price(reference, vehicle_type, service_type)
+            }
+            for service_type in reference.service_type_list()
+            for vehicle_type in sorted(reference.vehicle_prices)
+        ]
+    }
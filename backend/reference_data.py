@@ -0,0 +1,60 @@
+import itertools
+import os
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+import models
+from cache import TTLCache
+
+# Service types and vehicle-type prices hardly ever change, so every request
+# reads them from a snapshot loaded once per worker. The TTL bounds how long
+# edits made directly in the database (or by another worker) go unseen.
+reference_cache = TTLCache(ttl=float(os.getenv("REFERENCE_DATA_TTL", "300")))
+_versions = itertools.count(1)
+
+
+class ReferenceData:
+    # Immutable snapshot; a reload builds a new one with the next version
+    __slots__ = ("version", "service_types", "vehicle_prices")
+
+    def __init__(self, version: int, service_types: Dict[int, dict], vehicle_prices: Dict[str, float]):
+        self.version = version
+        self.service_types = service_types
+        self.vehicle_prices = vehicle_prices
+
+    def service_type_list(self) -> List[dict]:
+        return list(self.service_types.values())
+
+
+def _load_reference_data(db: Session) -> ReferenceData:
+    service_types = {
+        row.id: {
+            "id": row.id,
+            "name": row.name,
+            "description": row.description,
+            "base_duration": row.base_duration,
+            "price_multiplier": row.price_multiplier if row.price_multiplier is not None else 1.0
+        }
+        for row in db.query(models.ServiceType).order_by(models.ServiceType.id)
+    }
+    vehicle_prices = {row.name: row.base_price for row in db.query(models.VehicleTypePrice)}
+    return ReferenceData(next(_versions), service_types, vehicle_prices)
+
+
+def get_reference_data(db: Session) -> ReferenceData:
+    return reference_cache.get_or_set("reference", lambda: _load_reference_data(db))
+
+
+def get_service_type(db: Session, service_type_id: int) -> Optional[dict]:
+    service_type = get_reference_data(db).service_types.get(service_type_id)
+    if service_type is None and db.query(models.ServiceType.id).filter(models.ServiceType.id == service_type_id).first():
+        # Added since the snapshot was taken; only unknown ids pay this query
+        invalidate_reference_data()
+        service_type = get_reference_data(db).service_types.get(service_type_id)
+    return service_type
+
+
+def invalidate_reference_data():
+    # Call after writing service_types or vehicle_types
+    reference_cache.invalidate()
@@ -0,0 +1,210 @@
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Requests slower than this are logged with the statements they ran
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+# Statements kept per request for the slow log; the count is always exact
+MAX_LOGGED_STATEMENTS = 50
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+# Long-lived streams would only pollute the latency histograms
+EXCLUDED_PATHS = ("/api/events", "/metrics")
+
+
+class RequestStats:
+    __slots__ = ("statements", "db_time", "queries")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+        self.queries: List[Tuple[float, str]] = []
+
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_request.get() is not None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _record_statement(conn, statement: str):
+    stats = _current_request.get()
+    if stats is None or not conn.info.get("query_start_time"):
+        return
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats.statements += 1
+    stats.db_time += elapsed
+    if len(stats.queries) < MAX_LOGGED_STATEMENTS:
+        stats.queries.append((elapsed, statement))
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_statement(conn, statement)
+
+
+def _handle_error(exception_context):
+    # A statement that raises never reaches after_cursor_execute. Several
+    # write paths expect an IntegrityError (duplicate plates and supplies,
+    # rollup rows, idempotency keys), and without this their start times
+    # would pile up on the pooled connection and be matched with later
+    # statements. The failed statement is counted: it was a round trip.
+    if exception_context.connection is not None and exception_context.execution_context is not None:
+        _record_statement(exception_context.connection, exception_context.statement)
+
+
+def instrument_engine(engine):
+    # Attributes every statement run on the engine to the request being
+    # served. The request is found through a context variable, which the
+    # threadpool and AsyncSession.run_sync both carry over.
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency = Histogram()
+        self.db_time = Histogram()
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.responses: Dict[int, int] = {}
+
+
+class RequestMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes: Dict[str, RouteMetrics] = {}
+
+    def observe(self, route: str, status_code: int, duration: float, stats: RequestStats):
+        with self._lock:
+            metrics = self.routes.get(route)
+            if metrics is None:
+                metrics = self.routes[route] = RouteMetrics()
+            metrics.responses[status_code] = metrics.responses.get(status_code, 0) + 1
+        metrics.latency.observe(duration)
+        metrics.db_time.observe(stats.db_time)
+        metrics.statements.observe(stats.statements)
+
+    def reset(self):
+        with self._lock:
+            self.routes = {}
+
+
+request_metrics = RequestMetrics()
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    return f"{scope['method']} {route.path if route is not None else 'unmatched'}"
+
+
+def server_timing(duration: float, stats: RequestStats) -> str:
+    return (
+        f'app;dur={duration * 1000:.1f}, '
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.statements} queries"'
+    )
+
+
+class RequestMetricsMiddleware:
+    # Times every HTTP request, counts the SQL statements it ran and their
+    # total time, adds a Server-Timing header and logs slow requests. Plain
+    # ASGI so streaming responses pass through untouched; the header reflects
+    # the work done before the first byte was sent.
+
+    def __init__(self, app, slow_request_seconds: float = SLOW_REQUEST_SECONDS):
+        self.app = app
+        self.slow_request_seconds = slow_request_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(EXCLUDED_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(time.perf_counter() - start, stats).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            duration = time.perf_counter() - start
+            _current_request.reset(token)
+            route = _route_label(scope)
+            request_metrics.observe(route, status_code, duration, stats)
+            if duration >= self.slow_request_seconds:
+                queries = "\n".join(f"  {elapsed * 1000:8.1f}ms  {' '.join(statement.split())}" for elapsed, statement in stats.queries)
+                logger.warning(
+                    "Slow request %s %s: %.0fms, %d statements, %.0fms in the database\n%s",
+                    route, scope.get("query_string", b"").decode(), duration * 1000, stats.statements, stats.db_time * 1000, queries
+                )
+
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels.items()) + "}"
+
+
+def _histogram_lines(name: str, snapshot: dict, **labels) -> List[str]:
+    lines = [f"{name}_bucket{_labels(**labels, le=bound)} {count}" for bound, count in snapshot["buckets"].items()]
+    lines.append(f"{name}_sum{_labels(**labels)} {snapshot['sum']}")
+    lines.append(f"{name}_count{_labels(**labels)} {snapshot['count']}")
+    return lines
+
+
+def render_prometheus(pool_statuses: Optional[Dict[str, dict]] = None) -> str:
+    # Prometheus text exposition format (version 0.0.4); pool_statuses is
+    # keyed by the engine label (see database.engine_pools)
+    histograms = (
+        ("http_request_duration_seconds", "Request latency by route", "latency"),
+        ("db_statements_per_request", "SQL statements run by one request", "statements"),
+        ("db_time_per_request_seconds", "Time spent in SQL statements by one request", "db_time")
+    )
+    routes = sorted(request_metrics.routes.items())
+    lines = ["# HELP http_requests_total Responses by route and status", "# TYPE http_requests_total counter"]
+    for route, metrics in routes:
+        for status_code, count in sorted(metrics.responses.items()):
+            lines.append(f"http_requests_total{_labels(route=route, status=status_code)} {count}")
+    for name, help_text, attribute in histograms:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for route, metrics in routes:
+            lines += _histogram_lines(name, getattr(metrics, attribute).snapshot(), route=route)
+
+    pools = sorted((pool_statuses or {}).items())
+    if pools:
+        lines += ["# HELP db_pool_checked_out Connections currently checked out", "# TYPE db_pool_checked_out gauge"]
+        lines += [f"db_pool_checked_out{_labels(pool=name)} {status['checked_out']}" for name, status in pools]
+        lines += ["# HELP db_pool_overflow Connections open beyond the pool size", "# TYPE db_pool_overflow gauge"]
+        lines += [f"db_pool_overflow{_labels(pool=name)} {status['overflow']}" for name, status in pools]
+    instrumented = [(name, status) for name, status in pools if "wait_time_seconds" in status]
+    if instrumented:
+        lines += [
+            "# HELP db_pool_timeouts_total Checkouts that gave up waiting for a connection",
+            "# TYPE db_pool_timeouts_total counter"
+        ]
+        lines += [f"db_pool_timeouts_total{_labels(pool=name)} {status['timeouts']}" for name, status in instrumented]
+        lines += ["# HELP db_pool_wait_seconds Time spent waiting for a connection", "# TYPE db_pool_wait_seconds histogram"]
+        for name, status in instrumented:
+            lines += _histogram_lines("db_pool_wait_seconds", status["wait_time_seconds"], pool=name)
+    return "\n".join(lines) + "\n"
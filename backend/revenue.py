@@ -0,0 +1,144 @@
+import argparse
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+
+GROUP_BY_PERIODS = ("day", "week", "month")
+GROUP_BY_DIMENSIONS = ("service_type", "employee")
+
+
+def record_revenue(db: Session, day: date, service_type: str, employee_id: int, amount: float, removed: bool = False):
+    # Add (or remove, when a completed service is reopened) one service to
+    # the rollup row of its day, type and employee, in the caller's transaction
+    sign = -1 if removed else 1
+    rollup = models.DailyRevenue
+    query = db.query(rollup).filter(
+        rollup.day == day,
+        rollup.service_type == service_type,
+        rollup.employee_id == employee_id
+    )
+    values = {
+        rollup.services_count: rollup.services_count + sign,
+        rollup.revenue: rollup.revenue + sign * amount
+    }
+    if query.update(values, synchronize_session=False) or removed:
+        return
+
+    try:
+        with db.begin_nested():
+            db.add(rollup(
+                day=day,
+                service_type=service_type,
+                employee_id=employee_id,
+                services_count=1,
+                revenue=amount
+            ))
+    except IntegrityError:
+        # Another request created the row first
+        query.update(values, synchronize_session=False)
+
+
+def rebuild_daily_revenue(db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None) -> int:
+    # Backfill the rollup from the services table with one INSERT ... SELECT
+    rollup = models.DailyRevenue
+    delete_query = db.query(rollup)
+    service_filters = [models.Service.status == "completed", models.Service.end_time != None]
+    if date_from:
+        delete_query = delete_query.filter(rollup.day >= date_from)
+        service_filters.append(models.Service.end_time >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        delete_query = delete_query.filter(rollup.day <= date_to)
+        service_filters.append(models.Service.end_time < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    delete_query.delete(synchronize_session=False)
+
+    day = func.date(models.Service.end_time)
+    source = select(
+        day,
+        models.Service.service_type,
+        models.Service.employee_id,
+        func.count(models.Service.id),
+        func.sum(models.Service.total_cost)
+    ).where(*service_filters).group_by(day, models.Service.service_type, models.Service.employee_id)
+
+    result = db.execute(insert(rollup).from_select(
+        ["day", "service_type", "employee_id", "services_count", "revenue"],
+        source
+    ))
+    db.commit()
+    return result.rowcount
+
+
+def _period_start(day: date, group_by: str) -> date:
+    if group_by == "week":
+        return day - timedelta(days=day.weekday())
+    if group_by == "month":
+        return day.replace(day=1)
+    return day
+
+
+def income_by_period(
+    db: Session,
+    date_from: date,
+    date_to: date,
+    group_by: str = "day",
+    by: Optional[str] = None
+) -> List[dict]:
+    rollup = models.DailyRevenue
+    columns = [rollup.day]
+    if by == "service_type":
+        columns.append(rollup.service_type)
+    elif by == "employee":
+        columns += [rollup.employee_id, models.Employee.name]
+
+    # One query over the rollup; rows are at most days x dimension values,
+    # so folding days into weeks or months is done here
+    query = db.query(
+        *columns,
+        func.sum(rollup.services_count),
+        func.sum(rollup.revenue)
+    ).filter(rollup.day >= date_from, rollup.day <= date_to)
+    if by == "employee":
+        query = query.outerjoin(models.Employee, models.Employee.id == rollup.employee_id)
+
+    buckets = {}
+    for row in query.group_by(*columns):
+        day, dimension, (services_count, revenue) = row[0], tuple(row[1:-2]), row[-2:]
+        key = (_period_start(day, group_by),) + dimension
+        bucket = buckets.setdefault(key, [0, 0.0])
+        bucket[0] += services_count or 0
+        bucket[1] += revenue or 0
+
+    results = []
+    for key in sorted(buckets, key=lambda key: tuple("" if value is None else value for value in key)):
+        services_count, revenue = buckets[key]
+        item = {"period": key[0]}
+        if by == "service_type":
+            item["service_type"] = key[1]
+        elif by == "employee":
+            item["employee_id"] = key[1]
+            item["employee_name"] = key[2] or "Unknown"
+        item["services_count"] = services_count
+        item["total_income"] = float(revenue)
+        results.append(item)
+    return results
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Rebuild the daily_revenue rollup from the services table")
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, help="First day to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, help="Last day to rebuild (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        rows = rebuild_daily_revenue(db, args.date_from, args.date_to)
+        print(f"daily_revenue rebuilt: {rows} rows")
+    finally:
+        db.close()
@@ -1,7 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from database import get_db
+from pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor, stream_ndjson
+from workload import load_workloads, current_workload
+from dashboard import invalidate_dashboard_stats
+from http_cache import conditional, tables_changed
+from scheduler import scheduler
 import models
 from pydantic import BaseModel
 
@@ -30,6 +35,34 @@ class EmployeeResponse(BaseModel):
         from_attributes = True
 
 
+def _employee_query(db: Session, active: Optional[bool] = None, after: Optional[str] = None):
+    query = db.query(models.Employee)
+    if active is not None:
+        query = query.filter(models.Employee.active == active)
+    if after:
+        (last_id,) = decode_cursor(after, int)
+        query = query.filter(models.Employee.id > last_id)
+    return query.order_by(models.Employee.id)
+
+
+def _employee_responses(db: Session, employees: List[models.Employee]) -> List[EmployeeResponse]:
+    # Current workload (number of pending/in-progress services) for all
+    # employees in one grouped query
+    workloads = load_workloads(db, [employee.id for employee in employees]) if employees else {}
+
+    return [
+        EmployeeResponse(
+            id=employee.id,
+            name=employee.name,
+            position=employee.position,
+            shift=employee.shift,
+            active=employee.active,
+            current_workload=current_workload(workloads.get(employee.id, {}))
+        )
+        for employee in employees
+    ]
+
+
 @router.post("/", response_model=EmployeeResponse, status_code=status.HTTP_201_CREATED)
 def create_employee(employee: EmployeeCreate, db: Session = Depends(get_db)):
     new_employee = models.Employee(
@@ -39,74 +72,59 @@ def create_employee(employee: EmployeeCreate, db: Session = Depends(get_db)):
         active=True
     )
     db.add(new_employee)
-    db.commit()
-    db.refresh(new_employee)
-
-    # Calculate current workload (number of pending/in-progress services)
-    workload = db.query(models.Service).filter(
-        models.Service.employee_id == new_employee.id,
-        models.Service.status.in_(["pending", "in_progress"])
-    ).count()
-
+    db.flush()
+    # A new employee has no services yet: no workload query, and the
+    # response is built from what was just inserted instead of re-reading it
     response = EmployeeResponse(
         id=new_employee.id,
-        name=new_employee.name,
-        position=new_employee.position,
-        shift=new_employee.shift,
-        active=new_employee.active,
-        current_workload=workload
+        name=employee.name,
+        position=employee.position,
+        shift=employee.shift,
+        active=True,
+        current_workload=0
     )
+    db.commit()
+
+    scheduler.employee_changed(response.id, response.active)
+    invalidate_dashboard_stats()
+    tables_changed("employees")
 
     return response
 
 
-@router.get("/", response_model=List[EmployeeResponse])
-def get_all_employees(db: Session = Depends(get_db)):
-    employees = db.query(models.Employee).all()
-
-    response = []
-    for employee in employees:
-        # Calculate current workload (number of pending/in-progress services)
-        workload = db.query(models.Service).filter(
-            models.Service.employee_id == employee.id,
-            models.Service.status.in_(["pending", "in_progress"])
-        ).count()
-
-        response.append(
-            EmployeeResponse(
-                id=employee.id,
-                name=employee.name,
-                position=employee.position,
-                shift=employee.shift,
-                active=employee.active,
-                current_workload=workload
-            )
+@router.get("/", response_model=List[EmployeeResponse], dependencies=[conditional("employees", "services")])
+def get_all_employees(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header"),
+    active: Optional[bool] = None,
+    stream: bool = Query(False, description="Stream rows as NDJSON"),
+    db: Session = Depends(get_db)
+):
+    if stream:
+        return stream_ndjson(
+            db,
+            lambda session: _employee_query(session, active, after).limit(limit),
+            lambda session, rows: (item.model_dump() for item in _employee_responses(session, rows))
         )
 
-    return response
+    employees = _employee_query(db, active, after).limit(limit).all()
+    if limit and len(employees) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(employees[-1].id)
+    return _employee_responses(db, employees)
 
 
-@router.get("/{employee_id}/workload", response_model=dict)
+@router.get("/{employee_id}/workload", response_model=dict, dependencies=[conditional("employees", "services")])
 def get_employee_workload(employee_id: int, db: Session = Depends(get_db)):
     employee = db.query(models.Employee).filter(models.Employee.id == employee_id).first()
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
 
-    # Get employee's pending and in-progress services
-    pending_services = db.query(models.Service).filter(
-        models.Service.employee_id == employee_id,
-        models.Service.status == "pending"
-    ).count()
-
-    in_progress_services = db.query(models.Service).filter(
-        models.Service.employee_id == employee_id,
-        models.Service.status == "in_progress"
-    ).count()
-
-    completed_services = db.query(models.Service).filter(
-        models.Service.employee_id == employee_id,
-        models.Service.status == "completed"
-    ).count()
+    # Get employee's pending, in-progress and completed services
+    counts = load_workloads(db, [employee_id]).get(employee_id, {})
+    pending_services = counts.get("pending", 0)
+    in_progress_services = counts.get("in_progress", 0)
+    completed_services = counts.get("completed", 0)
 
     return {
         "employee_id": employee_id,
@@ -125,22 +143,13 @@ def update_employee_status(employee_id: int, status_update: EmployeeUpdate, db:
         raise HTTPException(status_code=404, detail="Employee not found")
 
     employee.active = status_update.active
+    db.flush()
+    # Built before committing so the expired instance is not reloaded
+    response = _employee_responses(db, [employee])[0]
     db.commit()
-    db.refresh(employee)
 
-    # Calculate current workload
-    workload = db.query(models.Service).filter(
-        models.Service.employee_id == employee.id,
-        models.Service.status.in_(["pending", "in_progress"])
-    ).count()
-
-    response = EmployeeResponse(
-        id=employee.id,
-        name=employee.name,
-        position=employee.position,
-        shift=employee.shift,
-        active=employee.active,
-        current_workload=workload
-    )
+    scheduler.employee_changed(response.id, response.active)
+    invalidate_dashboard_stats()
+    tables_changed("employees")
 
-    return response
\ No newline at end of file
+    return response
@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from database import engine_pools
+from pool_metrics import pool_statuses
+from plate_cache import plate_cache
+from http_cache import response_cache
+
+router = APIRouter()
+
+
+@router.get("/pool")
+def get_pool_metrics():
+    # One entry per engine: "sync", plus "async" with DB_ASYNC=true
+    return pool_statuses(engine_pools())
+
+
+@router.get("/caches")
+def get_cache_metrics():
+    return {"plates": plate_cache.stats(), "responses": response_cache.stats()}
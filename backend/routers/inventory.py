@@ -1,146 +1,146 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from database import get_db
+from database import DbSession, get_async_db, run_db
+from pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from stock import low_stock_query, record_used_supplies
+from forecast import FORECAST_WINDOW_DAYS, FORECAST_AVERAGE_DAYS, get_supply_forecast, invalidate_supply_forecast
+from http_cache import conditional, tables_changed
 import models
-from sqlalchemy import func, and_
-from datetime import datetime, date, timedelta
+from pydantic import BaseModel, Field, model_validator
 
 router = APIRouter()
 
 
-@router.get("/dashboard-stats")
-def get_dashboard_stats(db: Session = Depends(get_db)):
-    # Get the current date
-    today = date.today()
+class SupplyCreate(BaseModel):
+    name: str
+    description: Optional[str] = None
+    current_stock: float = Field(ge=0)
+    minimum_stock: float = Field(ge=0)
+    unit: str
 
-    # Count pending services
-    pending_services = db.query(models.Service).filter(
-        models.Service.status.in_(["pending", "in_progress"])
-    ).count()
 
-    # Calculate daily revenue (completed services for today)
-    today_start = datetime.combine(today, datetime.min.time())
-    today_end = datetime.combine(today, datetime.max.time())
+class SupplyResponse(BaseModel):
+    id: int
+    name: str
+    description: Optional[str] = None
+    current_stock: float
+    minimum_stock: float
+    unit: str
 
-    daily_revenue = db.query(func.sum(models.Service.total_cost)).filter(
-        and_(
-            models.Service.status == "completed",
-            models.Service.end_time >= today_start,
-            models.Service.end_time <= today_end
-        )
-    ).scalar() or 0
+    class Config:
+        from_attributes = True
 
-    # Count active employees
-    active_employees = db.query(models.Employee).filter(models.Employee.active == True).count()
 
-    # Count total vehicles
-    total_vehicles = db.query(models.Vehicle).count()
+class UsedSupplyItem(BaseModel):
+    supply_id: int
+    quantity: float = Field(gt=0)
 
-    return {
-        "pendingServices": pending_services,
-        "dailyRevenue": float(daily_revenue),
-        "activeEmployees": active_employees,
-        "totalVehicles": total_vehicles
-    }
+
+class UsedSuppliesCreate(BaseModel):
+    # Either a list of items or a single supply_id/quantity pair
+    service_id: int
+    items: List[UsedSupplyItem] = []
+    supply_id: Optional[int] = None
+    quantity: Optional[float] = Field(None, gt=0)
+
+    @model_validator(mode="after")
+    def single_item(self):
+        if self.supply_id is not None and self.quantity is not None:
+            self.items = self.items + [UsedSupplyItem(supply_id=self.supply_id, quantity=self.quantity)]
+        if not self.items:
+            raise ValueError("At least one supply is required")
+        return self
+
+
+def serialize_supply(supply: models.Supply) -> dict:
+    return SupplyResponse.model_validate(supply).model_dump()
 
 
-@router.get("/daily-income")
-def get_daily_income(date: str = Query(..., description="Date in YYYY-MM-DD format"), db: Session = Depends(get_db)):
+def _create_supply(db: Session, supply: SupplyCreate) -> dict:
+    new_supply = models.Supply(**supply.model_dump())
+    db.add(new_supply)
     try:
-        # Parse the date
-        report_date = datetime.strptime(date, "%Y-%m-%d").date()
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
-
-    # Calculate start and end of the day
-    day_start = datetime.combine(report_date, datetime.min.time())
-    day_end = datetime.combine(report_date, datetime.max.time())
-
-    # Calculate total income for the day
-    total_income = db.query(func.sum(models.Service.total_cost)).filter(
-        and_(
-            models.Service.status == "completed",
-            models.Service.end_time >= day_start,
-            models.Service.end_time <= day_end
-        )
-    ).scalar() or 0
-
-    # Count completed services for the day
-    services_count = db.query(models.Service).filter(
-        and_(
-            models.Service.status == "completed",
-            models.Service.end_time >= day_start,
-            models.Service.end_time <= day_end
-        )
-    ).count()
-
-    return {
-        "date": date,
-        "total_income": float(total_income),
-        "services_count": services_count
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="A supply with this name already exists")
+    # Serialize before committing so the expired instance is not reloaded
+    response = serialize_supply(new_supply)
+    db.commit()
+    invalidate_supply_forecast()
+    tables_changed("supplies")
+    return response
+
+
+@router.post("/", response_model=SupplyResponse, status_code=status.HTTP_201_CREATED)
+async def create_supply(supply: SupplyCreate, db: DbSession = Depends(get_async_db)):
+    return await run_db(db, _create_supply, supply)
+
+
+def _get_supplies(db: Session, limit: Optional[int], after: Optional[str]) -> List[dict]:
+    query = db.query(models.Supply)
+    if after:
+        (last_id,) = decode_cursor(after, int)
+        query = query.filter(models.Supply.id > last_id)
+    return [serialize_supply(supply) for supply in query.order_by(models.Supply.id).limit(limit)]
+
+
+@router.get("/", response_model=List[SupplyResponse], dependencies=[conditional("supplies")])
+async def get_all_supplies(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header"),
+    db: DbSession = Depends(get_async_db)
+):
+    supplies = await run_db(db, _get_supplies, limit, after)
+    if limit and len(supplies) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(supplies[-1]["id"])
+    return supplies
+
+
+def _get_low_stock_supplies(db: Session) -> List[dict]:
+    return [serialize_supply(supply) for supply in low_stock_query(db)]
+
+
+@router.get("/low-stock", response_model=List[SupplyResponse], dependencies=[conditional("supplies")])
+async def get_low_stock_supplies(db: DbSession = Depends(get_async_db)):
+    return await run_db(db, _get_low_stock_supplies)
+
+
+@router.get("/forecast", response_model=List[dict])
+async def get_forecast(
+    window: int = Query(FORECAST_WINDOW_DAYS, ge=1, le=365, description="Days of usage history"),
+    average: int = Query(FORECAST_AVERAGE_DAYS, ge=1, le=365, description="Days in the moving average"),
+    db: DbSession = Depends(get_async_db)
+):
+    # When each supply reaches its minimum stock and runs out at the current rate
+    return await run_db(db, get_supply_forecast, window, average)
+
+
+def _use_supplies(db: Session, usage: UsedSuppliesCreate) -> dict:
+    # The same supply listed twice is deducted once with the summed quantity
+    quantities = {}
+    for item in usage.items:
+        quantities[item.supply_id] = quantities.get(item.supply_id, 0) + item.quantity
+
+    supplies = record_used_supplies(db, usage.service_id, quantities)
+    # Serialize before committing so the expired instances are not reloaded
+    response = {
+        "service_id": usage.service_id,
+        "used": [{"supply_id": supply_id, "quantity": quantity} for supply_id, quantity in quantities.items()],
+        "supplies": [
+            {**serialize_supply(supply), "low_stock": supply.current_stock <= supply.minimum_stock}
+            for supply in supplies
+        ]
     }
+    db.commit()
+    invalidate_supply_forecast()
+    tables_changed("supplies")
+    return response
 
 
-@router.get("/average-service-time")
-def get_average_service_time(db: Session = Depends(get_db)):
-    # Get all service types
-    service_types = db.query(models.ServiceType).all()
-
-    results = []
-    for service_type in service_types:
-        # Calculate average time for completed services of this type
-        # We need to convert timestamp difference to minutes
-        completed_services = db.query(models.Service).filter(
-            and_(
-                models.Service.service_type == service_type.name,
-                models.Service.status == "completed",
-                models.Service.end_time != None
-            )
-        ).all()
-
-        if completed_services:
-            total_minutes = 0
-            for service in completed_services:
-                # Calculate time difference in minutes
-                time_diff = (service.end_time - service.start_time).total_seconds() / 60
-                total_minutes += time_diff
-
-            avg_time = total_minutes / len(completed_services)
-        else:
-            # If no completed services, use the base duration from service_types
-            avg_time = service_type.base_duration
-
-        results.append({
-            "service_type": service_type.name,
-            "average_time": avg_time
-        })
-
-    return results
-
-
-@router.get("/vehicle-history/{plate_number}")
-def get_vehicle_history(plate_number: str, db: Session = Depends(get_db)):
-    # Find the vehicle
-    vehicle = db.query(models.Vehicle).filter(models.Vehicle.plate_number == plate_number).first()
-    if not vehicle:
-        raise HTTPException(status_code=404, detail="Vehicle not found")
-
-    # Get all services for this vehicle
-    services = db.query(models.Service).filter(models.Service.vehicle_id == vehicle.id).all()
-
-    result = []
-    for service in services:
-        employee = db.query(models.Employee).filter(models.Employee.id == service.employee_id).first()
-        result.append({
-            "service_date": service.start_time,
-            "service_type": service.service_type,
-            "total_cost": float(service.total_cost),
-            "employee_name": employee.name if employee else "Unknown",
-            "status": service.status
-        })
-
-    # Sort by date (newest first)
-    result.sort(key=lambda x: x["service_date"], reverse=True)
-
-    return result
\ No newline at end of file
+@router.post("/use", response_model=dict, status_code=status.HTTP_201_CREATED)
+async def use_supplies(usage: UsedSuppliesCreate, db: DbSession = Depends(get_async_db)):
+    return await run_db(db, _use_supplies, usage)
@@ -1,146 +1,112 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from database import get_db
+from database import DbSession, get_async_db, run_db
+from http_cache import conditional
+from pagination import NEXT_CURSOR_HEADER
 import models
+import dashboard
+from service_stats import average_service_times
+from vehicle_history import VEHICLE_HISTORY_PAGE_SIZE, get_vehicle_summary, get_vehicle_history as load_vehicle_history
+from revenue import GROUP_BY_PERIODS, GROUP_BY_DIMENSIONS, income_by_period
 from sqlalchemy import func, and_
 from datetime import datetime, date, timedelta
 
 router = APIRouter()
 
 
-@router.get("/dashboard-stats")
-def get_dashboard_stats(db: Session = Depends(get_db)):
-    # Get the current date
-    today = date.today()
+@router.get("/dashboard-stats", dependencies=[conditional("services", "employees", "vehicles", daily=True)])
+async def get_dashboard_stats(db: DbSession = Depends(get_async_db)):
+    return await run_db(db, dashboard.get_dashboard_stats)
 
-    # Count pending services
-    pending_services = db.query(models.Service).filter(
-        models.Service.status.in_(["pending", "in_progress"])
-    ).count()
 
-    # Calculate daily revenue (completed services for today)
-    today_start = datetime.combine(today, datetime.min.time())
-    today_end = datetime.combine(today, datetime.max.time())
+def _daily_income(db: Session, report_date: date) -> tuple:
+    # Calculate start and end of the day
+    day_start = datetime.combine(report_date, datetime.min.time())
+    day_end = datetime.combine(report_date, datetime.max.time())
 
-    daily_revenue = db.query(func.sum(models.Service.total_cost)).filter(
+    # Calculate total income and count completed services for the day in one scan
+    total_income, services_count = db.query(
+        func.sum(models.Service.total_cost),
+        func.count(models.Service.id)
+    ).filter(
         and_(
             models.Service.status == "completed",
-            models.Service.end_time >= today_start,
-            models.Service.end_time <= today_end
+            models.Service.end_time >= day_start,
+            models.Service.end_time <= day_end
         )
-    ).scalar() or 0
-
-    # Count active employees
-    active_employees = db.query(models.Employee).filter(models.Employee.active == True).count()
-
-    # Count total vehicles
-    total_vehicles = db.query(models.Vehicle).count()
+    ).one()
 
-    return {
-        "pendingServices": pending_services,
-        "dailyRevenue": float(daily_revenue),
-        "activeEmployees": active_employees,
-        "totalVehicles": total_vehicles
-    }
+    return float(total_income or 0), services_count
 
 
-@router.get("/daily-income")
-def get_daily_income(date: str = Query(..., description="Date in YYYY-MM-DD format"), db: Session = Depends(get_db)):
+@router.get("/daily-income", dependencies=[conditional("services")])
+async def get_daily_income(date: str = Query(..., description="Date in YYYY-MM-DD format"), db: DbSession = Depends(get_async_db)):
     try:
         # Parse the date
         report_date = datetime.strptime(date, "%Y-%m-%d").date()
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
 
-    # Calculate start and end of the day
-    day_start = datetime.combine(report_date, datetime.min.time())
-    day_end = datetime.combine(report_date, datetime.max.time())
-
-    # Calculate total income for the day
-    total_income = db.query(func.sum(models.Service.total_cost)).filter(
-        and_(
-            models.Service.status == "completed",
-            models.Service.end_time >= day_start,
-            models.Service.end_time <= day_end
-        )
-    ).scalar() or 0
-
-    # Count completed services for the day
-    services_count = db.query(models.Service).filter(
-        and_(
-            models.Service.status == "completed",
-            models.Service.end_time >= day_start,
-            models.Service.end_time <= day_end
-        )
-    ).count()
+    total_income, services_count = await run_db(db, _daily_income, report_date)
 
     return {
         "date": date,
-        "total_income": float(total_income),
+        "total_income": total_income,
         "services_count": services_count
     }
 
 
-@router.get("/average-service-time")
-def get_average_service_time(db: Session = Depends(get_db)):
-    # Get all service types
-    service_types = db.query(models.ServiceType).all()
-
-    results = []
-    for service_type in service_types:
-        # Calculate average time for completed services of this type
-        # We need to convert timestamp difference to minutes
-        completed_services = db.query(models.Service).filter(
-            and_(
-                models.Service.service_type == service_type.name,
-                models.Service.status == "completed",
-                models.Service.end_time != None
-            )
-        ).all()
-
-        if completed_services:
-            total_minutes = 0
-            for service in completed_services:
-                # Calculate time difference in minutes
-                time_diff = (service.end_time - service.start_time).total_seconds() / 60
-                total_minutes += time_diff
-
-            avg_time = total_minutes / len(completed_services)
-        else:
-            # If no completed services, use the base duration from service_types
-            avg_time = service_type.base_duration
-
-        results.append({
-            "service_type": service_type.name,
-            "average_time": avg_time
-        })
-
-    return results
-
-
-@router.get("/vehicle-history/{plate_number}")
-def get_vehicle_history(plate_number: str, db: Session = Depends(get_db)):
-    # Find the vehicle
-    vehicle = db.query(models.Vehicle).filter(models.Vehicle.plate_number == plate_number).first()
-    if not vehicle:
-        raise HTTPException(status_code=404, detail="Vehicle not found")
-
-    # Get all services for this vehicle
-    services = db.query(models.Service).filter(models.Service.vehicle_id == vehicle.id).all()
-
-    result = []
-    for service in services:
-        employee = db.query(models.Employee).filter(models.Employee.id == service.employee_id).first()
-        result.append({
-            "service_date": service.start_time,
-            "service_type": service.service_type,
-            "total_cost": float(service.total_cost),
-            "employee_name": employee.name if employee else "Unknown",
-            "status": service.status
-        })
-
-    # Sort by date (newest first)
-    result.sort(key=lambda x: x["service_date"], reverse=True)
-
-    return result
\ No newline at end of file
+@router.get("/income", dependencies=[conditional("services")])
+async def get_income(
+    date_from: str = Query(..., alias="from", description="First day in YYYY-MM-DD format"),
+    date_to: str = Query(..., alias="to", description="Last day in YYYY-MM-DD format"),
+    group_by: str = Query("day", description="day, week or month"),
+    by: Optional[str] = Query(None, description="service_type or employee"),
+    db: DbSession = Depends(get_async_db)
+):
+    try:
+        first_day = datetime.strptime(date_from, "%Y-%m-%d").date()
+        last_day = datetime.strptime(date_to, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
+    if first_day > last_day:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    if group_by not in GROUP_BY_PERIODS:
+        raise HTTPException(status_code=400, detail="Invalid group_by value")
+    if by is not None and by not in GROUP_BY_DIMENSIONS:
+        raise HTTPException(status_code=400, detail="Invalid by value")
+
+    # Served from the daily_revenue rollup (backfilled by migration 0006)
+    return await run_db(db, income_by_period, first_day, last_day, group_by, by)
+
+
+@router.get("/average-service-time", dependencies=[conditional("services")])
+async def get_average_service_time(
+    live: bool = Query(False, description="Aggregate the service history instead of reading the running stats"),
+    db: DbSession = Depends(get_async_db)
+):
+    return await run_db(db, average_service_times, live=live)
+
+
+@router.get("/vehicle-history/{plate_number}", response_model=List[dict], dependencies=[conditional("services", "vehicles")])
+async def get_vehicle_history(
+    plate_number: str,
+    response: Response,
+    limit: int = Query(VEHICLE_HISTORY_PAGE_SIZE, ge=1, le=1000),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header"),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: DbSession = Depends(get_async_db)
+):
+    services, next_cursor = await run_db(db, load_vehicle_history, plate_number, limit, after, date_from, date_to)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return services
+
+
+@router.get("/vehicle-history/{plate_number}/summary", dependencies=[conditional("services", "vehicles")])
+async def get_vehicle_history_summary(plate_number: str, db: DbSession = Depends(get_async_db)):
+    # Visit count, lifetime spend (completed services) and last visit
+    return await run_db(db, get_vehicle_summary, plate_number)
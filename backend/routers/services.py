@@ -1,9 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
-from database import get_db
+from database import DbSession, get_async_db, run_db
+from pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor, stream_ndjson
+from workload import ACTIVE_STATUSES, workload_counter
+from service_stats import record_service_time
+from revenue import record_revenue
+from dashboard import get_dashboard_stats, invalidate_dashboard_stats
+from events import service_events
+from http_cache import conditional, tables_changed
+from scheduler import scheduler
+from reference_data import get_reference_data, get_service_type
+from pricing import price_list, service_price
+from service_transitions import apply_transition, check_transition, load_idempotent_response, store_idempotent_response
+from fast_json import RowSchema, fast_json_enabled, json_response
 import models
-from datetime import datetime
+from datetime import datetime, date, timedelta
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -11,7 +24,8 @@ router = APIRouter()
 
 class ServiceCreate(BaseModel):
     vehicle_id: int
-    employee_id: int
+    # Assigned by the scheduler when omitted
+    employee_id: Optional[int] = None
     service_type_id: int
     notes: Optional[str] = None
 
@@ -27,128 +41,345 @@ class ServiceResponse(BaseModel):
     service_type: str
     status: str
     start_time: datetime
+    eta: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
 
-@router.post("/", response_model=ServiceResponse, status_code=status.HTTP_201_CREATED)
-def create_service(service: ServiceCreate, db: Session = Depends(get_db)):
-    # Check if vehicle exists
-    vehicle = db.query(models.Vehicle).filter(models.Vehicle.id == service.vehicle_id).first()
-    if not vehicle:
-        raise HTTPException(status_code=404, detail="Vehicle not found")
-
-    # Check if employee exists
-    employee = db.query(models.Employee).filter(models.Employee.id == service.employee_id).first()
-    if not employee:
-        raise HTTPException(status_code=404, detail="Employee not found")
-
-    # Get service type for total_cost calculation
-    service_type = db.query(models.ServiceType).filter(models.ServiceType.id == service.service_type_id).first()
+def _service_query(db: Session):
+    # Vehicle and employee are loaded in the same SELECT so listing N services
+    # costs a single round trip instead of 1 + 2N
+    return db.query(models.Service).options(
+        joinedload(models.Service.vehicle),
+        joinedload(models.Service.employee)
+    )
+
+
+# serialize_service's fields as columns, for the FAST_JSON path
+SERVICE_ROWS = RowSchema({
+    "id": models.Service.id,
+    "vehicle.plate_number": models.Vehicle.plate_number,
+    "vehicle.client_name": models.Vehicle.client_name,
+    "employee.name": models.Employee.name,
+    "service_type": models.Service.service_type,
+    "status": models.Service.status,
+    "start_time": models.Service.start_time,
+})
+
+
+def _service_row_query(db: Session):
+    # Same rows and joins as _service_query, as tuples instead of instances
+    return (
+        db.query(*SERVICE_ROWS.columns)
+        .select_from(models.Service)
+        .outerjoin(models.Service.vehicle)
+        .outerjoin(models.Service.employee)
+    )
+
+
+def serialize_service(service: models.Service, include_end_time: bool = False) -> dict:
+    data = {
+        "id": service.id,
+        "vehicle": {"plate_number": service.vehicle.plate_number, "client_name": service.vehicle.client_name},
+        "employee": {"name": service.employee.name},
+        "service_type": service.service_type,
+        "status": service.status,
+        "start_time": service.start_time
+    }
+    if include_end_time:
+        data["end_time"] = service.end_time
+    return data
+
+
+def _publish(db: Session, event_type: str, data: dict):
+    # Dashboard totals travel with the change so listening screens do not
+    # each re-query them; only computed when someone is listening
+    if service_events.has_subscribers:
+        data["dashboard"] = get_dashboard_stats(db)
+    service_events.publish(event_type, data)
+
+
+def service_board_snapshot(db: Session) -> dict:
+    # Initial state for /api/events clients: active services plus the ones
+    # completed today, and the dashboard totals
+    today_start = datetime.combine(date.today(), datetime.min.time())
+    services = _service_query(db).filter(or_(
+        models.Service.status.in_(ACTIVE_STATUSES),
+        and_(models.Service.status == "completed", models.Service.end_time >= today_start)
+    )).order_by(models.Service.start_time.desc(), models.Service.id.desc()).all()
+    return {
+        "services": [serialize_service(service, include_end_time=True) for service in services],
+        "dashboard": get_dashboard_stats(db)
+    }
+
+
+def _create_service(db: Session, service: ServiceCreate) -> dict:
+    # Service type and prices come from the reference data snapshot
+    service_type = get_service_type(db, service.service_type_id)
     if not service_type:
         raise HTTPException(status_code=404, detail="Service type not found")
-
-    # Calculate approximate cost based on service type
-    total_cost = 20.00  # Default cost
+    reference = get_reference_data(db)
+
+    # Without an explicit employee, reserve a place in the queue of the
+    # employee predicted to be free first
+    job = None
+    employee_id = service.employee_id
+    if employee_id is None:
+        job = scheduler.assign(db, service_type["name"])
+        if job is None:
+            raise HTTPException(status_code=409, detail="No active employee available")
+        employee_id = job.employee_id
+
+    # Vehicle and employee are checked in a single SELECT; the employee
+    # side is empty when the id does not exist
+    row = db.query(models.Vehicle, models.Employee).outerjoin(
+        models.Employee, models.Employee.id == employee_id
+    ).filter(models.Vehicle.id == service.vehicle_id).first()
+    vehicle, employee = row if row else (None, None)
+    if not vehicle or not employee:
+        if job:
+            scheduler.release(job)
+        raise HTTPException(status_code=404, detail="Vehicle not found" if not vehicle else "Employee not found")
 
     # Create new service
     new_service = models.Service(
-        vehicle_id=service.vehicle_id,
-        employee_id=service.employee_id,
+        vehicle=vehicle,
+        employee=employee,
         service_type_id=service.service_type_id,
-        service_type=service_type.name,
+        service_type=service_type["name"],
         status="pending",
         start_time=datetime.utcnow(),
-        total_cost=total_cost,
+        total_cost=service_price(reference, vehicle.vehicle_type, service_type),
         notes=service.notes
     )
     db.add(new_service)
-    db.commit()
-    db.refresh(new_service)
-
-    # Format the response
-    response = {
-        "id": new_service.id,
-        "vehicle": {"plate_number": vehicle.plate_number, "client_name": vehicle.client_name},
-        "employee": {"name": employee.name},
-        "service_type": service_type.name,
-        "status": new_service.status,
-        "start_time": new_service.start_time
-    }
-
-    return response
-
+    try:
+        # The INSERT assigns the id; everything else in the response is
+        # already known, so it is serialized before the commit expires it
+        db.flush()
+        response = serialize_service(new_service)
+        db.commit()
+    except Exception:
+        if job:
+            scheduler.release(job)
+        raise
+
+    service_id = response["id"]
+    workload_counter.service_created(employee_id, "pending")
+    if job:
+        scheduler.confirm(job, service_id)
+    else:
+        scheduler.service_created(service_id, employee_id, service_type["name"], "pending")
+    invalidate_dashboard_stats()
+    tables_changed("services")
+
+    _publish(db, "service.created", {"service": {**response, "end_time": None}})
+    eta = scheduler.eta(db, service_id)
+    return {**response, "eta": eta["eta"] if eta else None}
 
-@router.get("/", response_model=List[dict])
-def get_all_services(db: Session = Depends(get_db)):
-    services = db.query(models.Service).all()
-
-    response = []
-    for service in services:
-        vehicle = db.query(models.Vehicle).filter(models.Vehicle.id == service.vehicle_id).first()
-        employee = db.query(models.Employee).filter(models.Employee.id == service.employee_id).first()
-
-        response.append({
-            "id": service.id,
-            "vehicle": {"plate_number": vehicle.plate_number, "client_name": vehicle.client_name},
-            "employee": {"name": employee.name},
-            "service_type": service.service_type,
-            "status": service.status,
-            "start_time": service.start_time
-        })
 
+@router.post("/", response_model=ServiceResponse, status_code=status.HTTP_201_CREATED)
+async def create_service(service: ServiceCreate, db: DbSession = Depends(get_async_db)):
+    return await run_db(db, _create_service, service)
+
+
+def _get_service_eta(db: Session, service_id: int) -> dict:
+    eta = scheduler.eta(db, service_id)
+    if eta is None:
+        raise HTTPException(status_code=404, detail="Service is not queued")
+    return eta
+
+
+def _get_service_prices(db: Session) -> dict:
+    return price_list(get_reference_data(db))
+
+
+@router.get("/prices", response_model=dict)
+async def get_service_prices(db: DbSession = Depends(get_async_db)):
+    # Price of every service type for every vehicle type
+    return await run_db(db, _get_service_prices)
+
+
+@router.get("/queue", response_model=List[dict])
+async def get_service_queues(db: DbSession = Depends(get_async_db)):
+    # Every employee's queue with the predicted start and finish of each service
+    return await run_db(db, scheduler.queues)
+
+
+@router.get("/{service_id}/eta", response_model=dict)
+async def get_service_eta(service_id: int, db: DbSession = Depends(get_async_db)):
+    return await run_db(db, _get_service_eta, service_id)
+
+
+def _filtered_service_query(
+    db: Session,
+    status: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    employee_id: Optional[int] = None,
+    vehicle_type: Optional[str] = None,
+    after: Optional[str] = None,
+    rows: bool = False
+):
+    query = _service_row_query(db) if rows else _service_query(db)
+    if status:
+        query = query.filter(models.Service.status == status)
+    if date_from:
+        query = query.filter(models.Service.start_time >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        query = query.filter(models.Service.start_time < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    if employee_id:
+        query = query.filter(models.Service.employee_id == employee_id)
+    if vehicle_type:
+        query = query.filter(models.Service.vehicle.has(models.Vehicle.vehicle_type == vehicle_type))
+    if after:
+        # Keyset on (start_time, id), newest first
+        last_start_time, last_id = decode_cursor(after, datetime, int)
+        query = query.filter(or_(
+            models.Service.start_time < last_start_time,
+            and_(models.Service.start_time == last_start_time, models.Service.id < last_id)
+        ))
+    return query.order_by(models.Service.start_time.desc(), models.Service.id.desc())
+
+
+def _get_services(db: Session, build_query):
+    services = build_query(db).all()
+    next_cursor = encode_cursor(services[-1].start_time, services[-1].id) if services else None
+    return [serialize_service(service) for service in services], next_cursor
+
+
+def _get_service_rows(db: Session, build_query):
+    rows = build_query(db, rows=True).all()
+    next_cursor = encode_cursor(rows[-1].start_time, rows[-1].id) if rows else None
+    return SERVICE_ROWS.dicts(rows), next_cursor
+
+
+@router.get("/", response_model=List[dict], dependencies=[conditional("services", "vehicles", "employees")])
+async def get_all_services(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header"),
+    status: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    employee_id: Optional[int] = None,
+    vehicle_type: Optional[str] = None,
+    stream: bool = Query(False, description="Stream rows as NDJSON"),
+    db: DbSession = Depends(get_async_db)
+):
+    def build_query(session: Session, rows: bool = False):
+        return _filtered_service_query(
+            session, status, date_from, date_to, employee_id, vehicle_type, after, rows
+        ).limit(limit)
+
+    if stream:
+        return stream_ndjson(
+            db,
+            build_query,
+            lambda session, rows: (serialize_service(row) for row in rows)
+        )
+
+    fast = fast_json_enabled()
+    services, next_cursor = await run_db(db, _get_service_rows if fast else _get_services, build_query)
+    if limit and len(services) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return json_response(services, response) if fast else services
+
+
+def _get_pending_services(db: Session, rows: bool = False) -> List[dict]:
+    if rows:
+        return SERVICE_ROWS.dicts(_service_row_query(db).filter(models.Service.status == "pending").all())
+    services = _service_query(db).filter(models.Service.status == "pending").all()
+    return [serialize_service(service) for service in services]
+
+
+@router.get("/pending", response_model=List[dict], dependencies=[conditional("services", "vehicles", "employees")])
+async def get_pending_services(response: Response, db: DbSession = Depends(get_async_db)):
+    if fast_json_enabled():
+        return json_response(await run_db(db, _get_pending_services, True), response)
+    return await run_db(db, _get_pending_services)
+
+
+def _unchanged_status(db: Session, service: models.Service, idempotency_key: Optional[str]) -> dict:
+    response = serialize_service(service, include_end_time=True)
+    if idempotency_key:
+        # Remembered as well, so every retry with this key gets this answer
+        replay = store_idempotent_response(db, idempotency_key, service.id, service.status, response)
+        if replay is not None:
+            return replay
+        db.commit()
     return response
 
 
-@router.get("/pending", response_model=List[dict])
-def get_pending_services(db: Session = Depends(get_db)):
-    services = db.query(models.Service).filter(models.Service.status == "pending").all()
-
-    response = []
-    for service in services:
-        vehicle = db.query(models.Vehicle).filter(models.Vehicle.id == service.vehicle_id).first()
-        employee = db.query(models.Employee).filter(models.Employee.id == service.employee_id).first()
-
-        response.append({
-            "id": service.id,
-            "vehicle": {"plate_number": vehicle.plate_number, "client_name": vehicle.client_name},
-            "employee": {"name": employee.name},
-            "service_type": service.service_type,
-            "status": service.status,
-            "start_time": service.start_time
-        })
-
-    return response
-
+def _update_service_status(db: Session, service_id: int, status_update: ServiceUpdate, idempotency_key: Optional[str] = None) -> dict:
+    new_status = status_update.status
+    if idempotency_key:
+        # A retry of a request that already went through gets the same answer
+        replay = load_idempotent_response(db, idempotency_key, service_id, new_status)
+        if replay is not None:
+            return replay
 
-@router.patch("/{service_id}/status", response_model=dict)
-def update_service_status(service_id: int, status_update: ServiceUpdate, db: Session = Depends(get_db)):
-    service = db.query(models.Service).filter(models.Service.id == service_id).first()
+    service = _service_query(db).filter(models.Service.id == service_id).first()
     if not service:
         raise HTTPException(status_code=404, detail="Service not found")
 
-    if status_update.status not in ["pending", "in_progress", "completed", "cancelled"]:
-        raise HTTPException(status_code=400, detail="Invalid status value")
+    previous_status, employee_id = service.status, service.employee_id
+    if previous_status == new_status:
+        # Already there: a double tap, or a retry whose first attempt landed
+        return _unchanged_status(db, service, idempotency_key)
+    check_transition(previous_status, new_status)
+
+    previous_end_time = service.end_time
+    if new_status == "completed":
+        end_time = datetime.utcnow()
+    elif previous_status == "completed":
+        end_time = None
+    else:
+        end_time = previous_end_time
+
+    if not apply_transition(db, service_id, previous_status, previous_end_time, new_status, end_time):
+        # Another request changed the status (or end time) since it was read
+        db.rollback()
+        service = _service_query(db).filter(models.Service.id == service_id).populate_existing().first()
+        if service.status == new_status:
+            return _unchanged_status(db, service, idempotency_key)
+        check_transition(service.status, new_status)
+        raise HTTPException(status_code=409, detail={
+            "message": "The service was changed by another request, try again",
+            "status": service.status
+        })
 
-    service.status = status_update.status
+    # Only the request that changed the status updates the running duration
+    # stats of its type and the daily revenue rollup
+    if new_status == "completed":
+        record_service_time(db, service.service_type, service.start_time, end_time)
+        record_revenue(db, end_time.date(), service.service_type, employee_id, service.total_cost)
+    elif previous_status == "completed" and previous_end_time:
+        record_service_time(db, service.service_type, service.start_time, previous_end_time, removed=True)
+        record_revenue(db, previous_end_time.date(), service.service_type, employee_id, service.total_cost, removed=True)
+
+    response = {**serialize_service(service, include_end_time=True), "status": new_status, "end_time": end_time}
+    if idempotency_key:
+        replay = store_idempotent_response(db, idempotency_key, service_id, new_status, response)
+        if replay is not None:
+            return replay
+    db.commit()
 
-    # If the service is completed, update the end time
-    if status_update.status == "completed":
-        service.end_time = datetime.utcnow()
+    workload_counter.status_changed(employee_id, previous_status, new_status)
+    scheduler.status_changed(service_id, employee_id, response["service_type"], new_status)
+    invalidate_dashboard_stats()
+    tables_changed("services")
+    _publish(db, "service.updated", {"id": service_id, "status": new_status, "end_time": end_time})
 
-    db.commit()
-    db.refresh(service)
+    return response
 
-    vehicle = db.query(models.Vehicle).filter(models.Vehicle.id == service.vehicle_id).first()
-    employee = db.query(models.Employee).filter(models.Employee.id == service.employee_id).first()
 
-    return {
-        "id": service.id,
-        "vehicle": {"plate_number": vehicle.plate_number, "client_name": vehicle.client_name},
-        "employee": {"name": employee.name},
-        "service_type": service.service_type,
-        "status": service.status,
-        "start_time": service.start_time,
-        "end_time": service.end_time
-    }
\ No newline at end of file
+@router.patch("/{service_id}/status", response_model=dict)
+async def update_service_status(
+    service_id: int,
+    status_update: ServiceUpdate,
+    idempotency_key: Optional[str] = Header(None, max_length=64, description="Replays the first response when a request is retried"),
+    db: DbSession = Depends(get_async_db)
+):
+    return await run_db(db, _update_service_status, service_id, status_update, idempotency_key)
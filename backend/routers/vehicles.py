@@ -1,8 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import io
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+from typing import List, Optional
+from database import DbSession, get_async_db, run_db
+from pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor, stream_ndjson
 import models
+from dashboard import invalidate_dashboard_stats
+from http_cache import conditional, tables_changed
+from vehicle_import import bulk_register_vehicles, read_csv_rows, summarize
+from fast_json import RowSchema, fast_json_enabled, json_response
+from plate_cache import normalize_plate, cache_vehicle, get_cached_vehicle, load_vehicle, vehicle_to_dict
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -26,35 +34,127 @@ class VehicleResponse(BaseModel):
         from_attributes = True
 
 
-@router.post("/", response_model=VehicleResponse, status_code=status.HTTP_201_CREATED)
-def create_vehicle(vehicle: VehicleCreate, db: Session = Depends(get_db)):
-    # Check if vehicle with this plate already exists
-    db_vehicle = db.query(models.Vehicle).filter(models.Vehicle.plate_number == vehicle.plate_number).first()
-    if db_vehicle:
-        raise HTTPException(status_code=400, detail="Vehicle with this plate number already registered")
+# VehicleResponse's fields as columns, for the FAST_JSON path
+VEHICLE_ROWS = RowSchema({
+    "id": models.Vehicle.id,
+    "plate_number": models.Vehicle.plate_number,
+    "vehicle_type": models.Vehicle.vehicle_type,
+    "client_name": models.Vehicle.client_name,
+    "client_phone": models.Vehicle.client_phone,
+})
+
+
+def _create_vehicle(db: Session, vehicle: VehicleCreate) -> dict:
+    plate_number = normalize_plate(vehicle.plate_number)
 
-    # Create new vehicle
+    # Create new vehicle; a duplicate plate is caught by the unique index
+    # instead of a separate lookup first
     new_vehicle = models.Vehicle(
-        plate_number=vehicle.plate_number,
+        plate_number=plate_number,
         vehicle_type=vehicle.vehicle_type,
         client_name=vehicle.client_name,
         client_phone=vehicle.client_phone
     )
     db.add(new_vehicle)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Vehicle with this plate number already registered")
+    response = vehicle_to_dict(new_vehicle)
     db.commit()
-    db.refresh(new_vehicle)
-    return new_vehicle
 
+    invalidate_dashboard_stats()
+    tables_changed("vehicles")
+
+    # Check-in usually follows registration, so warm the plate cache
+    cache_vehicle(response)
+    return response
+
+
+@router.post("/", response_model=VehicleResponse, status_code=status.HTTP_201_CREATED)
+async def create_vehicle(vehicle: VehicleCreate, db: DbSession = Depends(get_async_db)):
+    return await run_db(db, _create_vehicle, vehicle)
+
+
+def _bulk_register(db: Session, rows) -> dict:
+    return summarize(list(bulk_register_vehicles(db, rows)))
+
+
+@router.post("/bulk", response_model=dict)
+async def bulk_create_vehicles(vehicles: List[dict], db: DbSession = Depends(get_async_db)):
+    # Rows are validated one by one so a bad row is reported instead of
+    # rejecting the whole request
+    return await run_db(db, _bulk_register, vehicles)
+
+
+@router.post("/bulk/csv", response_model=dict)
+async def bulk_import_vehicles_csv(file: UploadFile = File(...), db: DbSession = Depends(get_async_db)):
+    # The upload is parsed as it is read from the spooled temporary file
+    text_file = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        return await run_db(db, _bulk_register, read_csv_rows(text_file))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV file must be UTF-8 encoded")
+    finally:
+        text_file.detach()
+
+
+def _vehicle_query(db: Session, vehicle_type: Optional[str] = None, after: Optional[str] = None):
+    query = db.query(models.Vehicle)
+    if vehicle_type:
+        query = query.filter(models.Vehicle.vehicle_type == vehicle_type)
+    if after:
+        (last_id,) = decode_cursor(after, int)
+        query = query.filter(models.Vehicle.id > last_id)
+    return query.order_by(models.Vehicle.id)
+
+
+def _serialize_vehicles(db: Session, vehicles: List[models.Vehicle]) -> List[dict]:
+    return [VehicleResponse.model_validate(vehicle).model_dump() for vehicle in vehicles]
+
+
+def _get_vehicles(db: Session, limit: Optional[int], after: Optional[str], vehicle_type: Optional[str]):
+    vehicles = _vehicle_query(db, vehicle_type, after).limit(limit).all()
+    next_cursor = encode_cursor(vehicles[-1].id) if limit and len(vehicles) == limit else None
+    return _serialize_vehicles(db, vehicles), next_cursor
+
+
+def _get_vehicle_rows(db: Session, limit: Optional[int], after: Optional[str], vehicle_type: Optional[str]):
+    rows = _vehicle_query(db, vehicle_type, after).with_entities(*VEHICLE_ROWS.columns).limit(limit).all()
+    next_cursor = encode_cursor(rows[-1].id) if limit and len(rows) == limit else None
+    return VEHICLE_ROWS.dicts(rows), next_cursor
+
+
+@router.get("/", response_model=List[VehicleResponse], dependencies=[conditional("vehicles")])
+async def get_all_vehicles(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header"),
+    vehicle_type: Optional[str] = None,
+    stream: bool = Query(False, description="Stream rows as NDJSON"),
+    db: DbSession = Depends(get_async_db)
+):
+    if stream:
+        return stream_ndjson(
+            db,
+            lambda session: _vehicle_query(session, vehicle_type, after).limit(limit),
+            _serialize_vehicles
+        )
 
-@router.get("/", response_model=List[VehicleResponse])
-def get_all_vehicles(db: Session = Depends(get_db)):
-    vehicles = db.query(models.Vehicle).all()
-    return vehicles
+    fast = fast_json_enabled()
+    vehicles, next_cursor = await run_db(db, _get_vehicle_rows if fast else _get_vehicles, limit, after, vehicle_type)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return json_response(vehicles, response) if fast else vehicles
 
 
-@router.get("/{plate_number}", response_model=VehicleResponse)
-def get_vehicle_by_plate(plate_number: str, db: Session = Depends(get_db)):
-    vehicle = db.query(models.Vehicle).filter(models.Vehicle.plate_number == plate_number).first()
-    if not vehicle:
+@router.get("/{plate_number}", response_model=VehicleResponse, dependencies=[conditional("vehicles")])
+async def get_vehicle_by_plate(plate_number: str, db: DbSession = Depends(get_async_db)):
+    # Cache hits are answered without touching the database
+    vehicle = get_cached_vehicle(plate_number)
+    if vehicle is None:
+        vehicle = await run_db(db, load_vehicle, plate_number)
+    if vehicle is None:
         raise HTTPException(status_code=404, detail="Vehicle not found")
-    return vehicle
\ No newline at end of file
+    return vehicle
@@ -0,0 +1,396 @@
+import heapq
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+
+import models
+from service_stats import average_service_times
+from workload import ACTIVE_STATUSES
+
+DEFAULT_DURATION_MINUTES = 30
+# Active candidates checked against the database before the last one is
+# taken as is; inactive ones are dropped and do not count
+ASSIGN_ATTEMPTS = 3
+SCHEDULER_REFRESH_SECONDS = float(os.getenv("SCHEDULER_REFRESH_SECONDS", "60"))
+
+
+def _open_services_query(db: Session):
+    # (id, employee_id, service_type, status, start_time) of the open
+    # services, in arrival order
+    return db.query(
+        models.Service.id,
+        models.Service.employee_id,
+        models.Service.service_type,
+        models.Service.status,
+        models.Service.start_time
+    ).filter(
+        models.Service.status.in_(ACTIVE_STATUSES)
+    ).order_by(models.Service.start_time, models.Service.id)
+
+
+def _lock_employee_queue(db: Session, employee_id: int) -> Tuple[Optional[bool], list]:
+    # Locks the employee's row and its open services until the caller's
+    # transaction ends, reading both in one statement: (active or None when
+    # the employee does not exist, open services as _open_services_query
+    # returns them). Being a locking read, under REPEATABLE READ it sees the
+    # latest commits (a service another worker just assigned) rather than the
+    # transaction's snapshot.
+    rows = db.query(
+        models.Employee.active,
+        models.Service.id,
+        models.Service.employee_id,
+        models.Service.service_type,
+        models.Service.status,
+        models.Service.start_time
+    ).select_from(models.Employee).outerjoin(
+        models.Service,
+        and_(models.Service.employee_id == models.Employee.id, models.Service.status.in_(ACTIVE_STATUSES))
+    ).filter(
+        models.Employee.id == employee_id
+    ).order_by(models.Service.start_time, models.Service.id).with_for_update().all()
+    if not rows:
+        return None, []
+    return rows[0][0], [tuple(row[1:]) for row in rows if row[1] is not None]
+
+
+def to_timestamp(value: datetime) -> float:
+    # Service times are naive UTC (datetime.utcnow)
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def to_datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+class Job:
+    __slots__ = ("service_id", "employee_id", "service_type", "status", "minutes", "started_at")
+
+    def __init__(self, service_id: Optional[int], employee_id: int, service_type: str, status: str, minutes: float, started_at: Optional[float]):
+        self.service_id = service_id
+        self.employee_id = employee_id
+        self.service_type = service_type
+        self.status = status
+        self.minutes = minutes
+        # When work on it began; only meaningful while in progress
+        self.started_at = started_at
+
+
+class EmployeeQueue:
+    # Services assigned to one employee. In-progress services are worked first,
+    # one after another from the earliest start, then the pending ones in
+    # arrival order.
+
+    def __init__(self, employee_id: int, active: bool = True):
+        self.employee_id = employee_id
+        self.active = active
+        self.jobs: List[Job] = []
+        self.version = 0
+
+    def schedule(self, now: float) -> List[Tuple[Job, float, float]]:
+        # (job, predicted start, predicted finish) for every queued service
+        in_progress = sorted((job for job in self.jobs if job.status == "in_progress"), key=lambda job: job.started_at)
+        result = []
+        cursor = now
+        for index, job in enumerate(in_progress):
+            # The first one started when it was moved to in progress; the
+            # others follow it. Running over the estimate, a service can
+            # finish at any moment, so nothing is chained from the past: a
+            # service left in progress for days does not pull the rest of
+            # the queue back with it.
+            start = job.started_at if index == 0 else cursor
+            cursor = max(now, start + job.minutes * 60)
+            result.append((job, start, cursor))
+        for job in self.jobs:
+            if job.status == "pending":
+                start, cursor = cursor, cursor + job.minutes * 60
+                result.append((job, start, cursor))
+        return result
+
+    def available_at(self, now: float) -> float:
+        schedule = self.schedule(now)
+        return schedule[-1][2] if schedule else now
+
+
+class Scheduler:
+    # In-memory model of every employee's queue, used to assign new services
+    # to the employee who will be free first and to predict when each queued
+    # service will be done. Active employees sit in a min-heap keyed by their
+    # predicted availability, so an assignment costs O(log n) heap operations
+    # instead of a query over all open services.
+    #
+    # Heap entries are invalidated lazily: every change to a queue bumps its
+    # version and pushes a new entry, and stale ones are skipped when popped.
+    # A stored key can only be behind the real availability (an in-progress
+    # service running over its estimate), so the top entry is re-keyed when it
+    # is late and the heap order stays correct.
+    #
+    # The state is local to the worker process and is reloaded from the
+    # database every `refresh_seconds`, which also picks up durations learned
+    # by the service_type_stats table and writes made by other processes.
+    # Between reloads it can be behind the other workers, so an assignment
+    # only takes the in-memory choice as a candidate and checks it against
+    # the database under a lock on the employee's row (see assign).
+
+    def __init__(self, refresh_seconds: float = SCHEDULER_REFRESH_SECONDS, clock: Callable[[], float] = time.time):
+        self.refresh_seconds = refresh_seconds
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._queues: Optional[Dict[int, EmployeeQueue]] = None
+        self._jobs: Dict[int, Job] = {}
+        # Places handed out by assign whose service is not committed yet
+        self._reserved: Set[Job] = set()
+        self._durations: Dict[str, float] = {}
+        self._heap: List[Tuple[float, int, int]] = []
+        self._loaded_at = 0.0
+
+    def reset(self):
+        with self._lock:
+            self._queues = None
+            self._jobs = {}
+            self._reserved = set()
+            self._heap = []
+
+    def _ensure_loaded(self, db: Session):
+        if self._queues is not None and time.monotonic() - self._loaded_at < self.refresh_seconds:
+            return
+        # Queries run outside the lock: under the async session they await the
+        # database from the event loop thread. A change that races a reload is
+        # picked up by the next one.
+        employees = db.query(models.Employee.id, models.Employee.active).all()
+        services = _open_services_query(db).all()
+        durations = {row["service_type"]: row["average_time"] for row in average_service_times(db)}
+        self.load_state(employees, services, durations)
+
+    def load_state(self, employees: Iterable[Tuple[int, bool]], services: Iterable[tuple], durations: Dict[str, float]):
+        # employees: (id, active); services: (id, employee_id, service_type,
+        # status, start_time) of the open services in arrival order
+        with self._lock:
+            self._durations = {name: minutes for name, minutes in durations.items() if minutes}
+            jobs = self._load_jobs(services)
+            self._queues = {employee_id: EmployeeQueue(employee_id, bool(active)) for employee_id, active in employees}
+            self._jobs = {}
+            for job in jobs:
+                self._queues.setdefault(job.employee_id, EmployeeQueue(job.employee_id, active=False)).jobs.append(job)
+                self._jobs[job.service_id] = job
+            # Reservations still being committed are not in the database yet
+            for job in self._reserved:
+                self._queues.setdefault(job.employee_id, EmployeeQueue(job.employee_id, active=False)).jobs.append(job)
+
+            now = self.clock()
+            self._heap = [
+                (queue.available_at(now), queue.employee_id, queue.version)
+                for queue in self._queues.values()
+                if queue.active
+            ]
+            heapq.heapify(self._heap)
+            self._loaded_at = time.monotonic()
+
+    def _load_jobs(self, services: Iterable[tuple]) -> List[Job]:
+        # Jobs for (id, employee_id, service_type, status, start_time) rows
+        jobs = []
+        for service_id, employee_id, service_type, service_status, start_time in services:
+            known = self._jobs.get(service_id)
+            # When the service was moved to in progress is only known if it
+            # happened in this process; otherwise its creation time is used
+            if known is not None and known.status == "in_progress":
+                started_at = known.started_at
+            else:
+                started_at = to_timestamp(start_time) if start_time else self.clock()
+            jobs.append(Job(service_id, employee_id, service_type, service_status, self._minutes(service_type), started_at))
+        return jobs
+
+    def _minutes(self, service_type: str) -> float:
+        return self._durations.get(service_type) or DEFAULT_DURATION_MINUTES
+
+    def _changed(self, queue: EmployeeQueue, now: float):
+        queue.version += 1
+        if queue.active:
+            heapq.heappush(self._heap, (queue.available_at(now), queue.employee_id, queue.version))
+        # Stale entries are dropped lazily; rebuild when they dominate the heap
+        if len(self._heap) > 2 * len(self._queues) + 64:
+            self._heap = [entry for entry in self._heap if self._is_current(entry)]
+            heapq.heapify(self._heap)
+
+    def _is_current(self, entry: Tuple[float, int, int]) -> bool:
+        queue = self._queues.get(entry[1])
+        return queue is not None and queue.active and queue.version == entry[2]
+
+    def _earliest(self, now: float) -> Optional[EmployeeQueue]:
+        while self._heap:
+            key, employee_id, version = self._heap[0]
+            if not self._is_current(self._heap[0]):
+                heapq.heappop(self._heap)
+                continue
+            queue = self._queues[employee_id]
+            available_at = queue.available_at(now)
+            if available_at > max(key, now):
+                heapq.heapreplace(self._heap, (available_at, employee_id, version))
+                continue
+            return queue
+        return None
+
+    def assign(self, db: Session, service_type: str, attempts: int = ASSIGN_ATTEMPTS) -> Optional[Job]:
+        # Reserves a place for a new service in the queue of the employee who
+        # will be free first. The caller confirms it with the service id once
+        # the row is committed, or releases it.
+        #
+        # The in-memory queues only pick the candidate. The candidate's row is
+        # then locked in the caller's transaction, which serializes every
+        # assignment to that employee across workers until the new service
+        # is committed, and its open services are read again under the lock.
+        # If the up-to-date queue is no longer the earliest, the transaction
+        # is rolled back to release the lock and the next candidate is tried;
+        # the last one is taken as is. A candidate found inactive is dropped
+        # from the heap and does not use up an attempt. Call it before
+        # writing anything.
+        self._ensure_loaded(db)
+        attempt = 0
+        while True:
+            with self._lock:
+                queue = self._earliest(self.clock())
+                if queue is None:
+                    return None
+                employee_id = queue.employee_id
+
+            active, services = _lock_employee_queue(db, employee_id)
+            with self._lock:
+                now = self.clock()
+                queue = self._refresh_queue(employee_id, active, services)
+                if queue.active:
+                    attempt += 1
+                    earliest = self._earliest(now)
+                    if attempt >= attempts or earliest is None or earliest.available_at(now) >= queue.available_at(now):
+                        return self._reserve(queue, service_type)
+            db.rollback()
+
+    def reserve(self, service_type: str) -> Optional[Job]:
+        # assign without the database check, for a single process that sees
+        # every write (benchmarks/scheduling.py)
+        with self._lock:
+            queue = self._earliest(self.clock())
+            return self._reserve(queue, service_type) if queue is not None else None
+
+    def _reserve(self, queue: EmployeeQueue, service_type: str) -> Job:
+        job = Job(None, queue.employee_id, service_type, "pending", self._minutes(service_type), None)
+        queue.jobs.append(job)
+        self._reserved.add(job)
+        self._changed(queue, self.clock())
+        return job
+
+    def _refresh_queue(self, employee_id: int, active: Optional[bool], services: Iterable[tuple]) -> EmployeeQueue:
+        # Replaces one employee's queue with what the database holds, keeping
+        # the reservations of this process that are not committed yet
+        jobs = self._load_jobs(services)
+        queue = self._queues.setdefault(employee_id, EmployeeQueue(employee_id, active=False))
+        for job in queue.jobs:
+            if job.service_id is not None and self._jobs.get(job.service_id) is job:
+                del self._jobs[job.service_id]
+        queue.active = bool(active)
+        queue.jobs = jobs + [job for job in queue.jobs if job in self._reserved]
+        for job in jobs:
+            self._jobs[job.service_id] = job
+        self._changed(queue, self.clock())
+        return queue
+
+    def confirm(self, job: Job, service_id: int):
+        with self._lock:
+            self._reserved.discard(job)
+            if service_id in self._jobs:
+                # A reload read the committed row first; the reservation is
+                # already in the queue under its id
+                queue = self._queues.get(job.employee_id)
+                if queue is not None and job in queue.jobs:
+                    queue.jobs.remove(job)
+                    self._changed(queue, self.clock())
+                return
+            job.service_id = service_id
+            self._jobs[service_id] = job
+
+    def release(self, job: Job):
+        with self._lock:
+            self._reserved.discard(job)
+            queue = self._queues.get(job.employee_id) if self._queues is not None else None
+            if queue is not None and job in queue.jobs:
+                queue.jobs.remove(job)
+                self._changed(queue, self.clock())
+
+    def service_created(self, service_id: int, employee_id: int, service_type: str, service_status: str = "pending"):
+        # Services created with an explicit employee
+        self.status_changed(service_id, employee_id, service_type, service_status)
+
+    def status_changed(self, service_id: int, employee_id: int, service_type: str, service_status: str):
+        with self._lock:
+            # Nothing to do until the first assignment loads the state
+            if self._queues is None:
+                return
+            now = self.clock()
+            queue = self._queues.setdefault(employee_id, EmployeeQueue(employee_id, active=False))
+            job = self._jobs.get(service_id)
+            if service_status in ACTIVE_STATUSES:
+                if job is None:
+                    # Not queued yet (new, or a completed service reopened)
+                    job = Job(service_id, employee_id, service_type, "pending", self._minutes(service_type), None)
+                    queue.jobs.append(job)
+                    self._jobs[service_id] = job
+                if service_status == "in_progress" and job.status != "in_progress":
+                    job.started_at = now
+                job.status = service_status
+            elif job is not None:
+                del self._jobs[service_id]
+                if job in queue.jobs:
+                    queue.jobs.remove(job)
+            self._changed(queue, now)
+
+    def employee_changed(self, employee_id: int, active: bool):
+        with self._lock:
+            if self._queues is None:
+                return
+            queue = self._queues.setdefault(employee_id, EmployeeQueue(employee_id, active))
+            queue.active = active
+            self._changed(queue, self.clock())
+
+    def eta(self, db: Session, service_id: int) -> Optional[dict]:
+        self._ensure_loaded(db)
+        with self._lock:
+            job = self._jobs.get(service_id)
+            if job is None:
+                return None
+            now = self.clock()
+            for scheduled, start, finish in self._queues[job.employee_id].schedule(now):
+                if scheduled is job:
+                    return self._describe(job, start, finish)
+        return None
+
+    def queues(self, db: Session) -> List[dict]:
+        self._ensure_loaded(db)
+        with self._lock:
+            now = self.clock()
+            return [
+                {
+                    "employee_id": queue.employee_id,
+                    "active": queue.active,
+                    "available_at": to_datetime(queue.available_at(now)),
+                    "services": [self._describe(job, start, finish) for job, start, finish in queue.schedule(now)]
+                }
+                for queue in sorted(self._queues.values(), key=lambda queue: queue.employee_id)
+                if queue.active or queue.jobs
+            ]
+
+    def _describe(self, job: Job, start: float, finish: float) -> dict:
+        return {
+            "service_id": job.service_id,
+            "employee_id": job.employee_id,
+            "service_type": job.service_type,
+            "status": job.status,
+            "estimated_minutes": job.minutes,
+            "predicted_start": to_datetime(start),
+            "eta": to_datetime(finish)
+        }
+
+
+scheduler = Scheduler()
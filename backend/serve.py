@@ -0,0 +1,11 @@
+import os
+import sys
+
+from gunicorn.app.wsgiapp import run
+
+# Production entry point (see gunicorn.conf.py); run.py is the development
+# server with auto-reload
+if __name__ == "__main__":
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.argv = ["gunicorn", "--config", "gunicorn.conf.py", *sys.argv[1:]]
+    run()
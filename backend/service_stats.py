@@ -0,0 +1,181 @@
+import math
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import case, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+from reference_data import get_reference_data
+from sql_functions import minutes_between
+
+# Durations are stored as floats computed by Python or by the database, so
+# "is the current min/max" is checked with some slack (minutes)
+EXTREME_TOLERANCE = 1e-3
+
+
+def aggregate_service_times(db: Session) -> Dict[str, dict]:
+    # Count, sum, sum of squares, min and max of the duration of completed
+    # services, for every service type in one GROUP BY
+    minutes = minutes_between(models.Service.start_time, models.Service.end_time)
+    rows = db.query(
+        models.Service.service_type,
+        func.count(models.Service.id),
+        func.sum(minutes),
+        func.sum(minutes * minutes),
+        func.min(minutes),
+        func.max(minutes)
+    ).filter(
+        models.Service.status == "completed",
+        models.Service.end_time != None
+    ).group_by(models.Service.service_type).all()
+
+    return {
+        service_type: {
+            "completed_count": count,
+            "total_minutes": float(total or 0),
+            "total_minutes_squared": float(total_squared or 0),
+            "min_minutes": min_minutes,
+            "max_minutes": max_minutes
+        }
+        for service_type, count, total, total_squared, min_minutes, max_minutes in rows
+    }
+
+
+def rebuild_service_type_stats(db: Session) -> Dict[str, dict]:
+    # Backfill the running stats table from the full service history. The
+    # 0006 migration does the same when the table is added to an existing
+    # database; from then on update_service_status keeps it current. Rerun it
+    # by hand (python service_stats.py) to repair the table.
+    aggregates = aggregate_service_times(db)
+    db.query(models.ServiceTypeStats).delete(synchronize_session=False)
+    db.add_all([
+        models.ServiceTypeStats(service_type=service_type, **values)
+        for service_type, values in aggregates.items()
+    ])
+    db.commit()
+    return aggregates
+
+
+def record_service_time(db: Session, service_type: str, start_time: datetime, end_time: datetime, removed: bool = False):
+    # Add (or remove, when a completed service is reopened) one duration to the
+    # running stats of its type. Runs in the caller's transaction, as a single
+    # UPDATE with the increments computed by the database so concurrent
+    # completions are not lost. Min and max are widened on the way in; a
+    # removed value that was one of them is recomputed in the same UPDATE.
+    minutes = (end_time - start_time).total_seconds() / 60
+    sign = -1 if removed else 1
+    stats = models.ServiceTypeStats
+    values = {
+        stats.completed_count: stats.completed_count + sign,
+        stats.total_minutes: stats.total_minutes + sign * minutes,
+        stats.total_minutes_squared: stats.total_minutes_squared + sign * minutes * minutes
+    }
+    if not removed:
+        values[stats.min_minutes] = case(
+            (stats.min_minutes == None, minutes),
+            (stats.min_minutes > minutes, minutes),
+            else_=stats.min_minutes
+        )
+        values[stats.max_minutes] = case(
+            (stats.max_minutes == None, minutes),
+            (stats.max_minutes < minutes, minutes),
+            else_=stats.max_minutes
+        )
+    else:
+        values[stats.min_minutes] = case(
+            (stats.min_minutes > minutes - EXTREME_TOLERANCE, _completed_extreme(func.min, service_type)),
+            else_=stats.min_minutes
+        )
+        values[stats.max_minutes] = case(
+            (stats.max_minutes < minutes + EXTREME_TOLERANCE, _completed_extreme(func.max, service_type)),
+            else_=stats.max_minutes
+        )
+
+    query = db.query(stats).filter(stats.service_type == service_type)
+    if query.update(values, synchronize_session=False) or removed:
+        return
+
+    try:
+        with db.begin_nested():
+            db.add(stats(
+                service_type=service_type,
+                completed_count=1,
+                total_minutes=minutes,
+                total_minutes_squared=minutes * minutes,
+                min_minutes=minutes,
+                max_minutes=minutes
+            ))
+    except IntegrityError:
+        # Another request created the row first
+        query.update(values, synchronize_session=False)
+
+
+def _completed_extreme(aggregate, service_type: str):
+    # Min or max duration of the type's completed services, only evaluated by
+    # the CASE above when the removed duration was the current extreme. The
+    # caller has already moved the service out of completed, so it is not
+    # part of the result; with none left it is NULL, like an empty stats row.
+    minutes = minutes_between(models.Service.start_time, models.Service.end_time)
+    return (
+        select(aggregate(minutes))
+        .where(
+            models.Service.service_type == service_type,
+            models.Service.status == "completed",
+            models.Service.end_time != None
+        )
+        .scalar_subquery()
+    )
+
+
+def _summarize(service_type: dict, values: dict) -> dict:
+    count = values.get("completed_count") or 0
+    if count > 0:
+        average = values["total_minutes"] / count
+        variance = max(values["total_minutes_squared"] / count - average * average, 0)
+        stddev = math.sqrt(variance)
+    else:
+        # If no completed services, use the base duration from service_types
+        average = service_type["base_duration"]
+        stddev = None
+
+    return {
+        "service_type": service_type["name"],
+        "average_time": average,
+        "completed_services": count,
+        "stddev_time": stddev,
+        "min_time": values.get("min_minutes"),
+        "max_time": values.get("max_minutes")
+    }
+
+
+def average_service_times(db: Session, live: bool = False) -> List[dict]:
+    service_types = get_reference_data(db).service_type_list()
+
+    if live:
+        stats = aggregate_service_times(db)
+    else:
+        stats = {
+            row.service_type: {
+                "completed_count": row.completed_count,
+                "total_minutes": row.total_minutes,
+                "total_minutes_squared": row.total_minutes_squared,
+                "min_minutes": row.min_minutes,
+                "max_minutes": row.max_minutes
+            }
+            for row in db.query(models.ServiceTypeStats).all()
+        }
+
+    return [_summarize(service_type, stats.get(service_type["name"], {})) for service_type in service_types]
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        rebuilt = rebuild_service_type_stats(db)
+        print(f"Rebuilt stats for {len(rebuilt)} service types")
+    finally:
+        db.close()
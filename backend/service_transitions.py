@@ -0,0 +1,124 @@
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+
+# A retry replays the first response for this long; older keys are ignored
+# and purged, so the table holds about a day of status changes
+IDEMPOTENCY_KEY_TTL = timedelta(hours=float(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24")))
+# Each worker purges this often in the background (see main.py), a bounded
+# batch per transaction
+IDEMPOTENCY_PURGE_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_SECONDS", "300"))
+IDEMPOTENCY_PURGE_BATCH = 1000
+
+# Status -> statuses it may move to. A completed service can be reopened
+# after a mistaken tap, which takes it back out of the rollups; a
+# cancelled one is final.
+TRANSITIONS = {
+    "pending": {"in_progress", "completed", "cancelled"},
+    "in_progress": {"pending", "completed", "cancelled"},
+    "completed": {"pending", "in_progress"},
+    "cancelled": set(),
+}
+
+
+def check_transition(current_status: str, new_status: str):
+    if new_status not in TRANSITIONS:
+        raise HTTPException(status_code=400, detail="Invalid status value")
+    if new_status not in TRANSITIONS.get(current_status, ()):
+        raise HTTPException(status_code=409, detail={
+            "message": f"A {current_status} service cannot become {new_status}",
+            "status": current_status
+        })
+
+
+def apply_transition(db: Session, service_id: int, expected_status: str, expected_end_time: Optional[datetime],
+                     new_status: str, end_time: Optional[datetime]) -> bool:
+    # Compare-and-set in one UPDATE: it only applies while the row still has
+    # the status the request was checked against. Of two tablets completing
+    # the same service at once, exactly one changes it; the other gets
+    # False and nothing it did is counted. The end time is compared too,
+    # since the status alone can come back to the same value (completed,
+    # reopened, completed again) and a stale request would then remove the
+    # wrong end time from the rollups.
+    if expected_end_time is None:
+        same_end_time = models.Service.end_time.is_(None)
+    else:
+        same_end_time = models.Service.end_time == expected_end_time
+    result = db.execute(
+        update(models.Service)
+        .where(models.Service.id == service_id, models.Service.status == expected_status, same_end_time)
+        .values(status=new_status, end_time=end_time)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def load_idempotent_response(db: Session, key: str, service_id: int, new_status: str) -> Optional[dict]:
+    stored = db.get(models.IdempotencyKey, key)
+    if stored is None:
+        return None
+    if stored.created_at is not None and stored.created_at < datetime.utcnow() - IDEMPOTENCY_KEY_TTL:
+        # Expired but not purged yet: the key is free again
+        db.delete(stored)
+        db.flush()
+        return None
+    if stored.service_id != service_id or stored.status != new_status:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    return json.loads(stored.response)
+
+
+def store_idempotent_response(db: Session, key: str, service_id: int, new_status: str, response: dict):
+    # Part of the transition's transaction: the key is recorded if and only
+    # if the change is
+    db.add(models.IdempotencyKey(
+        key=key,
+        service_id=service_id,
+        status=new_status,
+        response=json.dumps(jsonable_encoder(response))
+    ))
+    try:
+        db.flush()
+    except IntegrityError:
+        # The same key raced this request and won; its change stands
+        db.rollback()
+        return load_idempotent_response(db, key, service_id, new_status)
+    return None
+
+
+def purge_expired_idempotency_keys(db: Session) -> int:
+    # Deletes the keys older than IDEMPOTENCY_KEY_TTL, a batch per
+    # transaction so the deletes never hold many locks at once. Runs off the
+    # request path: from the periodic task in main.py, or by hand
+    # (python service_transitions.py).
+    keys = models.IdempotencyKey
+    purged = 0
+    while True:
+        expired = [key for key, in db.query(keys.key).filter(
+            keys.created_at < datetime.utcnow() - IDEMPOTENCY_KEY_TTL
+        ).limit(IDEMPOTENCY_PURGE_BATCH)]
+        if not expired:
+            return purged
+        db.query(keys).filter(keys.key.in_(expired)).delete(synchronize_session=False)
+        db.commit()
+        purged += len(expired)
+        if len(expired) < IDEMPOTENCY_PURGE_BATCH:
+            return purged
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(f"Purged {purge_expired_idempotency_keys(db)} expired idempotency keys")
+    finally:
+        db.close()
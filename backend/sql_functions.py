@@ -0,0 +1,23 @@
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import Float
+
+
+class minutes_between(FunctionElement):
+    # Minutes elapsed between two DATETIME expressions, computed by the database
+    type = Float()
+    inherit_cache = True
+    name = "minutes_between"
+
+
+@compiles(minutes_between, "mysql")
+def _minutes_between_mysql(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return "TIMESTAMPDIFF(SECOND, %s, %s) / 60.0" % (compiler.process(start, **kw), compiler.process(end, **kw))
+
+
+@compiles(minutes_between)
+def _minutes_between_default(element, compiler, **kw):
+    # SQLite, used by the benchmarks as a stand-in for MySQL
+    start, end = list(element.clauses)
+    return "(julianday(%s) - julianday(%s)) * 1440.0" % (compiler.process(end, **kw), compiler.process(start, **kw))
@@ -0,0 +1,73 @@
+from typing import Dict, List
+
+from fastapi import HTTPException
+from sqlalchemy import case, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+
+
+def low_stock_query(db: Session):
+    # Same rows as the low_stock_supplies view, emptiest first; the order is
+    # read from idx_supply_stock
+    return db.query(models.Supply).filter(
+        models.Supply.current_stock <= models.Supply.minimum_stock
+    ).order_by(models.Supply.current_stock, models.Supply.id)
+
+
+def record_used_supplies(db: Session, service_id: int, quantities: Dict[int, float]) -> List[models.Supply]:
+    # Deducts every supply used by a service in the caller's transaction and
+    # returns the updated supplies; the caller commits. The stock is
+    # changed by a single UPDATE ... CASE computed by the database, guarded so
+    # it only applies when every supply has enough stock; concurrent bays
+    # never read, modify and write back a stale value. Costs the same three
+    # statements for one supply or fifty. When the service or a supply is
+    # missing, or a supply is short, the transaction is rolled back and
+    # nothing is recorded; an unknown service is reported by the foreign key.
+    supply = models.Supply
+    result = db.execute(
+        update(supply)
+        .where(
+            supply.id.in_(list(quantities)),
+            case(
+                {supply_id: supply.current_stock >= quantity for supply_id, quantity in quantities.items()},
+                value=supply.id
+            )
+        )
+        .values(current_stock=case(
+            {supply_id: supply.current_stock - quantity for supply_id, quantity in quantities.items()},
+            value=supply.id
+        ))
+        .execution_options(synchronize_session=False)
+    )
+
+    if result.rowcount != len(quantities):
+        db.rollback()
+        _raise_for_missing_stock(db, quantities)
+
+    try:
+        db.execute(insert(models.UsedSupply), [
+            {"service_id": service_id, "supply_id": supply_id, "quantity": quantity}
+            for supply_id, quantity in quantities.items()
+        ])
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Service not found")
+    return db.query(supply).filter(supply.id.in_(list(quantities))).order_by(supply.id).all()
+
+
+def _raise_for_missing_stock(db: Session, quantities: Dict[int, float]):
+    stock = dict(
+        db.query(models.Supply.id, models.Supply.current_stock).filter(models.Supply.id.in_(list(quantities)))
+    )
+    missing = sorted(supply_id for supply_id in quantities if supply_id not in stock)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Supply not found: {', '.join(map(str, missing))}")
+
+    short = [
+        {"supply_id": supply_id, "requested": quantity, "available": stock[supply_id]}
+        for supply_id, quantity in sorted(quantities.items())
+        if stock[supply_id] < quantity
+    ]
+    raise HTTPException(status_code=409, detail={"message": "Insufficient stock", "supplies": short})
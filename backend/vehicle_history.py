@@ -0,0 +1,91 @@
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.orm import Session
+
+import models
+from pagination import encode_cursor, decode_cursor
+from plate_cache import lookup_vehicle
+
+# Services per page when the client does not ask for a limit
+VEHICLE_HISTORY_PAGE_SIZE = 50
+
+
+def _find_vehicle(db: Session, plate_number: str) -> dict:
+    vehicle = lookup_vehicle(db, plate_number)
+    if not vehicle:
+        raise HTTPException(status_code=404, detail="Vehicle not found")
+    return vehicle
+
+
+def get_vehicle_history(
+    db: Session,
+    plate_number: str,
+    limit: int = VEHICLE_HISTORY_PAGE_SIZE,
+    after: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None
+) -> Tuple[List[dict], Optional[str]]:
+    # One page of the vehicle's services, newest first, with the employee
+    # name joined in, and the cursor of the next page
+    vehicle = _find_vehicle(db, plate_number)
+
+    service = models.Service
+    query = db.query(
+        service.id,
+        service.start_time,
+        service.service_type,
+        service.total_cost,
+        service.status,
+        models.Employee.name
+    ).outerjoin(models.Employee, models.Employee.id == service.employee_id).filter(
+        service.vehicle_id == vehicle["id"]
+    )
+    if date_from:
+        query = query.filter(service.start_time >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        query = query.filter(service.start_time < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    if after:
+        # Keyset on (start_time, id), newest first
+        last_start_time, last_id = decode_cursor(after, datetime, int)
+        query = query.filter(or_(
+            service.start_time < last_start_time,
+            and_(service.start_time == last_start_time, service.id < last_id)
+        ))
+    rows = query.order_by(service.start_time.desc(), service.id.desc()).limit(limit).all()
+
+    services = [
+        {
+            "service_date": row.start_time,
+            "service_type": row.service_type,
+            "total_cost": float(row.total_cost),
+            "employee_name": row.name or "Unknown",
+            "status": row.status
+        }
+        for row in rows
+    ]
+    next_cursor = encode_cursor(rows[-1].start_time, rows[-1].id) if len(rows) == limit else None
+    return services, next_cursor
+
+
+def get_vehicle_summary(db: Session, plate_number: str) -> dict:
+    # Lifetime aggregates over the vehicle's services, in one pass over its
+    # rows of idx_service_vehicle_start
+    vehicle = _find_vehicle(db, plate_number)
+
+    service = models.Service
+    visit_count, lifetime_spend, last_visit = db.query(
+        func.count(service.id),
+        func.sum(case((service.status == "completed", service.total_cost))),
+        func.max(service.start_time)
+    ).filter(service.vehicle_id == vehicle["id"]).one()
+
+    return {
+        "plate_number": vehicle["plate_number"],
+        "client_name": vehicle["client_name"],
+        "visit_count": visit_count,
+        "lifetime_spend": float(lifetime_spend or 0),
+        "last_visit": last_visit
+    }
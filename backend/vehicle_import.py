@@ -0,0 +1,141 @@
+import argparse
+import csv
+from itertools import islice
+from typing import Iterable, Iterator, List
+
+from pydantic import BaseModel, ValidationError, field_validator
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+from dashboard import invalidate_dashboard_stats
+from http_cache import tables_changed
+from plate_cache import normalize_plate, cache_vehicle
+
+BATCH_SIZE = 1000
+CSV_COLUMNS = ("plate_number", "vehicle_type", "client_name", "client_phone")
+
+
+class VehicleRow(BaseModel):
+    plate_number: str
+    vehicle_type: str
+    client_name: str
+    client_phone: str
+
+    @field_validator("plate_number")
+    @classmethod
+    def normalize_plate_number(cls, plate_number: str) -> str:
+        return normalize_plate(plate_number)
+
+
+def _existing_plates(db: Session, plates: List[str]) -> dict:
+    rows = db.query(models.Vehicle.plate_number, models.Vehicle.id).filter(
+        models.Vehicle.plate_number.in_(plates)
+    )
+    return dict(rows.all())
+
+
+def _register_batch(db: Session, batch: List[tuple]) -> List[dict]:
+    results = []
+    valid = {}
+    for row_number, row in batch:
+        try:
+            vehicle = VehicleRow.model_validate(row)
+        except ValidationError as error:
+            first_error = error.errors()[0]
+            field = ".".join(str(part) for part in first_error["loc"])
+            results.append({"row": row_number, "status": "invalid", "error": f"{field}: {first_error['msg']}"})
+            continue
+        if vehicle.plate_number in valid:
+            results.append({"row": row_number, "plate_number": vehicle.plate_number, "status": "duplicate"})
+            continue
+        valid[vehicle.plate_number] = (row_number, vehicle)
+
+    if not valid:
+        return results
+
+    for attempt in range(2):
+        # One IN lookup for the whole batch, then a single multi-row INSERT
+        existing = _existing_plates(db, list(valid))
+        new_rows = [vehicle.model_dump() for plate, (_, vehicle) in valid.items() if plate not in existing]
+        try:
+            if new_rows:
+                db.execute(insert(models.Vehicle), new_rows)
+            db.commit()
+            break
+        except IntegrityError:
+            # A plate in the batch was registered concurrently; look them up again
+            db.rollback()
+            if attempt:
+                raise
+
+    created = _existing_plates(db, [row["plate_number"] for row in new_rows]) if new_rows else {}
+    for plate, (row_number, vehicle) in valid.items():
+        if plate in existing:
+            results.append({"row": row_number, "plate_number": plate, "status": "duplicate", "id": existing[plate]})
+        else:
+            results.append({"row": row_number, "plate_number": plate, "status": "created", "id": created.get(plate)})
+            cache_vehicle({"id": created.get(plate), **vehicle.model_dump()})
+
+    results.sort(key=lambda result: result["row"])
+    return results
+
+
+def bulk_register_vehicles(db: Session, rows: Iterable[dict], batch_size: int = BATCH_SIZE) -> Iterator[dict]:
+    # Registers vehicles in batched transactions and yields one result per
+    # input row as each batch is committed. Rows are consumed lazily, so a
+    # large CSV never has to be held in memory.
+    numbered = enumerate(rows, start=1)
+    created = False
+    try:
+        while True:
+            batch = list(islice(numbered, batch_size))
+            if not batch:
+                break
+            for result in _register_batch(db, batch):
+                created = created or result["status"] == "created"
+                yield result
+    finally:
+        if created:
+            invalidate_dashboard_stats()
+            tables_changed("vehicles")
+
+
+def summarize(results: List[dict]) -> dict:
+    summary = {"created": 0, "duplicate": 0, "invalid": 0}
+    for result in results:
+        summary[result["status"]] += 1
+    return {**summary, "results": results}
+
+
+def read_csv_rows(text_file) -> Iterator[dict]:
+    # Header row with at least the CSV_COLUMNS names; extra columns are ignored
+    for row in csv.DictReader(text_file):
+        yield {column: (row.get(column) or "").strip() or None for column in CSV_COLUMNS}
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Import vehicles from a CSV file")
+    parser.add_argument("path", help="CSV with plate_number, vehicle_type, client_name, client_phone columns")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--verbose", action="store_true", help="Print every duplicate or invalid row")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    counts = {"created": 0, "duplicate": 0, "invalid": 0}
+    try:
+        with open(args.path, newline="", encoding="utf-8") as f:
+            for result in bulk_register_vehicles(db, read_csv_rows(f), args.batch_size):
+                counts[result["status"]] += 1
+                if args.verbose and result["status"] != "created":
+                    print(result)
+                total = sum(counts.values())
+                if total % args.batch_size == 0:
+                    print(f"{total} rows processed")
+    finally:
+        db.close()
+
+    print(f"Created: {counts['created']}, duplicates: {counts['duplicate']}, invalid: {counts['invalid']}")
@@ -0,0 +1,84 @@
+import os
+import threading
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import models
+
+# Statuses that count towards an employee's current workload
+ACTIVE_STATUSES = ("pending", "in_progress")
+
+
+def get_workloads(db: Session, employee_ids: Optional[Iterable[int]] = None) -> Dict[int, Dict[str, int]]:
+    # Per-status service counts for every employee in a single GROUP BY
+    query = db.query(
+        models.Service.employee_id,
+        models.Service.status,
+        func.count(models.Service.id)
+    )
+    if employee_ids is not None:
+        query = query.filter(models.Service.employee_id.in_(list(employee_ids)))
+
+    workloads = {}
+    for employee_id, service_status, count in query.group_by(models.Service.employee_id, models.Service.status):
+        workloads.setdefault(employee_id, {})[service_status] = count
+    return workloads
+
+
+def current_workload(counts: Dict[str, int]) -> int:
+    return sum(counts.get(service_status, 0) for service_status in ACTIVE_STATUSES)
+
+
+class WorkloadCounter:
+    # In-process per-employee status counts, loaded from the database once and
+    # then kept up to date by the services router. Counts are local to the
+    # worker process, so only enable it when a single process owns the writes.
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counts: Optional[Dict[int, Dict[str, int]]] = None
+
+    def get(self, db: Session, employee_ids: Optional[Iterable[int]] = None) -> Dict[int, Dict[str, int]]:
+        with self._lock:
+            if self._counts is None:
+                self._counts = get_workloads(db)
+            if employee_ids is None:
+                return {employee_id: dict(counts) for employee_id, counts in self._counts.items()}
+            return {
+                employee_id: dict(self._counts[employee_id])
+                for employee_id in employee_ids
+                if employee_id in self._counts
+            }
+
+    def service_created(self, employee_id: int, service_status: str):
+        self._adjust(employee_id, None, service_status)
+
+    def status_changed(self, employee_id: int, old_status: str, new_status: str):
+        if old_status != new_status:
+            self._adjust(employee_id, old_status, new_status)
+
+    def reset(self):
+        with self._lock:
+            self._counts = None
+
+    def _adjust(self, employee_id: int, old_status: Optional[str], new_status: str):
+        with self._lock:
+            # Nothing to do until the first read loads the counts from the database
+            if self._counts is None:
+                return
+            counts = self._counts.setdefault(employee_id, {})
+            if old_status is not None:
+                counts[old_status] = counts.get(old_status, 0) - 1
+            counts[new_status] = counts.get(new_status, 0) + 1
+
+
+workload_counter = WorkloadCounter(enabled=os.getenv("WORKLOAD_COUNTER_ENABLED", "false").lower() == "true")
+
+
+def load_workloads(db: Session, employee_ids: Optional[Iterable[int]] = None) -> Dict[int, Dict[str, int]]:
+    if workload_counter.enabled:
+        return workload_counter.get(db, employee_ids)
+    return get_workloads(db, employee_ids)
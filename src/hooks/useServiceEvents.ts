@@ -0,0 +1,55 @@
+import { useEffect, useRef } from 'react';
+
+export interface DashboardTotals {
+  pendingServices: number;
+  dailyRevenue: number;
+  activeEmployees: number;
+  totalVehicles: number;
+}
+
+export interface BoardService {
+  id: number;
+  vehicle: {
+    plate_number: string;
+    client_name: string;
+  };
+  service_type: string;
+  status: string;
+  employee: {
+    name: string;
+  };
+  start_time: string;
+  end_time?: string | null;
+}
+
+export interface ServiceEventHandlers {
+  onSnapshot?: (snapshot: { services: BoardService[]; dashboard: DashboardTotals }) => void;
+  onCreated?: (event: { service: BoardService; dashboard?: DashboardTotals }) => void;
+  onUpdated?: (event: { id: number; status: string; end_time: string | null; dashboard?: DashboardTotals }) => void;
+}
+
+// The push channel is per server worker: a screen connected to one worker does
+// not hear about writes handled by the others. Screens that rely on it still
+// refetch this often, which bounds how long such a change stays hidden.
+export const SERVICE_EVENTS_REFETCH_MS = 30_000;
+
+// Subscribes to the service board push channel. EventSource reconnects on its
+// own and sends Last-Event-ID, so the server replays what was missed or sends
+// a new snapshot.
+export function useServiceEvents(handlers: ServiceEventHandlers) {
+  const handlersRef = useRef(handlers);
+  handlersRef.current = handlers;
+
+  useEffect(() => {
+    const source = new EventSource('http://localhost:8000/api/events');
+    const listen = (type: string, handle: (data: any) => void) => {
+      source.addEventListener(type, (event) => handle(JSON.parse((event as MessageEvent).data)));
+    };
+
+    listen('snapshot', (data) => handlersRef.current.onSnapshot?.(data));
+    listen('service.created', (data) => handlersRef.current.onCreated?.(data));
+    listen('service.updated', (data) => handlersRef.current.onUpdated?.(data));
+
+    return () => source.close();
+  }, []);
+}
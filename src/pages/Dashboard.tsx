@@ -1,7 +1,8 @@
 import React from 'react';
-import { useQuery } from '@tanstack/react-query';
+import { useQuery, useQueryClient } from '@tanstack/react-query';
 import axios from 'axios';
 import { BarChart2, Car, DollarSign, Users } from 'lucide-react';
+import { SERVICE_EVENTS_REFETCH_MS, useServiceEvents } from '../hooks/useServiceEvents';
 
 interface DashboardStats {
   pendingServices: number;
@@ -11,12 +12,26 @@ interface DashboardStats {
 }
 
 function Dashboard() {
+  const queryClient = useQueryClient();
+
   const { data: stats, isLoading } = useQuery<DashboardStats>({
     queryKey: ['dashboardStats'],
     queryFn: async () => {
       const response = await axios.get('http://localhost:8000/api/reports/dashboard-stats');
       return response.data;
     },
+    refetchInterval: SERVICE_EVENTS_REFETCH_MS,
+  });
+
+  // Service changes carry the new totals; vehicle and employee changes still
+  // show up on the next fetch
+  const setStats = (dashboard?: DashboardStats) => {
+    if (dashboard) queryClient.setQueryData(['dashboardStats'], dashboard);
+  };
+  useServiceEvents({
+    onSnapshot: ({ dashboard }) => setStats(dashboard),
+    onCreated: ({ dashboard }) => setStats(dashboard),
+    onUpdated: ({ dashboard }) => setStats(dashboard),
   });
 
   const statCards = [
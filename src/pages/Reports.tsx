@@ -21,6 +21,14 @@ interface VehicleHistory {
   employee_name: string;
 }
 
+interface VehicleSummary {
+  plate_number: string;
+  client_name: string;
+  visit_count: number;
+  lifetime_spend: number;
+  last_visit: string | null;
+}
+
 function Reports() {
   const [selectedDate, setSelectedDate] = useState(new Date().toISOString().split('T')[0]);
   const [searchPlate, setSearchPlate] = useState('');
@@ -45,7 +53,8 @@ function Reports() {
     },
   });
 
-  const { data: vehicleHistory, isLoading: isLoadingHistory } = useQuery<VehicleHistory[]>({
+  // Most recent page of services; older ones follow the X-Next-Cursor header
+  const { data: vehicleHistory, isLoading: isLoadingHistory } = useQuery<VehicleHistory[] | null>({
     queryKey: ['vehicleHistory', searchPlate],
     queryFn: async () => {
       if (!searchPlate) return null;
@@ -57,6 +66,18 @@ function Reports() {
     enabled: !!searchPlate,
   });
 
+  const { data: vehicleSummary } = useQuery<VehicleSummary | null>({
+    queryKey: ['vehicleSummary', searchPlate],
+    queryFn: async () => {
+      if (!searchPlate) return null;
+      const response = await axios.get(
+        `http://localhost:8000/api/reports/vehicle-history/${searchPlate}/summary`
+      );
+      return response.data;
+    },
+    enabled: !!searchPlate,
+  });
+
   return (
     <div className="space-y-6">
       <div className="flex items-center space-x-4">
@@ -155,6 +176,17 @@ function Reports() {
               </div>
             ) : vehicleHistory ? (
               <div className="overflow-x-auto">
+                {vehicleSummary && (
+                  <div className="flex justify-between text-sm text-gray-600 mb-4">
+                    <span>{vehicleSummary.visit_count} visits</span>
+                    <span>${vehicleSummary.lifetime_spend.toFixed(2)} lifetime spend</span>
+                    {vehicleSummary.last_visit && (
+                      <span>
+                        Last visit {new Date(vehicleSummary.last_visit).toLocaleDateString()}
+                      </span>
+                    )}
+                  </div>
+                )}
                 <table className="min-w-full divide-y divide-gray-200">
                   <thead className="bg-gray-50">
                     <tr>
@@ -2,6 +2,7 @@ import React from 'react';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import axios from 'axios';
 import { Droplets, Clock, CheckCircle, XCircle } from 'lucide-react';
+import { SERVICE_EVENTS_REFETCH_MS, useServiceEvents } from '../hooks/useServiceEvents';
 
 interface Service {
   id: number;
@@ -10,7 +11,7 @@ interface Service {
     client_name: string;
   };
   service_type: string;
-  status: 'pending' | 'in_progress' | 'completed';
+  status: 'pending' | 'in_progress' | 'completed' | 'cancelled';
   employee: {
     name: string;
   };
@@ -26,20 +27,55 @@ function ServiceManagement() {
       const response = await axios.get('http://localhost:8000/api/services');
       return response.data;
     },
+    // Kept current by the push channel below; the refetch picks up changes
+    // made through other server workers
+    staleTime: SERVICE_EVENTS_REFETCH_MS,
+    refetchInterval: SERVICE_EVENTS_REFETCH_MS,
+  });
+
+  const upsertServices = (changed: Service[]) => {
+    queryClient.setQueryData<Service[]>(['services'], (current) => {
+      if (!current) return current;
+      const byId = new Map(changed.map((service) => [service.id, service]));
+      const merged = current.map((service) => byId.get(service.id) ?? service);
+      const known = new Set(current.map((service) => service.id));
+      return [...changed.filter((service) => !known.has(service.id)), ...merged];
+    });
+  };
+
+  useServiceEvents({
+    onSnapshot: ({ services }) => upsertServices(services as Service[]),
+    onCreated: ({ service }) => upsertServices([service as Service]),
+    onUpdated: ({ id, status }) => {
+      queryClient.setQueryData<Service[]>(['services'], (current) =>
+        current?.map((service) =>
+          service.id === id ? { ...service, status: status as Service['status'] } : service
+        )
+      );
+    },
   });
 
   const updateStatus = useMutation({
-    mutationFn: async ({ id, status }: { id: number; status: string }) => {
-      const response = await axios.patch(`http://localhost:8000/api/services/${id}/status`, {
-        status,
-      });
+    mutationFn: async ({ id, status, key }: { id: number; status: string; key: string }) => {
+      const response = await axios.patch(
+        `http://localhost:8000/api/services/${id}/status`,
+        { status },
+        // Retries reuse the key, so a tap that did land is not applied twice
+        { headers: { 'Idempotency-Key': key } }
+      );
       return response.data;
     },
-    onSuccess: () => {
-      queryClient.invalidateQueries({ queryKey: ['services'] });
+    // Only lost connections and server errors; a 409 will not go away
+    retry: (failureCount, error) =>
+      failureCount < 2 && (!axios.isAxiosError(error) || !error.response || error.response.status >= 500),
+    onSuccess: (service: Service) => {
+      upsertServices([service]);
     },
   });
 
+  const changeStatus = (id: number, status: string) =>
+    updateStatus.mutate({ id, status, key: crypto.randomUUID() });
+
   const getStatusColor = (status: string) => {
     switch (status) {
       case 'pending':
@@ -124,7 +160,7 @@ function ServiceManagement() {
                     {service.status === 'pending' && (
                       <button
                         onClick={() =>
-                          updateStatus.mutate({ id: service.id, status: 'in_progress' })
+                          changeStatus(service.id, 'in_progress')
                         }
                         className="text-blue-600 hover:text-blue-900"
                       >
@@ -134,17 +170,17 @@ function ServiceManagement() {
                     {service.status === 'in_progress' && (
                       <button
                         onClick={() =>
-                          updateStatus.mutate({ id: service.id, status: 'completed' })
+                          changeStatus(service.id, 'completed')
                         }
                         className="text-green-600 hover:text-green-900"
                       >
                         <CheckCircle className="h-5 w-5" />
                       </button>
                     )}
-                    {service.status !== 'completed' && (
+                    {(service.status === 'pending' || service.status === 'in_progress') && (
                       <button
                         onClick={() =>
-                          updateStatus.mutate({ id: service.id, status: 'cancelled' })
+                          changeStatus(service.id, 'cancelled')
                         }
                         className="text-red-600 hover:text-red-900"
                       >